@@ -0,0 +1,467 @@
+# --------------------------------------------------------------------
+# Program: Tree Animations
+# Date: Oct 19 2026
+# Description: Animated drawables built from generated trees. Wind
+#   sway keeps the branch hierarchy of every swaying tree as relative
+#   angles in one set of arrays and recomputes every branch position
+#   one level at a time across the whole scene with numpy, drawing the
+#   thin branches and leaves as pixels written with numpy too.
+#   Growth draws a tree level by level, keeping finished levels on a
+#   cached surface so only the growing level is drawn each frame.
+# --------------------------------------------------------------------
+
+import math
+import time
+import random
+import pygame
+import numpy as np
+import occlusion
+import label
+import draw_stats
+
+
+# tree whose branches sway in the wind, one part of a SwayForest that moves every swaying tree of a scene at once
+class SwayTree:
+    def __init__(self, tree, strength=1.0):
+        branches = tree.branches
+        self.count = len(branches)
+        self.parents = np.array([-1 if b.parent is None else b.parent for b in branches], dtype=np.int64)
+        ends = np.array([b.a for b in branches], dtype=np.float64).reshape(-1, 2)
+        starts = np.array([b.b for b in branches], dtype=np.float64).reshape(-1, 2)
+        d = ends - starts
+        self.lengths = np.hypot(d[:, 0], d[:, 1])
+        self.angles = np.arctan2(d[:, 1], d[:, 0])
+        self.starts = starts  # the start of branches without a parent never moves
+        self.levels = np.array([b.level for b in branches], dtype=np.int64)
+
+        # thin branches high in the tree bend the most
+        rng = random.Random(self.count)
+        depth = max(self.levels.max(initial=0), 1)
+        self.flex = np.array([0.004 + 0.02 * b.level / depth / max(b.width, 1) ** 0.5 for b in branches]) * strength
+        self.phase = np.array([rng.uniform(0, math.pi * 2) for _ in branches])
+        self.colors = [b.color for b in branches]
+        self.widths = np.array([b.width for b in branches], dtype=np.int64)
+
+        # leaves follow the end of the branch they grow from
+        self.leaves = tree.leaves
+        self.leaf_branches = np.array([-1 if leaf.branch is None else leaf.branch for leaf in tree.leaves],
+                                      dtype=np.int64)
+        self.leaf_sizes = np.array([leaf.size for leaf in tree.leaves], dtype=np.float64)
+        self.leaf_sprites = None
+        if getattr(tree, "atlas", None) is not None:
+            self.leaf_sprites = [tree.atlas.leaf(leaf.size, leaf.color) if leaf.size > 0 else None
+                                 for leaf in tree.leaves]
+        self.leaf_pos = np.array([leaf.pos for leaf in tree.leaves], dtype=np.float64).reshape(-1, 2)
+
+        # subtrees drawn from cached sprites move with the end of the branch they grow from, without turning
+        self.stamp_sprites = []
+        self.stamp_offsets = []
+        for stamp in tree.stamps:
+            sprite, pos = stamp.blit()
+            self.stamp_sprites.append(sprite)
+            self.stamp_offsets.append((pos[0] - stamp.pos[0], pos[1] - stamp.pos[1]))
+        self.stamp_offsets = np.array(self.stamp_offsets, dtype=np.float64).reshape(-1, 2)
+        self.stamp_parents = np.array([stamp.parent for stamp in tree.stamps], dtype=np.int64)
+
+        self.forest = None  # set by the SwayForest the tree is part of
+        self.index = 0  # its place in the forest
+        self.thick = []  # forest rows of its branches drawn as lines
+        self.thin = []  # forest rows of its branches drawn as points, or as lines on windows that are not packed
+        self.stamp_rows = []  # forest rows of the branches its stamps move with
+
+    def draw(self, win):
+        forest = self.forest
+        lines = self.thick if forest.packed else self.thick + self.thin
+        if lines:
+            # thick branches are few (the trunk and the levels near it), drawn one line each, like every branch on
+            # windows that are not packed
+            ends = np.rint(forest.ends[lines]).tolist()
+            starts = np.rint(forest.starts[lines]).tolist()
+            for i, a, b in zip(lines, ends, starts):
+                pygame.draw.line(win, forest.colors[i], a, b, forest.widths[i])
+            draw_stats.draw_calls += len(lines)
+        if forest.packed:
+            forest.plot_points(win, self.index)
+        if self.stamp_sprites:
+            corners = (np.rint(forest.ends[self.stamp_rows]) + self.stamp_offsets).astype(np.int64).tolist()
+            win.blits(list(zip(self.stamp_sprites, corners)), False)
+            draw_stats.blits += len(corners)
+        if self.leaf_sprites is not None and forest.packed:
+            forest.plot_leaves(win, self.index)
+        else:
+            l1, l2 = forest.leaf_offsets[self.index:self.index + 2]
+            for leaf, pos in zip(self.leaves, np.rint(forest.leaf_pos[l1:l2]).tolist()):
+                pygame.draw.circle(win, leaf.color, pos, leaf.size)
+            draw_stats.draw_calls += len(self.leaves)
+
+
+# every swaying tree of a scene in one set of arrays, with the branches of all the trees sorted by level so
+# each level is recomputed in one vectorized step across the whole scene. Thin branches (nearly all of them) are
+# drawn as points spaced at most a pixel apart along them, and leaves as the pixels of their sprites, both
+# written straight into the pixels of the window with numpy a tree at a time instead of one line or blit each.
+# Branch lengths and sprites do not change as the trees sway, so which branch, leaf and colour every point and
+# pixel has is worked out once. Windows that do not pack every pixel into 32 bits are drawn with lines and circles.
+class SwayForest:
+    def __init__(self, trees, thin_width=1):
+        self.trees = trees
+        offsets = np.cumsum([0] + [t.count for t in trees]).tolist()
+        self.leaf_offsets = np.cumsum([0] + [len(t.leaf_pos) for t in trees]).tolist()
+        levels = np.concatenate([t.levels for t in trees] + [np.zeros(0, np.int64)])
+        order = np.argsort(levels, kind="stable")  # row of the forest arrays -> branch of the trees in turn
+        row = np.empty(len(order), np.int64)  # branch of the trees in turn -> row of the forest arrays
+        row[order] = np.arange(len(order))
+        level_numbers = np.arange(levels.max(initial=-1) + 1)
+        self.level_rows = list(zip(np.searchsorted(levels[order], level_numbers).tolist(),
+                                   np.searchsorted(levels[order], level_numbers, "right").tolist()))
+
+        parents = np.concatenate([np.where(t.parents >= 0, t.parents + o, -1) for t, o in zip(trees, offsets)] +
+                                 [np.zeros(0, np.int64)])
+        self.parents = np.where(parents >= 0, row[np.maximum(parents, 0)], -1)[order]
+        self.lengths = np.concatenate([t.lengths for t in trees] + [np.zeros(0)])[order]
+        self.angles = np.concatenate([t.angles for t in trees] + [np.zeros(0)])[order]
+        self.starts = np.concatenate([t.starts for t in trees] + [np.zeros((0, 2))])[order]
+        self.ends = self.starts.copy()
+        self.flex = np.concatenate([t.flex for t in trees] + [np.zeros(0)])[order]
+        self.phase = np.concatenate([t.phase for t in trees] + [np.zeros(0)])[order]
+        colors = [color for t in trees for color in t.colors]
+        self.colors = [colors[i] for i in order.tolist()]
+        widths = np.concatenate([t.widths for t in trees] + [np.zeros(0, np.int64)])
+        self.widths = widths[order].tolist()
+
+        # angle of every branch relative to the branch it grows from
+        has_parent = self.parents >= 0
+        self.rel_angles = self.angles.copy()
+        self.rel_angles[has_parent] -= self.angles[self.parents[has_parent]]
+        self.root_starts = self.starts.copy()  # only used for branches without a parent
+
+        leaf_branches = np.concatenate([np.where(t.leaf_branches >= 0, t.leaf_branches + o, -1)
+                                        for t, o in zip(trees, offsets)] + [np.zeros(0, np.int64)])
+        self.leaf_branches = np.where(leaf_branches >= 0, row[np.maximum(leaf_branches, 0)], -1)
+        self.leaf_pos = np.concatenate([t.leaf_pos for t in trees] + [np.zeros((0, 2))])
+        self.leaf_sizes = np.concatenate([t.leaf_sizes for t in trees] + [np.zeros(0)])
+
+        # points of the thin branches, in tree order: the branch row of every point and how far along it it is
+        thin = np.flatnonzero(widths <= thin_width)
+        counts = np.ceil(self.lengths[row[thin]]).astype(np.int64) + 1
+        self.point_branch = np.repeat(row[thin], counts).astype(np.int32)
+        firsts = np.cumsum(counts) - counts
+        self.point_along = (np.arange(counts.sum()) - np.repeat(firsts, counts)) / np.repeat(np.maximum(counts - 1, 1),
+                                                                                            counts)
+        self.point_offsets = np.concatenate([[0], np.cumsum(counts)])[np.searchsorted(thin, offsets)].tolist()
+
+        # pixels of the leaf sprites, in tree order: the leaf of every pixel and where it is in the sprite
+        self.sprites = []  # every leaf sprite
+        stencils = {}  # sprite -> (its index in sprites, x and y of its drawn pixels)
+        pixel_leaf, pixel_xy, pixel_sprite, self.pixel_offsets = [], [], [], [0]
+        for t, l1 in zip(trees, self.leaf_offsets):
+            for i, sprite in enumerate(t.leaf_sprites or []):
+                if sprite is None:
+                    continue
+                if sprite not in stencils:
+                    mask = pygame.mask.from_surface(sprite)
+                    w, h = sprite.get_size()
+                    stencils[sprite] = (len(self.sprites), [(x, y) for x in range(w) for y in range(h)
+                                                            if mask.get_at((x, y))])
+                    self.sprites.append(sprite)
+                number, drawn = stencils[sprite]
+                pixel_leaf += [l1 + i] * len(drawn)
+                pixel_xy += drawn
+                pixel_sprite += [number] * len(drawn)
+            self.pixel_offsets.append(len(pixel_leaf))
+        self.pixel_leaf = np.array(pixel_leaf, dtype=np.int32)
+        self.pixel_xy = np.array(pixel_xy, dtype=np.int32).reshape(-1, 2)
+        self.pixel_sprite = np.array(pixel_sprite, dtype=np.int64)
+        self.sprite_size = max([s.get_width() for s in self.sprites], default=0)
+
+        for i, t in enumerate(trees):
+            t.forest = self
+            t.index = i
+            t.thick = row[offsets[i]:offsets[i + 1]][widths[offsets[i]:offsets[i + 1]] > thin_width].tolist()
+            t.thin = row[offsets[i]:offsets[i + 1]][widths[offsets[i]:offsets[i + 1]] <= thin_width].tolist()
+            t.stamp_rows = row[t.stamp_parents + offsets[i]].tolist()
+        self.layout = None  # pitch and pixel format of the window the colours and pixel offsets are made for
+        self.packed = True  # if the points and leaf pixels are written into the window's pixels (see packed_pixels)
+
+    # recompute all branch, point and leaf positions for a time (seconds) and wind strength
+    def update(self, t, wind=1.0):
+        sway = self.flex * wind * (np.sin(t * 1.7 + self.phase) + 0.6 * math.sin(t * 0.6))
+        for a, b in self.level_rows:
+            parents = self.parents[a:b]
+            rooted = parents >= 0
+            angle = self.rel_angles[a:b] + sway[a:b]
+            angle[rooted] += self.angles[parents[rooted]]
+            start = self.starts[a:b]
+            start[:] = self.root_starts[a:b]
+            start[rooted] = self.ends[parents[rooted]]
+            self.angles[a:b] = angle
+            self.ends[a:b, 0] = start[:, 0] + self.lengths[a:b] * np.cos(angle)
+            self.ends[a:b, 1] = start[:, 1] + self.lengths[a:b] * np.sin(angle)
+        attached = self.leaf_branches >= 0
+        self.leaf_pos[attached] = self.ends[self.leaf_branches[attached]]
+
+        # branches run from their start (b) to their end (a)
+        sx, sy = self.starts[:, 0].take(self.point_branch), self.starts[:, 1].take(self.point_branch)
+        ex, ey = self.ends[:, 0].take(self.point_branch), self.ends[:, 1].take(self.point_branch)
+        self.point_x = np.rint(sx + (ex - sx) * self.point_along).astype(np.int32)
+        self.point_y = np.rint(sy + (ey - sy) * self.point_along).astype(np.int32)
+        self.corner_x = np.rint(self.leaf_pos[:, 0] - self.leaf_sizes).astype(np.int32)
+        self.corner_y = np.rint(self.leaf_pos[:, 1] - self.leaf_sizes).astype(np.int32)
+
+    # map the colours and pixel offsets to the window's pixels, then find where the points and leaf pixels of this
+    # frame go in them. Trees reaching out of the window are marked to be clipped as they are plotted
+    def locate(self, win):
+        self.packed = packed_pixels(win)
+        if not self.packed:  # drawn with lines and circles (see SwayTree.draw)
+            return
+        layout = (win.get_pitch(), win.get_masks())
+        if layout != self.layout:
+            self.layout = layout
+            self.stride = win.get_pitch() // 4
+            mapped = np.array([win.map_rgb(color) for color in self.colors] + [0], dtype=np.uint32)
+            self.point_colors = mapped[self.point_branch]
+            mapped = np.array([win.map_rgb(s.get_at((s.get_width() // 2, s.get_height() // 2)))
+                               for s in self.sprites] + [0], dtype=np.uint32)
+            self.pixel_colors = mapped[self.pixel_sprite]
+            self.pixel_steps = self.pixel_xy[:, 1] * self.stride + self.pixel_xy[:, 0]
+        self.point_flat = self.point_y * self.stride + self.point_x
+        self.pixel_flat = (self.corner_y * self.stride + self.corner_x).take(self.pixel_leaf) + self.pixel_steps
+        w, h = win.get_size()
+        self.point_inside = range_inside(self.point_x, self.point_y, self.point_offsets, 0, w, h)
+        self.leaf_inside = range_inside(self.corner_x, self.corner_y, self.leaf_offsets, self.sprite_size, w, h)
+
+    # write the points of the thin branches of tree i into the window
+    def plot_points(self, win, i):
+        p1, p2 = self.point_offsets[i:i + 2]
+        x = y = None
+        if not self.point_inside[i]:
+            x, y = self.point_x[p1:p2], self.point_y[p1:p2]
+        self.plot(win, self.point_flat[p1:p2], self.point_colors[p1:p2], x, y)
+
+    # write the pixels of the leaves of tree i into the window
+    def plot_leaves(self, win, i):
+        p1, p2 = self.pixel_offsets[i:i + 2]
+        x = y = None
+        if not self.leaf_inside[i]:
+            leaves = self.pixel_leaf[p1:p2]
+            x = self.corner_x.take(leaves) + self.pixel_xy[p1:p2, 0]
+            y = self.corner_y.take(leaves) + self.pixel_xy[p1:p2, 1]
+        self.plot(win, self.pixel_flat[p1:p2], self.pixel_colors[p1:p2], x, y)
+
+    # write colours at flat pixel indices, only the ones with x and y inside the window if they are given
+    def plot(self, win, flat, colors, x=None, y=None):
+        if not len(flat):
+            return
+        if x is not None:
+            w, h = win.get_size()
+            inside = (x >= 0) & (x < w) & (y >= 0) & (y < h)
+            flat, colors = flat[inside], colors[inside]
+        buffer = win.get_buffer()
+        np.frombuffer(buffer, np.uint32)[flat] = colors
+        del buffer  # unlocks the window
+        draw_stats.draw_calls += 1
+
+
+# return if a surface keeps every pixel as one 32 bit integer with red, green and blue masks, so the colours mapped
+# with map_rgb can be written straight into its buffer
+def packed_pixels(win):
+    return win.get_bytesize() == 4 and all(win.get_masks()[:3])
+
+
+# return for every range of rows (between consecutive offsets) if all its points, grown by size pixels to the
+# right and down, are inside a w by h window. Empty ranges are inside
+def range_inside(x, y, offsets, size, w, h):
+    starts = np.array(offsets[:-1], dtype=np.int64)
+    filled = starts < np.array(offsets[1:], dtype=np.int64)
+    inside = np.ones(len(starts), bool)
+    if filled.any():
+        starts = starts[filled]
+        inside[filled] = ((np.minimum.reduceat(x, starts) >= 0) & (np.minimum.reduceat(y, starts) >= 0) &
+                          (np.maximum.reduceat(x, starts) + size <= w) & (np.maximum.reduceat(y, starts) + size <= h))
+    return inside.tolist()
+
+
+# tree that grows from the trunk up, one level at a time
+class GrowTree:
+    def __init__(self, tree, level_time=0.4):
+        self.tree = tree
+        self.level_time = level_time  # seconds for one level of branches to grow
+        box = occlusion.bounding_box(tree)
+        if box is None:
+            box = (0, 0, 0, 0)
+        self.pos = (box[0], box[1])
+        self.offset = (-box[0], -box[1])
+        self.cache = pygame.Surface((box[2] - box[0] + 1, box[3] - box[1] + 1))
+        self.cache.fill((255, 0, 255))
+        self.cache.set_colorkey((255, 0, 255))
+
+        # branches and the leaves at their ends grouped by level
+        self.levels = [[] for _ in range(tree.max_level)]
+        for b in tree.branches:
+            self.levels[b.level].append(b)
+        self.leaves = [[] for _ in range(tree.max_level + 1)]
+        for leaf in tree.leaves:
+            level = 0 if leaf.branch is None else tree.branches[leaf.branch].level + 1
+            self.leaves[level].append(leaf)
+        self.stamps = [[] for _ in range(tree.max_level + 1)]  # subtrees drawn from cached sprites
+        for stamp in tree.stamps:
+            self.stamps[stamp.level].append(stamp)
+        for leaf in self.leaves[0]:
+            leaf.draw_transformed(self.cache, 1, self.offset)
+        self.cached_levels = 0  # levels already drawn on the cache
+        self.done = not self.levels
+
+    # draw the finished levels onto the cache, once each
+    def cache_levels(self, level):
+        while self.cached_levels < min(level, len(self.levels)):
+            for b in self.levels[self.cached_levels]:
+                b.draw_transformed(self.cache, 1, self.offset)
+            for stamp in self.stamps[self.cached_levels + 1]:
+                stamp.draw_transformed(self.cache, 1, self.offset)
+            for leaf in self.leaves[self.cached_levels + 1]:
+                leaf.draw_transformed(self.cache, 1, self.offset)
+            self.cached_levels += 1
+        if self.cached_levels == len(self.levels) and not self.done:
+            # redraw the full tree once so branches and leaves overlap exactly as in the still tree
+            self.cache.fill((255, 0, 255))
+            self.tree.draw_transformed(self.cache, 1, self.offset)
+            self.done = True
+
+    # draw the tree as it looks a number of seconds after it started growing
+    def draw_at(self, win, t):
+        level = int(t / self.level_time)
+        self.cache_levels(level)
+        win.blit(self.cache, self.pos)
+        draw_stats.blits += 1
+        if level < len(self.levels):
+            grown = t / self.level_time - level
+            for b in self.levels[level]:
+                end = (b.b[0] + (b.a[0] - b.b[0]) * grown, b.b[1] + (b.a[1] - b.b[1]) * grown)
+                pygame.draw.line(win, b.color, b.b, end, b.width)
+            draw_stats.draw_calls += len(self.levels[level])
+
+
+# still drawables baked onto one surface covering only the area they draw on
+class StillLayer:
+    def __init__(self, drawables, box):
+        x1, y1, x2, y2 = box
+        self.pos = (x1, y1)
+        self.surface = pygame.Surface((x2 - x1 + 1, y2 - y1 + 1))
+        self.surface.fill((255, 0, 255))
+        self.surface.set_colorkey((255, 0, 255))
+        for d in drawables:
+            d.draw_transformed(self.surface, 1, (-x1, -y1))
+
+    def draw(self, win):
+        win.blit(self.surface, self.pos)
+        draw_stats.blits += 1
+
+
+# scene with trees growing over a still background
+# clock returns the time in seconds the animation is drawn at (the time of the frame when input is replayed)
+class GrowScene:
+    def __init__(self, drawables, size, level_time=0.4, clock=time.perf_counter):
+        self.clock = clock
+        self.background = pygame.Surface(size)
+        self.background.fill((255, 255, 255))
+        self.items = []
+        for d in drawables:
+            if occlusion.object_kind(d) == "tree":
+                self.items.append(GrowTree(d, level_time))
+            elif self.items:
+                self.items.append(d)
+            else:
+                d.draw(self.background)
+        self.start_time = clock()
+
+    def draw(self, win):
+        t = self.clock() - self.start_time
+        win.blit(self.background, (0, 0))
+        draw_stats.blits += 1
+        for d in self.items:
+            if isinstance(d, GrowTree):
+                d.draw_at(win, t)
+            else:
+                d.draw(win)
+
+
+# scene with swaying trees drawn over a still background, showing the frame time
+# only the max_moving largest trees sway, the others are baked into still layers between them
+# clock returns the time the trees sway to, like GrowScene's. The frame time shown is always measured
+class WindScene:
+    def __init__(self, drawables, size, strength=1.0, max_moving=None, clock=time.perf_counter):
+        self.clock = clock
+        trees = [d for d in drawables if occlusion.object_kind(d) == "tree"]
+        boxes = {id(d): occlusion.bounding_box(d) for d in drawables if occlusion.object_kind(d) is not None}
+        if max_moving is not None and len(trees) > max_moving:
+            trees.sort(key=lambda t: boxes[id(t)][3] - boxes[id(t)][1] if boxes[id(t)] else 0, reverse=True)
+            trees = trees[:max_moving]
+        moving = set(id(t) for t in trees)
+
+        # everything before the first moving tree is drawn once onto a background
+        self.background = pygame.Surface(size)
+        self.background.fill((255, 255, 255))
+        self.items = []
+        still = []
+        for d in drawables:
+            if id(d) in moving:
+                self.add_still_layer(still, boxes, size)
+                still = []
+                self.items.append(SwayTree(d, strength))
+            elif not self.items:
+                d.draw(self.background)
+            elif boxes.get(id(d)) is not None:
+                still.append(d)
+        self.add_still_layer(still, boxes, size)
+        self.forest = SwayForest([d for d in self.items if isinstance(d, SwayTree)])
+
+        self.start_time = clock()
+        self.last_frame = None
+        self.frame_times = []  # seconds between the last few frames
+        self.update_times = []  # seconds spent updating and drawing the trees
+        self.font = None
+        self.readout = None
+        self.readout_time = 0
+
+    def draw(self, win):
+        now = time.perf_counter()
+        if self.last_frame is not None:
+            self.frame_times.append(now - self.last_frame)
+        self.last_frame = now
+
+        t = self.clock()
+        win.blit(self.background, (0, 0))
+        draw_stats.blits += 1
+        self.forest.update(t - self.start_time)
+        self.forest.locate(win)
+        for d in self.items:
+            d.draw(win)
+        self.update_times.append(time.perf_counter() - now)
+        self.draw_readout(win, t)
+
+    # add a run of still drawables between moving trees as one layer
+    def add_still_layer(self, drawables, boxes, size):
+        if not drawables:
+            return
+        x1 = max(min(boxes[id(d)][0] for d in drawables), 0)
+        y1 = max(min(boxes[id(d)][1] for d in drawables), 0)
+        x2 = min(max(boxes[id(d)][2] for d in drawables), size[0] - 1)
+        y2 = min(max(boxes[id(d)][3] for d in drawables), size[1] - 1)
+        if x1 <= x2 and y1 <= y2:
+            self.items.append(StillLayer(drawables, (x1, y1, x2, y2)))
+
+    # draw average frame time and animation cost, refreshing the text a few times a second
+    def draw_readout(self, win, now):
+        if self.font is None:
+            self.font = label.get_font("lucida bright", 16)
+        if self.readout is None or now - self.readout_time > 0.25:
+            frame_ms = 1000 * sum(self.frame_times) / max(len(self.frame_times), 1)
+            work_ms = 1000 * sum(self.update_times) / max(len(self.update_times), 1)
+            fps = 1000 / frame_ms if frame_ms else 0
+            text = "frame " + str(round(frame_ms, 1)) + " ms (" + str(round(fps)) + " fps), animation " + \
+                   str(round(work_ms, 1)) + " ms"
+            self.readout = self.font.render(text, True, (0, 0, 0), (255, 255, 255))
+            self.readout_time = now
+            self.frame_times = []
+            self.update_times = []
+        win.blit(self.readout, (win.get_width() - self.readout.get_width() - 10, 10))
+        draw_stats.blits += 1
@@ -0,0 +1,117 @@
+# --------------------------------------------------------------------
+# Program: Decoded Asset Cache
+# Date: Oct 19 2026
+# Description: Loads images through a cache of already decoded raw
+#   pixels. The first load decodes the image and writes its pixels in
+#   the display's pixel layout to a cache file. Later loads memory-map
+#   that file straight into a surface, skipping the decode. A cache
+#   file is only used while it matches the source file's size, mtime
+#   and hash.
+# --------------------------------------------------------------------
+
+import os
+import mmap
+import struct
+import hashlib
+import pygame
+
+CACHE_DIR = ".asset_cache"
+MAGIC = b"FTAC"
+# magic, pixel format, width, height, source size, source mtime (ns), source sha1
+HEADER = struct.Struct("<4s4sIIQQ20s")
+
+# images loaded from the cache and decoded from their source files
+cache_hits = 0
+cache_misses = 0
+
+
+# return the raw pixel format matching the display, so cached pixels need no conversion when drawn
+def display_format():
+    surf = pygame.display.get_surface()
+    if surf is not None and surf.get_bitsize() == 32 and surf.get_masks()[0] == 0xff0000:
+        return "BGRA"
+    return "RGBA"
+
+
+def file_hash(path):
+    with open(path, "rb") as f:
+        return hashlib.sha1(f.read()).digest()
+
+
+def cache_path(path, cache_dir=CACHE_DIR):
+    return os.path.join(cache_dir, os.path.basename(path) + ".raw")
+
+
+# read the header of a cache file, None if it is missing or not a cache file
+def read_header(path):
+    try:
+        with open(path, "rb") as f:
+            data = f.read(HEADER.size)
+    except OSError:
+        return None
+    if len(data) != HEADER.size or data[:4] != MAGIC:
+        return None
+    header = HEADER.unpack(data)
+    if os.path.getsize(path) < HEADER.size + header[2] * header[3] * 4:  # cut short while being written
+        return None
+    return header
+
+
+# return if a cache file holds the pixels of a source file in a pixel format
+# a changed mtime alone does not make the cache stale, only a changed hash does (the mtime is then updated)
+def cache_is_valid(header, path, fmt):
+    if header is None or header[1].decode() != fmt:
+        return False
+    stat = os.stat(path)
+    if header[4] != stat.st_size:
+        return False
+    if header[5] == stat.st_mtime_ns:
+        return True
+    return header[6] == file_hash(path)
+
+
+# decode an image and write its pixels to a cache file
+def write_cache(path, cached, fmt):
+    image = pygame.image.load(path)
+    stat = os.stat(path)
+    os.makedirs(os.path.dirname(cached) or ".", exist_ok=True)
+    header = HEADER.pack(MAGIC, fmt.encode(), image.get_width(), image.get_height(), stat.st_size,
+                         stat.st_mtime_ns, file_hash(path))
+    # written to a temporary file first so a half written cache is never read
+    temp = cached + ".tmp"
+    with open(temp, "wb") as f:
+        f.write(header)
+        f.write(pygame.image.tobytes(image, fmt))
+    os.replace(temp, cached)
+    return image
+
+
+# return a surface with the pixels of a cache file, mapped instead of read
+def map_cache(cached, header):
+    width, height = header[2], header[3]
+    with open(cached, "rb") as f:
+        data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_COPY)
+    pixels = memoryview(data)[HEADER.size:HEADER.size + width * height * 4]
+    # the surface draws from the mapped pixels, which stay mapped as long as the surface lives
+    return pygame.image.frombuffer(pixels, (width, height), header[1].decode())
+
+
+# load an image, from the decoded pixel cache when it is up to date
+def load_image(path, cache_dir=CACHE_DIR):
+    global cache_hits, cache_misses
+    fmt = display_format()
+    cached = cache_path(path, cache_dir)
+    header = read_header(cached)
+    try:
+        if cache_is_valid(header, path, fmt):
+            if header[5] != os.stat(path).st_mtime_ns:
+                # same pixels with a new mtime, remember the mtime so the hash is not needed next time
+                with open(cached, "r+b") as f:
+                    f.write(HEADER.pack(*header[:5], os.stat(path).st_mtime_ns, header[6]))
+            cache_hits += 1
+            return map_cache(cached, header)
+        cache_misses += 1
+        return write_cache(path, cached, fmt)
+    except OSError:
+        # the cache can not be read or written (read only folder, full disk), decode the image every time
+        return pygame.image.load(path)
@@ -0,0 +1,109 @@
+# --------------------------------------------------------------------
+# Program: Async Scene Generation
+# Date: Oct 19 2026
+# Description: asyncio versions of create_scene and
+#   create_fractal_screen for applications with their own event loop.
+#   Generation runs in an executor thread (scenes hold surfaces, which
+#   can not be sent back from another process), reports its progress
+#   to an async iterator and stops at the next object once the task
+#   awaiting it or iterating its progress is cancelled. The objects
+#   made so far are dropped.
+#
+#   generation = async_scene.create_scene(settings)
+#   async for current_task, total_tasks in generation:
+#       ...
+#   scene = await generation
+# --------------------------------------------------------------------
+
+import copy
+import asyncio
+import threading
+import fractals
+
+
+# a scene being generated in an executor, awaitable for the finished scene
+# and iterable for (current_task, total_tasks) as objects are made
+class SceneGeneration:
+    # build(progress) makes the scene in the executor, returning None if progress() returned True
+    def __init__(self, build, executor=None):
+        self.loop = asyncio.get_running_loop()
+        self.stop = threading.Event()  # set to make the generation stop at its next object
+        self.latest = None  # last (current_task, total_tasks) reported
+        self.changed = asyncio.Event()
+        self.future = self.loop.run_in_executor(executor, build, self.report)
+        self.future.add_done_callback(lambda future: self.changed.set())
+
+    # progress callback of the generator, in the executor thread
+    def report(self, current_task, total_tasks):
+        if self.stop.is_set():
+            return True
+        self.latest = (current_task, total_tasks)
+        return not self.notify()
+
+    # wake the progress iterator, returning False if the event loop has closed
+    def notify(self):
+        try:
+            self.loop.call_soon_threadsafe(self.changed.set)
+        except RuntimeError:
+            self.stop.set()
+            return False
+        return True
+
+    # make the generation stop at its next object, the scene is then never returned
+    def cancel(self):
+        self.stop.set()
+
+    def cancelled(self):
+        return self.stop.is_set()
+
+    # yield the progress as it changes until the generation ends
+    # progress reported while the loop was busy is skipped, only the latest is yielded
+    # cancelling the task waiting for the next progress cancels the generation
+    async def progress(self):
+        last = None
+        while True:
+            try:
+                await self.changed.wait()
+            except asyncio.CancelledError:
+                self.cancel()
+                raise
+            self.changed.clear()
+            if self.latest is not None and self.latest != last:
+                last = self.latest
+                yield last
+            if self.future.done():
+                return
+
+    def __aiter__(self):
+        return self.progress()
+
+    # return the finished scene, raising CancelledError if the generation was cancelled
+    async def result(self):
+        try:
+            # shielded so a cancelled awaiter does not cancel the executor future, the thread stops by itself
+            scene = await asyncio.shield(self.future)
+        except asyncio.CancelledError:
+            self.cancel()
+            raise
+        if scene is None or self.stop.is_set():
+            raise asyncio.CancelledError()
+        return scene
+
+    def __await__(self):
+        return self.result().__await__()
+
+    # wait until the executor thread has stopped, after the generation finished or was cancelled
+    async def stopped(self):
+        await asyncio.wait([self.future])
+
+
+# generate the forest and mountain range scene for a set of settings (see fractals.generate_scene)
+# the settings are copied, so they can change while the scene is generated
+def create_scene(settings, detail=1, rng=None, executor=None, previous=None):
+    s = copy.copy(settings)
+    return SceneGeneration(lambda progress: fractals.generate_scene(s, progress, detail, rng, previous), executor)
+
+
+# create the scene of a few large trees (see fractals.create_fractal_screen)
+def create_fractal_screen(rng=None, executor=None):
+    return SceneGeneration(lambda progress: fractals.create_fractal_screen(rng, progress), executor)
@@ -11,8 +11,8 @@
 import pygame
 import label
 import color as c
+import draw_stats
 
-pygame.init()
 
 # alignment constants
 LEFT = 0
@@ -64,6 +64,12 @@ class ButtonList:
     def add(self, button):
         self.buttonList.append(button)
 
+    # return a value that changes whenever the drawn buttons would look different
+    def state(self):
+        if not self.visible:
+            return False
+        return tuple(b.state() for b in self.buttonList)
+
     # process button clicks, releases and hovers
     def process_events(self, click_bool, release_bool, mousepos):
         self.released = []
@@ -164,6 +170,7 @@ class Button:
         if self.visible:
             if self.currentFillColor is not None:
                 pygame.draw.rect(win, self.currentFillColor, self.rect())
+                draw_stats.draw_calls += 1
             if self.bColor is not None:
                 self.draw_border(win)
             self.rendered_text.draw(win)
@@ -174,6 +181,15 @@ class Button:
         pygame.draw.rect(win, self.bColor, (x, y + self.b, self.b, h - self.b))
         pygame.draw.rect(win, self.bColor, (x + self.b, y + h - self.b, w - self.b, self.b))
         pygame.draw.rect(win, self.bColor, (x + w - self.b, y + self.b, self.b, h - self.b))
+        draw_stats.draw_calls += 4
+
+    # return a value that changes whenever the button would be drawn differently
+    # (the text label is compared as an object, it is replaced whenever the text is rendered again)
+    def state(self):
+        if not self.visible:
+            return False
+        return (self.currentFillColor, self.bColor, self.b, self.rect(), self.rendered_text, self.rendered_text.x,
+                self.rendered_text.y)
 
     # renders text drawable
     def render_text(self):
@@ -360,12 +376,20 @@ class Slider:
     def draw(self, win):
         if self.is_visible():
             pygame.draw.rect(win, self.color, self.rect())
+            draw_stats.draw_calls += 1
             self.draw_border(win)
             self.draw_slider(win)
             self.rendered_text.draw(win)
 
+    # return a value that changes whenever the slider would be drawn differently
+    def state(self):
+        if not self.is_visible():
+            return False
+        return (self.color, self.bColor, self.slide_color, self.rect(), self.rendered_text, self.slide_button.state())
+
     def draw_slider(self, win):
         pygame.draw.line(win, self.slide_color, (self.slide_x1, self.slide_y), (self.slide_x2, self.slide_y), 3)
+        draw_stats.draw_calls += 1
         self.slide_button.draw(win)
 
     def draw_border(self, win):
@@ -374,6 +398,7 @@ class Slider:
         pygame.draw.rect(win, self.bColor, (x, y + self.b, self.b, h - self.b))
         pygame.draw.rect(win, self.bColor, (x + self.b, y + h - self.b, w - self.b, self.b))
         pygame.draw.rect(win, self.bColor, (x + w - self.b, y + self.b, self.b, h - 2 * self.b))
+        draw_stats.draw_calls += 4
 
     def dynamic_text(self):
         return self.text.replace("@", str(int(self.slide_value)))
@@ -427,7 +452,7 @@ class Slider:
 
         self.slide_value = self.start_value + (self.end_value - self.start_value) * self.convert_slider_pos_to_percent()
 
-        if self.is_dynamic_text:
+        if self.is_dynamic_text and self.dynamic_text() != self.rendered_text.text:
             self.render_text()
 
         self.action(self)
@@ -6,6 +6,8 @@
 # --------------------------------------------------------------------
 
 import random
+import itertools
+import numpy as np
 
 # colours
 WHITE = (255, 255, 255)
@@ -30,18 +32,29 @@ DARK_ORANGE = (200, 100, 0)
 SKY = (130, 220, 226)
 
 
-def random_any_color(start=0, stop=255):
-    r = random.randrange(start, stop)
-    g = random.randrange(start, stop)
-    b = random.randrange(start, stop)
+# rng is where the random numbers come from (the random module or a RandomStream)
+def random_any_color(start=0, stop=255, rng=random):
+    r = rng.randrange(start, stop)
+    g = rng.randrange(start, stop)
+    b = rng.randrange(start, stop)
     return r, g, b
 
 
-def random_color(start, stop, color, saturation=100):
-    c = random.randrange(start, stop)
+def random_color(start, stop, color, saturation=100, rng=random):
+    c = rng.randrange(start, stop)
     return basic_color(c, color, saturation)
 
 
+# return n random colours like random_color, with every random value drawn at once
+# saturations is an array of the saturation of each colour, rng is a RandomStream
+def random_colors(start, stop, color, saturations, rng):
+    strength = rng.int_array(start, stop, len(saturations))
+    bright = strength.tolist()
+    dark = (strength * (1 - saturations / 100)).tolist()
+    return list(zip(bright if "r" in color else dark, bright if "g" in color else dark,
+                    bright if "b" in color else dark))
+
+
 def basic_color(strength, color, saturation=100):
     c = strength
     dark = c * (1 - saturation / 100)
@@ -62,3 +75,21 @@ def basic_color(strength, color, saturation=100):
 
 def grey(darkness):
     return darkness, darkness, darkness
+
+
+# return the colours of a gradient from start to end, one colour for each step from 0 to steps (inclusive)
+def gradient(start, end, steps):
+    strength = (np.arange(steps + 1) / steps)[:, None]
+    start = np.array(start, dtype=np.float64)
+    colors = start - (start - np.array(end, dtype=np.float64)) * strength
+    return list(map(tuple, colors.tolist()))
+
+
+# return colours blended towards a colour (the sky by default) by a strength from 0 to 1,
+# all colours are blended in one array operation
+def tint_colors(colors, strength, target=SKY):
+    if not colors:
+        return []
+    colors = np.fromiter(itertools.chain.from_iterable(colors), np.float64, len(colors) * 3).reshape(-1, 3)
+    colors = colors - (colors - np.array(target, dtype=np.float64)) * strength
+    return list(zip(*colors.T.tolist()))
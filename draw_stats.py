@@ -0,0 +1,13 @@
+# --------------------------------------------------------------------
+# Program: Draw Counters
+# Date: Oct 19 2026
+# Description: Running counts of the drawing done, read by the HUD
+#   every frame. Blits and draw calls are counted by the drawables
+#   of the frames where they draw (every surface of a blits() batch
+#   and every pygame.draw call of a loop counts), in the main thread
+#   only: sprites rendered into caches and previews drawn by the
+#   preview thread are not counted.
+# --------------------------------------------------------------------
+
+blits = 0  # surfaces blitted
+draw_calls = 0  # pygame.draw calls made
@@ -0,0 +1,1207 @@
+# --------------------------------------------------------------------
+# Program: Fractal Scene Generation
+# Date: Oct 19 2026
+# Description: The recursive fractal objects (trees, mountains,
+#   flowers) and the presets and scene generator built from them.
+#   Importing this module does not open a window or initialize
+#   pygame, so scenes can be generated by worker processes, command
+#   line tools and the settings preview without any display.
+# --------------------------------------------------------------------
+
+import pygame
+import os
+import gc
+import math
+import time
+import contextlib
+import threading
+from collections import OrderedDict
+import numpy as np
+import random_stream
+import subtrees
+import draw_stats
+import color as c
+import vector
+import frame
+import occlusion
+import picking
+
+# size of a generated scene in pixels
+SCENE_WIDTH = 1000
+SCENE_HEIGHT = 800
+
+# mountain ridges are split until their segments are at most MOUNTAIN_SEGMENT pixels long, or a split would move
+# the ridge less than MOUNTAIN_TOLERANCE pixels (both divided by the detail), at most MOUNTAIN_ITERS times
+MOUNTAIN_SEGMENT = 16
+MOUNTAIN_TOLERANCE = 1
+MOUNTAIN_ITERS = 10
+
+# health create_tree2 passes on from each branch to the next two (out of 100), and the health its branches end
+# at in tree presets (divided by the detail)
+HEALTH_SPLIT = 140
+TREE_HEALTH_LIMIT = 3
+BUSH_LEN_DEC = (70, 80)  # percent of its length each branch of a bush preset passes on to the next
+
+# shared atlas of leaf and flower sprites used by the presets, None to draw leaves and flowers directly
+sprite_atlas = None
+
+# random numbers used by the generators when no other stream is passed to them
+# (a stream must only be used by one thread at a time)
+default_stream = random_stream.RandomStream()
+
+
+def set_sprite_atlas(atlas):
+    global sprite_atlas
+    sprite_atlas = atlas
+
+
+# generated trees kept for lazy trees, least recently used first (descriptor -> Tree)
+expanded_trees = OrderedDict()
+expanded_limit = 256  # most trees kept generated at once
+expanded_lock = threading.Lock()
+# generated trees of the scene being drawn for the first time (descriptor -> Tree), see keeping_scene_trees
+pinned_trees = {}
+
+
+def set_expanded_tree_limit(n):
+    global expanded_limit
+    expanded_limit = n
+
+
+# use the trees generated with a scene while it is first drawn (composited, or rendered without a window), then
+# let them go. After that its lazy trees are generated again only when needed, and kept like any other
+@contextlib.contextmanager
+def keeping_scene_trees(scene):
+    global pinned_trees
+    with expanded_lock:
+        pinned_trees = getattr(scene, "trees", {})
+    try:
+        yield
+    finally:
+        with expanded_lock:
+            pinned_trees = {}
+        if hasattr(scene, "trees"):
+            scene.trees = {}
+
+
+# shared cache of subtrees that the presets stamp matching subtrees from, None to generate every subtree
+subtree_cache = None
+
+
+def set_subtree_cache(cache):
+    global subtree_cache
+    subtree_cache = cache
+
+
+# class for easy accessing and storing of all settings variables in program
+#   with methods to be applied to buttons to easily change settings
+class Settings:
+    def __init__(self):
+        # Scene
+        # Mountain
+        self.mountain_start = SCENE_HEIGHT//2 + 50
+        self.mountain_end = SCENE_HEIGHT//2 + 100
+        self.mountain_frequency = 1
+
+        # Foreground
+        self.foreground_start = self.mountain_end
+        self.foreground_end = SCENE_HEIGHT
+        self.secondary_foreground_start = self.foreground_end - 100
+        self.bush_chance = 3  # chance of getting a bush spawn
+        self.flower_chance = 2  # chance of getting a flower
+        self.tree_chance = 3  # chance of getting a tree
+        self.seed = None  # seed of the random numbers of generated scenes, None for a different scene every time
+
+        # Leaf and flower sprites
+        self.sprite_quantization = 8  # size of colour buckets for reusing sprites (1 = exact colours)
+        self.sprite_memory = 8 * 1024 * 1024  # memory cap of the sprite atlas in bytes
+
+        # Lazy trees
+        self.expanded_trees = 256  # most trees kept generated at once, the others only keep what they are made from
+
+        # Subtree memoization
+        self.subtree_memo = False  # stamp small subtrees from cached matching subtrees instead of generating them
+        self.subtree_step = 10  # subtrees match within this percent of their size and degrees of their heading
+        self.subtree_memory = 16 * 1024 * 1024  # memory cap of the cached subtrees in bytes
+
+        # Generation budget, None for no limit. Before a scene is made its cost is estimated from its spawn plan,
+        # then the tree detail and after that the number of objects are lowered until it fits
+        self.budget_branches = None  # most branches in a scene
+        self.budget_draw_calls = None  # most lines, circles and sprites drawn for a scene
+        self.budget_seconds = None  # seconds a scene may take to generate, the detail is also lowered as it is made
+
+        # Drawing
+        self.occlusion_culling = True  # skip objects that are completely hidden by nearer objects
+
+        # Poster export
+        self.poster_scale = 4  # size of the poster as a multiple of the window size
+        self.poster_tile = 512  # size of the square tiles the poster is drawn in
+        self.poster_workers = os.cpu_count() or 1  # processes drawing tiles at the same time
+
+        # Animation
+        self.wind_strength = 1  # how far branches sway in the wind animation
+        self.wind_trees = None  # most trees that sway at once (the largest ones), the rest stay still, None for all
+        self.grow_level_time = 0.4  # seconds for each level of branches to grow in the growth animation
+        self.tree3d_spin = 20  # degrees per second the 3D tree turns until it is dragged
+
+        # Settings preview
+        self.preview_scale = 0.2  # size of the preview as a fraction of the window
+        self.preview_detail = 0.2  # fraction of the tree detail generated for the preview
+        self.preview_delay = 0.3  # seconds a slider must stay still before the preview is regenerated
+
+        # Memory report
+        self.memory_report = False  # trace memory while generating scenes and show a report over them
+
+    # return the values of the settings that change how a scene is generated
+    def scene_values(self):
+        return (self.mountain_start, self.mountain_end, self.mountain_frequency, self.foreground_start,
+                self.foreground_end, self.secondary_foreground_start, self.bush_chance, self.flower_chance,
+                self.tree_chance)
+
+    def set_mountain_start(self, b):
+        self.mountain_start = int(b.value())
+
+    def set_mountain_end(self, b):
+        self.mountain_end = int(b.value())
+        self.foreground_start = int(b.value())
+
+    def set_mountain_frequency(self, b):
+        self.mountain_frequency = int(b.value())
+
+    def set_foreground_end(self, b):
+        self.foreground_end = int(b.value())
+
+    def set_secondary_foreground_start(self, b):
+        self.secondary_foreground_start = int(b.value())
+
+    def set_bush_chance(self, b):
+        self.bush_chance = int(b.value())
+
+    def set_flower_chance(self, b):
+        self.flower_chance = int(b.value())
+
+    def set_tree_chance(self, b):
+        self.tree_chance = int(b.value())
+
+
+# abstract line class
+class Line:
+    def __init__(self, a, b):
+        self.a = a
+        self.b = b
+
+
+# surface extension to make it drawable in a draw loop
+class Surface_Drawable(pygame.Surface):
+    def draw(self, win):
+        win.blit(self, (0, 0))
+        draw_stats.blits += 1
+
+
+# flower class for storing and creating a flower
+class Flower:
+    def __init__(self, start_pos, stem_len, radius, sColor=c.GREEN, pColor=c.WHITE, cColor=c.BLACK, stem_width=1,
+                 tilt_angle=0,
+                 tilt_count=0, atlas=None, rng=None):
+        rng = rng or default_stream
+        self.stem_points = [start_pos.get(True)]
+        self.petals_center = None
+        self.radius = radius
+        self.create_stem(start_pos, stem_len, rng.spec(tilt_angle)(), tilt_count)
+        self.sColor = sColor
+        self.pColor = pColor
+        self.cColor = cColor
+        self.stem_width = stem_width
+        self.atlas = atlas  # sprite atlas for drawing the flower head, None to draw it directly
+
+    def create_stem(self, start_pos, stem_len, tilt_angle, tilt_count):
+        sec_len = stem_len / tilt_count
+        last_pos = start_pos
+        for i in range(tilt_count):
+            new_pos = last_pos.get_point_on_line(270 - tilt_angle * i, sec_len)
+            self.stem_points.append(new_pos.get(True))
+            last_pos = new_pos
+        self.petals_center = new_pos.get(True)
+
+    def draw_stem(self, win):
+        pygame.draw.lines(win, self.sColor, False, self.stem_points, self.stem_width)
+        draw_stats.draw_calls += 1
+
+    # return the (atlas sprite key, position) of the flower head, None if it has no atlas or draws nothing
+    # flowers that do not overlap can have their heads drawn together with one blits call (see layer_raster)
+    def head_key(self):
+        if self.atlas is None or self.radius <= 0:
+            return None
+        return (self.atlas.flower_head_key(self.radius, self.pColor, self.cColor),
+                (self.petals_center[0] - self.radius, self.petals_center[1] - self.radius))
+
+    def draw(self, win):
+        self.draw_stem(win)
+        if self.atlas is not None:
+            self.atlas.draw_flower_head(win, self.petals_center, self.radius, self.pColor, self.cColor)
+        else:
+            pygame.draw.circle(win, self.pColor, self.petals_center, self.radius)
+            pygame.draw.circle(win, self.cColor, self.petals_center, self.radius//2)
+            draw_stats.draw_calls += 2
+
+    # draw the flower scaled and moved (used for drawing scenes at other resolutions)
+    def draw_transformed(self, win, scale, offset):
+        center = transform_point(self.petals_center, scale, offset)
+        pygame.draw.lines(win, self.sColor, False, [transform_point(p, scale, offset) for p in self.stem_points],
+                          max(1, int(self.stem_width * scale)))
+        pygame.draw.circle(win, self.pColor, center, self.radius * scale)
+        pygame.draw.circle(win, self.cColor, center, self.radius//2 * scale)
+
+
+# mountain class for storing and creating a mountain
+class Mountain:
+    # segments are split iters times, or with a segment length (pixels) only while they are longer than that, the
+    # split could move them by at least tolerance pixels and they are inside the visible x range
+    def __init__(self, start_pos, end_pos, height, height_change, start_height, iters, color=c.GREY, rng=None,
+                 segment=None, tolerance=1, visible=None):
+        self.points = [start_pos]
+        self.iters = iters
+        self.segment = segment
+        self.tolerance = tolerance
+        self.visible = visible
+        self.create_mountain(start_pos, end_pos, height, height_change, start_height, True, rng=rng or default_stream)
+        self.points.append(end_pos)
+        self.points = [p.get(True) for p in self.points]
+        self.color = color
+
+    # return if a segment of the ridge is split again (the first split makes the peak)
+    def splits(self, start_pos, end_pos, height, count, first):
+        if count >= self.iters:
+            return False
+        if self.segment is None or first:
+            return True
+        if self.visible is not None and (end_pos.x < self.visible[0] or start_pos.x > self.visible[1]):
+            return False
+        return end_pos.x - start_pos.x > self.segment and height[1] >= self.tolerance
+
+    def create_mountain(self, start_pos, end_pos, height, height_change, start_height=None, first=False, count=0,
+                        rng=None):
+        if self.splits(start_pos, end_pos, height, count, first):
+
+            new_x = (start_pos.x + end_pos.x) / 2
+
+            if not first:
+                sign = rng.choice((-1, 1))
+                # create new point
+                new_pos = vector.Vec2(new_x,
+                                      vector.Vec2.poi(start_pos, end_pos, vector.Vec2(new_x, 0),
+                                                      vector.Vec2(new_x, 1)).y + rng.spec(height)() * sign)
+                new_h = height[0] * height_change, height[1] * height_change
+            else:
+                # create new point
+                new_pos = vector.Vec2(new_x,
+                                      vector.Vec2.poi(start_pos, end_pos, vector.Vec2(new_x, 0),
+                                                      vector.Vec2(new_x, 1)).y - rng.spec(start_height)())
+                new_h = height
+
+            # prevents points from going below the base of the mountain
+            if new_pos.y > self.points[0].y:
+                new_pos.y = self.points[0].y
+
+            # the points are added left to right, in the order the polygon is drawn
+            # create left side
+            self.create_mountain(start_pos, new_pos, new_h, height_change, count=count+1, rng=rng)
+            self.points.append(new_pos)
+            # create right side
+            self.create_mountain(new_pos, end_pos, new_h, height_change, count=count+1, rng=rng)
+
+    def draw(self, win):
+        pygame.draw.polygon(win, self.color, self.points)
+        draw_stats.draw_calls += 1
+
+    def draw_transformed(self, win, scale, offset):
+        pygame.draw.polygon(win, self.color, [transform_point(p, scale, offset) for p in self.points])
+
+
+# tree class for storing and creating a tree
+class Tree:
+    def __init__(self, start_pos, heading, current_length, end_length, current_line_list=None, angle_change=45,
+                 len_dec=0.5, width=1, width_dec=1, sColor=c.BROWN, eColor=c.DARK_GREEN, lColor="g",
+                 lCRange=(100, 255), two=False, trunk_size=None, atlas=None, health_limit=3, rng=None,
+                 subtrees=None, subtree_tint=0):
+        rng = rng or default_stream
+        self.branches = []  # list of branches
+        self.leaves = []  # list of leaves
+        self.max_level = 0  # what is the farthest branch up the tree
+        self.sColor = sColor  # start colour (trunk)
+        self.eColor = eColor  # end colour (branches at the end)
+        self.lColor = lColor  # colour code for random leaf colour
+        self.lCRange = lCRange  # colour range for darkness of leaves
+        self.trunk_size = trunk_size
+        self.atlas = atlas  # sprite atlas for drawing leaves, None to draw them directly
+        self.leaf_keys = None  # cached atlas sprite keys and positions of the leaves (not the sprites, so the
+        # atlas can free the sprites it evicts)
+        self.level_colors = []  # colour of the branches on each level
+        # small subtrees matching one in the subtree cache are stamped from it, with the values that have to match
+        # exactly in subtree_key. Subtrees are tinted towards the sky by subtree_tint (see tint_depth)
+        self.subtrees = subtrees
+        self.subtree_tint = subtree_tint
+        self.subtree_key = (two, sColor, eColor, lColor, lCRange, health_limit if two else end_length, subtree_tint)
+        self.ranges = (angle_change, len_dec, width_dec)  # random ranges, compiled again for each new subtree
+        self.new_subtrees = {}  # subtrees first generated in this tree, shared once it is finished
+        self.stamps = []  # subtrees drawn from cached subtrees
+        self.stamp_blits = None  # cached sprites and positions of the stamps
+        # ranges are compiled once into functions returning the next random value,
+        # and the leaves are added after the branches so all their random values can be drawn at once
+        ends = []  # (position, branch index) of the ends of the tree where leaves can grow
+        if two:
+            self.branches = self.create_tree2(start_pos, heading, current_length, current_line_list,
+                                              rng.spec(angle_change), len_dec, width,
+                                              health_split=rng.spec(HEALTH_SPLIT),
+                                              health_limit=health_limit, first=True, rng=rng, ends=ends)
+            self.add_leaves(ends, rng, 1, 4)
+        else:
+            self.branches = self.create_tree(start_pos, heading, current_length, end_length, current_line_list,
+                                             rng.spec(angle_change), rng.spec(len_dec), width, rng.spec(width_dec),
+                                             rng=rng, ends=ends)
+            self.add_leaves(ends, rng, 4, 6, 5)
+        self.set_branch_colors()
+
+    def draw(self, win):
+        for branch in self.branches:
+            branch.draw(win)
+        draw_stats.draw_calls += len(self.branches)
+        if self.stamps:
+            if self.stamp_blits is None:
+                self.stamp_blits = [stamp.blit() for stamp in self.stamps]
+            win.blits(self.stamp_blits, False)
+            draw_stats.blits += len(self.stamp_blits)
+        if self.atlas is not None:
+            if self.leaf_keys is None:
+                self.leaf_keys = self.atlas.leaf_keys(self.leaves)
+            self.atlas.draw_keys(win, self.leaf_keys)
+        else:
+            for leaf in self.leaves:
+                leaf.draw(win)
+            draw_stats.draw_calls += len(self.leaves)
+
+    def draw_transformed(self, win, scale, offset):
+        for branch in self.branches:
+            branch.draw_transformed(win, scale, offset)
+        for stamp in self.stamps:
+            stamp.draw_transformed(win, scale, offset)
+        for leaf in self.leaves:
+            leaf.draw_transformed(win, scale, offset)
+
+    # set branch colour depending on how far up the tree they are
+    # the gradient is worked out once per level and shared by every branch on that level
+    def set_branch_colors(self):
+        if not self.branches:
+            return
+        self.level_colors = c.gradient(self.sColor, self.eColor, self.max_level)
+        for branch in self.branches:
+            branch.set_color(self.level_colors[branch.level])
+
+    # create the branches and leaves for the tree using fractal recursion
+    # angle_change, len_dec and width_dec are functions returning the next random value (see RandomStream.spec)
+    def create_tree(self, start_pos, heading, current_length, end_length, current_line_list, angle_change,
+                    len_dec, width, width_dec, level=0, parent=None, rng=None, ends=None, memo=True):
+        if current_line_list is None:
+            current_line_list = []
+        if current_length > end_length:
+            if memo and self.subtrees is not None and level > 0 and \
+                    current_length <= end_length * self.subtrees.max_length:
+                def grow(sub_rng, origin, sizes, sub_heading, branches, sub_ends):
+                    angle, length, width_change = (sub_rng.spec(r) for r in self.ranges)
+                    self.create_tree(origin, sub_heading, sizes[0], end_length, branches, angle, length, sizes[1],
+                                     width_change, level, parent, sub_rng, sub_ends, False)
+                self.add_subtree(start_pos, heading, (level,), parent, (current_length, width), grow, (4, 6, 5))
+                return current_line_list
+            p = start_pos.get_point_on_line(heading, current_length)
+            current_line_list.append(Branch((p.x, p.y), (start_pos.x, start_pos.y), width=width, level=level,
+                                            parent=parent))
+            index = len(current_line_list) - 1
+
+            level += 1
+
+            if level > self.max_level:
+                self.max_level = level
+
+            # create left branch
+            current_line_list = self.create_tree(p, heading - angle_change(),
+                                                 current_length * len_dec() / 100, end_length,
+                                                 current_line_list, angle_change, len_dec,
+                                                 width * width_dec()/100, width_dec, level, index, rng, ends, memo)
+            # create right branch
+            current_line_list = self.create_tree(p, heading + angle_change(),
+                                                 current_length * len_dec() / 100, end_length,
+                                                 current_line_list, angle_change, len_dec,
+                                                 width * width_dec()/100, width_dec, level, index, rng, ends, memo)
+
+        else:  # when branch ends(minimum size reached) a leaf may grow here
+            ends.append((start_pos.get(True), parent))
+        return current_line_list
+
+    # second version
+    # angle_change and health_split are functions returning the next random value (see RandomStream.spec)
+    def create_tree2(self, start_pos, heading, length, current_line_list,
+                     angle_change, len_dec=50, width=1, level=0, health_split=None, health=100, health_limit=3,
+                     main_branch=True, first=False, parent=None, rng=None, ends=None, memo=True):
+        if current_line_list is None:
+            current_line_list = []
+        if health > health_limit:
+            if memo and self.subtrees is not None and not first and health <= self.subtrees.max_health:
+                def grow(sub_rng, origin, sizes, sub_heading, branches, sub_ends):
+                    self.create_tree2(origin, sub_heading, sizes[1], branches, sub_rng.spec(self.ranges[0]),
+                                      len_dec, sizes[2], level, sub_rng.spec(HEALTH_SPLIT), sizes[0], health_limit,
+                                      main_branch, first, parent, sub_rng, sub_ends, False)
+                self.add_subtree(start_pos, heading, (level, main_branch), parent, (health, length, width), grow,
+                                 (1, 4))
+                return current_line_list
+            if first and self.trunk_size is not None:
+                temp_len = self.trunk_size
+            else:
+                temp_len = length
+            p = start_pos.get_point_on_line(heading, temp_len * health/100)
+            current_line_list.append(Branch((p.x, p.y), (start_pos.x, start_pos.y), width=width, level=level,
+                                            health=health/100, parent=parent))
+            index = len(current_line_list) - 1
+
+            level += 1
+
+            if level > self.max_level:
+                self.max_level = level
+
+            h_left = health_split()  # how much health is passed onto next branches
+            h1 = rng.randrange(h_left - 100, 100)
+            h2 = h_left - h1
+
+            if main_branch:
+                m1 = h1 > h2
+                m2 = not m1
+            else:
+                m1, m2 = False, False
+
+            if main_branch:
+                if heading < 270 and h1 > h2:
+                    h1, h2 = h2, h1
+                elif heading > 270 and h2 > h1:
+                    h1, h2 = h2, h1
+
+            # create left branch
+            current_line_list = self.create_tree2(p, heading - angle_change(),
+                                                  length,
+                                                  current_line_list, angle_change, len_dec,
+                                                  width, level, health_split,
+                                                  health * h1/100, health_limit, m1, parent=index, rng=rng,
+                                                  ends=ends, memo=memo)
+            # create right branch
+            current_line_list = self.create_tree2(p, heading + angle_change(),
+                                                  length,
+                                                  current_line_list, angle_change, len_dec,
+                                                  width, level, health_split,
+                                                  health * h2/100, health_limit, m2, parent=index, rng=rng,
+                                                  ends=ends, memo=memo)
+
+        else:  # when branch ends(minimum size reached) a leaf grows here
+            ends.append((start_pos.get(True), parent))
+        return current_line_list
+
+    # add leaves to the ends of the tree with all of their random values drawn at once
+    def add_leaves(self, ends, rng, chance, max_size, recolor=0):
+        leaves = self.make_leaves(ends, rng, chance, max_size, recolor)
+        if leaves:
+            self.leaves = leaves
+
+    # return the leaves for a list of ends
+    # 1 in chance ends get a leaf, leaf sizes are below max_size and 1 in recolor leaves are bluer (0 for none)
+    def make_leaves(self, ends, rng, chance, max_size, recolor=0):
+        if chance > 1:
+            ends = [end for end, roll in zip(ends, rng.int_array(0, chance, len(ends)).tolist()) if roll == 0]
+        n = len(ends)
+        if n == 0:
+            return []
+        colors = c.random_colors(self.lCRange[0], self.lCRange[1], self.lColor, rng.int_array(50, 100, n), rng)
+        if recolor:
+            bluer = (rng.int_array(0, recolor, n) == 0).nonzero()[0].tolist()
+            blues = c.random_colors(self.lCRange[0], self.lCRange[1], "b", rng.int_array(10, 100, len(bluer)), rng)
+            for i, color in zip(bluer, blues):
+                colors[i] = color
+        sizes = rng.int_array(0, max_size, n).tolist()
+        return [Leaf(pos, color, size, parent) for (pos, parent), color, size in zip(ends, colors, sizes)]
+
+    # add a subtree that is stamped from the cached subtree of its key, generating the cached subtree first if
+    # there is none. The subtree of a key is grown from the origin at the sizes and heading the key stands for,
+    # with random numbers seeded from the key and colours from its own levels, so it is the same whichever tree
+    # grows it and a tree stamps the same subtrees whatever the cache holds. exact holds the values of the subtree
+    # (its level first) that have to match exactly besides the tree's. grow(rng, origin, sizes, heading, branches,
+    # ends) generates its branches, which get leaves made with leaf_args (see make_leaves)
+    def add_subtree(self, start_pos, heading, exact, parent, sizes, grow, leaf_args):
+        level = exact[0]
+        key, mirrored = self.subtrees.choose(self.subtree_key + exact, sizes, heading)
+        subtree = self.subtrees.find(key, self.new_subtrees)
+        if subtree is None:
+            grown_sizes, grown_heading = self.subtrees.canonical(key, len(sizes))
+            max_level, self.max_level = self.max_level, level
+            sub_rng = random_stream.RandomStream(self.subtrees.seed(key), 64)
+            branches, ends = [], []
+            grow(sub_rng, vector.Vec2(0, 0), grown_sizes, grown_heading, branches, ends)
+            leaves = self.make_leaves(ends, sub_rng, *leaf_args)
+            depth, self.max_level = self.max_level - level, max_level
+            # coloured as if the tree ended where the subtree does, which is where its small subtrees grow
+            colors = c.tint_colors(c.gradient(self.sColor, self.eColor, level + depth), self.subtree_tint)
+            for branch in branches:
+                branch.color = colors[branch.level]
+            for leaf, color in zip(leaves, c.tint_colors([leaf.color for leaf in leaves], self.subtree_tint)):
+                leaf.color = color
+            subtree = subtrees.Subtree((0, 0), grown_heading, depth, branches, leaves)
+            self.new_subtrees[key] = subtree
+        self.stamps.append(subtrees.Stamp(subtree, start_pos.get(True), heading, mirrored, parent, level))
+        self.max_level = max(self.max_level, level + subtree.depth)
+
+    # share the subtrees first generated in this tree with later trees
+    def share_subtrees(self):
+        if self.new_subtrees:
+            self.subtrees.add(self.new_subtrees)
+            self.new_subtrees = {}
+
+    # gradients the colours of the tree towards the colour of the sky depending on its depth (strength)
+    # branches only have one colour per level, so only the level colours are tinted
+    def tint_depth(self, strength):
+        self.level_colors = c.tint_colors(self.level_colors, strength)
+        for branch in self.branches:
+            branch.color = self.level_colors[branch.level]
+        for leaf, color in zip(self.leaves, c.tint_colors([leaf.color for leaf in self.leaves], strength)):
+            leaf.color = color
+        self.leaf_keys = None
+
+
+# leaf class for storing and drawing leaves
+class Leaf:
+    def __init__(self, pos, color, size, branch=None):
+        self.pos = pos
+        self.color = color
+        self.size = size
+        self.branch = branch  # index of the branch the leaf grows from (None if it grows from the root)
+
+    def draw(self, win):
+        pygame.draw.circle(win, self.color, self.pos, self.size)
+
+    def draw_transformed(self, win, scale, offset):
+        pygame.draw.circle(win, self.color, transform_point(self.pos, scale, offset), self.size * scale)
+
+
+# branch class for storing and drawing branches
+class Branch(Line):
+    def __init__(self, a, b, color=c.WHITE, width=0, level=0, health=1, parent=None):
+        super().__init__(list(map(int, a)), list(map(int, b)))
+        self.parent = parent  # index of the branch this branch grows from (None for the trunk)
+        self.color = color
+        self.width = int(width * health)
+        self.health = health
+        if self.width < 1:
+            self.width = 1
+        self.level = level
+
+    def draw(self, win):
+        pygame.draw.line(win, self.color, self.a, self.b, self.width)
+
+    def draw_transformed(self, win, scale, offset):
+        pygame.draw.line(win, self.color, transform_point(self.a, scale, offset),
+                         transform_point(self.b, scale, offset), max(1, int(self.width * scale)))
+
+    def set_color(self, color):
+        self.color = color
+
+
+# ------------------ Fractal Presets ------------------
+
+# creates and return a recursive mountain
+# its ridge has as many points as it needs to look smooth on screen (fewer for a detail below 1)
+def create_mountain(center, y, width=100, rng=None, detail=1):
+    rng = rng or default_stream
+    half_width = width//2
+    height = rng.randrange(50, 150)/100 * half_width
+    variation = rng.randrange(5, 20), rng.randrange(20, 40)
+    return Mountain(vector.Vec2(center - half_width, y), vector.Vec2(center + half_width, y), variation, 0.8, height,
+                    MOUNTAIN_ITERS, c.grey(rng.randrange(50, 200)), rng, MOUNTAIN_SEGMENT / detail,
+                    MOUNTAIN_TOLERANCE / detail, (0, SCENE_WIDTH))
+
+
+# creates and return a recursive tree
+# detail below 1 stops the recursion early (for small previews)
+def create_tree(x, y, final_y, detail=1, rng=None):
+    rng = rng or default_stream
+    ratio = (y-200) / (final_y-200)
+    width = 10 * ratio
+    start_len = 40 * ratio
+    trunk_len = rng.randrange(40, 70) * ratio
+    t = Tree(vector.Vec2(x, y), 270, start_len, 5, len_dec=(70, 80), angle_change=(10, 40), width=width,
+             width_dec=(80, 90), two=True, lColor=rng.choice(["r", "g", "rg"]), trunk_size=trunk_len,
+             atlas=sprite_atlas, health_limit=TREE_HEALTH_LIMIT / detail, rng=rng, subtrees=subtree_cache,
+             subtree_tint=round(1 - (y-350) / (final_y-350), 1))
+    t.tint_depth(1 - (y-350) / (final_y-350))
+    t.share_subtrees()
+    return t
+
+
+# creates and returns a recursive bush
+def create_bush(x, y, final_y, detail=1, rng=None):
+    ratio = (y - 400) / (final_y - 400)
+    width = 10 * ratio
+    start_len = 20 * ratio
+    b = Tree(vector.Vec2(x, y), 270, start_len, 2 / detail, len_dec=BUSH_LEN_DEC, angle_change=(40, 80), width=width,
+             width_dec=90, sColor=c.DARKER_GREEN, eColor=c.DARK_GREEN, lColor="g", lCRange=(50, 100),
+             atlas=sprite_atlas, rng=rng, subtrees=subtree_cache)
+    b.share_subtrees()
+    return b
+
+
+# creates and returns a flower
+def create_flower(x, y, final_y, rng=None):
+    rng = rng or default_stream
+    ratio = (y - 400) / (final_y - 400)
+    stem_len = 40 * ratio
+    radius = int(15 * ratio)
+    f = Flower(vector.Vec2(x, y), stem_len, radius, pColor=c.random_any_color(100, rng=rng),
+               cColor=c.random_any_color(100, rng=rng), stem_width=3, tilt_angle=(-15, 15), tilt_count=5,
+               atlas=sprite_atlas, rng=rng)
+    return f
+
+
+# ------------------ Lazy Trees ------------------
+
+# a tree or bush stored only as what it is generated from: its preset (TREE or BUSH), position, detail and seed
+# the branches and leaves are generated from these whenever they are needed (drawing, picking, exporting), and
+# only the most recently used generated trees are kept (the ones made with a scene until it is first drawn).
+# Its bounding box and the shapes it is culled with are stored when it is made; the attributes in FORWARDED are read
+# from the generated tree.
+class LazyTree:
+    __slots__ = ("preset", "x", "y", "detail", "seed", "box", "cover")
+    # attributes of the generated tree read by other modules, any other is missing, so probing a lazy tree
+    # with hasattr never generates it
+    FORWARDED = frozenset(("branches", "leaves", "stamps", "max_level", "atlas"))
+
+    def __init__(self, preset, x, y, detail, seed):
+        self.preset = preset
+        self.x = x
+        self.y = y
+        self.detail = detail
+        self.seed = seed
+        self.box = None  # bounding box of the generated tree (see occlusion.bounding_box)
+        self.cover = None  # thick branches and large leaves of the generated tree (see occlusion.cover_shapes)
+
+    def descriptor(self):
+        return self.preset, self.x, self.y, self.detail, self.seed
+
+    # return the generated tree, generating it again if it is no longer kept
+    def expand(self):
+        key = self.descriptor()
+        with expanded_lock:
+            tree = pinned_trees.get(key)
+            if tree is not None:
+                return tree
+            tree = expanded_trees.get(key)
+            if tree is not None:
+                expanded_trees.move_to_end(key)
+                return tree
+        tree = self.generate()
+        with expanded_lock:
+            expanded_trees[key] = tree
+            while len(expanded_trees) > expanded_limit:
+                expanded_trees.popitem(last=False)
+        return tree
+
+    # return the generated tree if it is kept, None otherwise (it is not generated)
+    def kept(self):
+        key = self.descriptor()
+        with expanded_lock:
+            tree = pinned_trees.get(key)
+            return tree if tree is not None else expanded_trees.get(key)
+
+    # generate the tree without keeping it
+    def generate(self):
+        create = create_tree if self.preset == TREE else create_bush
+        with paused_gc():
+            return create(self.x, self.y, SCENE_HEIGHT, self.detail, random_stream.RandomStream(self.seed, 256))
+
+    def draw(self, win):
+        self.expand().draw(win)
+
+    def draw_transformed(self, win, scale, offset):
+        self.expand().draw_transformed(win, scale, offset)
+
+    def __getattr__(self, name):
+        # the descriptor itself (while it is being unpickled) is never read from the tree
+        if name not in LazyTree.FORWARDED:
+            raise AttributeError(name)
+        return getattr(self.expand(), name)
+
+
+# ------------------ Scene Generation ------------------
+
+# kinds of objects in a spawn plan, in the order they are drawn on the same row
+MOUNTAIN = 0
+BUSH = 1
+FLOWER = 2
+TREE = 3
+
+# one planned object: the row (y coordinate/depth) it stands on, its x coordinate, its kind,
+# its size compared to the same object at the front of the scene, and its width (mountains only)
+SPAWN_DTYPE = np.dtype([("row", np.int32), ("x", np.int32), ("kind", np.int8), ("ratio", np.float64),
+                        ("width", np.int32)])
+
+
+# layers of a generated scene, back to front: the kind of object in the layer (None for the sky and
+# ground) and the settings it depends on. A layer is only generated again when one of them changes.
+SCENE_LAYERS = [("ground", None, ("mountain_start",)),
+                ("mountains", MOUNTAIN, ("mountain_start", "mountain_end", "mountain_frequency")),
+                ("bushes", BUSH, ("foreground_start", "foreground_end", "secondary_foreground_start", "bush_chance")),
+                ("flowers", FLOWER, ("foreground_start", "foreground_end", "secondary_foreground_start",
+                                     "flower_chance")),
+                ("trees", TREE, ("foreground_start", "foreground_end", "tree_chance"))]
+
+
+# objects of one layer of a generated scene
+class SceneLayer:
+    def __init__(self, name, values, seed, detail, plan, drawables, boxes):
+        self.name = name
+        self.values = values  # values of the settings the layer depends on
+        self.seed = seed  # seed of the layer's random stream
+        self.detail = detail
+        self.plan = plan  # SPAWN_DTYPE rows of the objects, in drawing order
+        self.drawables = drawables
+        self.boxes = boxes  # bounding box of every object
+        self.raster = None  # drawn pixels and depths of the layer (see layer_raster), made when first needed
+
+    # return if the layer can be kept for a scene with these values, seed and detail
+    def matches(self, values, seed, detail):
+        return self.values == values and self.seed == seed and self.detail == detail
+
+
+# plan where every object of one kind goes, with all the spawn rolls of the layer drawn at once
+# returns a table of SPAWN_DTYPE rows in drawing order (back to front)
+def plan_layer(s, kind, rng):
+    if kind == MOUNTAIN:
+        rows = np.arange(s.mountain_start, s.mountain_end, s.mountain_frequency)
+        plan = np.zeros(len(rows), SPAWN_DTYPE)
+        plan["row"] = rows
+        plan["x"] = rng.int_array(0, SCENE_WIDTH, len(rows))
+        plan["kind"] = MOUNTAIN
+        plan["ratio"] = 1
+        plan["width"] = rng.int_array(100, 800, len(rows))
+        return plan
+
+    # trees, bushes, flowers (bushes and flowers only grow near the front)
+    rows = np.arange(s.foreground_start, s.foreground_end)
+    if kind != TREE:
+        rows = rows[rows > s.secondary_foreground_start]
+    chance = {BUSH: s.bush_chance, FLOWER: s.flower_chance, TREE: s.tree_chance}[kind]
+    rows = rows[rng.int_array(0, chance, len(rows)) == 0]
+    plan = np.zeros(len(rows), SPAWN_DTYPE)
+    plan["row"] = rows
+    plan["x"] = rng.int_array(0, SCENE_WIDTH, len(rows))
+    plan["kind"] = kind
+    # the same ratios the presets scale their objects by
+    plan["ratio"] = (rows - 200) / (SCENE_HEIGHT - 200) if kind == TREE else (rows - 400) / (SCENE_HEIGHT - 400)
+    return plan
+
+
+# create one planned object
+# trees and bushes are lazy trees with their own seed, generated now to store their bounding box, the generated
+# trees are put in trees (descriptor -> Tree) if it is given, instead of the kept lazy trees
+# (with lazy False the generated trees themselves are returned)
+def create_planned(kind, x, row, width, detail, rng, lazy=True, trees=None):
+    if kind == MOUNTAIN:
+        return create_mountain(x, row, width, rng, detail)
+    if kind == FLOWER:
+        return create_flower(x, row, SCENE_HEIGHT, rng)
+    tree = LazyTree(kind, x, row, detail, rng.randrange(0, 2 ** 31))
+    generated = tree.generate()
+    if not lazy:
+        return generated
+    tree.box = occlusion.bounding_box(generated)
+    tree.cover = occlusion.cover_shapes(generated)
+    if trees is not None:
+        trees[tree.descriptor()] = generated
+    return tree
+
+
+# return the order the objects of all layers are drawn in: mountains first, then back to front
+# (objects on the same row are drawn bushes, flowers, trees)
+def drawing_order(plan):
+    mountains = plan["kind"] == MOUNTAIN
+    # the group key keeps mountains behind everything, as they always were, whatever their rows
+    return np.lexsort((plan["kind"], plan["row"], ~mountains))
+
+
+# generate the forest and mountain range scene for a set of settings
+# progress(current_task, total_tasks) is called after every object, returning True stops generation (returns None)
+# detail below 1 makes trees and bushes with fewer branches
+# every layer has its own random stream, seeded from the seed setting (a new seed when it is None) and the layer
+# previous is an earlier generated scene, whose layers are kept when their settings, seed and detail are the same
+# rng is a single random stream to generate every layer from instead (nothing can then be kept)
+# with a generation budget in the settings, the detail and number of objects are lowered to fit it
+# (scene.budget tells what was lowered)
+# lazy False makes trees and bushes that are generated trees rather than lazy trees, so a scene that is thrown away
+# soon (a preview) does not push the trees of the scene on screen out of the kept lazy trees
+def generate_scene(s, progress=None, detail=1, rng=None, previous=None, lazy=True):
+    seed = s.seed
+    if seed is None:
+        seed = getattr(previous, "seed", None)
+    if seed is None:
+        seed = int(np.random.SeedSequence().entropy % 2 ** 32)
+    if rng is not None:
+        previous = None
+    kept = getattr(previous, "scene_layers", {})
+
+    # plan every layer of objects, then fit the plans to the budget
+    plans = {}  # layer name -> (random stream, plan)
+    for i, (name, kind, depends) in enumerate(SCENE_LAYERS):
+        if kind is not None:
+            layer_rng = rng or random_stream.RandomStream([seed, i])
+            plans[name] = (layer_rng, plan_layer(s, kind, layer_rng))
+    budget = SceneBudget(s.budget_branches, s.budget_draw_calls, s.budget_seconds)
+    if budget.limited():
+        fitted, detail = budget.fit([(name, plan) for name, (layer_rng, plan) in plans.items()], detail)
+        plans = dict((name, (layer_rng, plan)) for (name, (layer_rng, old)), plan in zip(plans.items(), fitted))
+
+    # find the layers that have to be made again
+    layers = {}
+    planned = []
+    for i, (name, kind, depends) in enumerate(SCENE_LAYERS):
+        values = tuple(getattr(s, setting) for setting in depends)
+        layer_seed = [seed, i]
+        if kind is not None:
+            values += (len(plans[name][1]),)  # fewer objects when the budget thinned them out
+        if name in kept and kept[name].matches(values, layer_seed, detail):
+            layers[name] = kept[name]
+        elif kind is None:
+            bg = Surface_Drawable((SCENE_WIDTH, SCENE_HEIGHT))
+            bg.fill(c.SKY)
+            pygame.draw.rect(bg, c.DARK_GREEN, (0, s.mountain_start, SCENE_WIDTH, SCENE_HEIGHT - s.mountain_start))
+            layers[name] = SceneLayer(name, values, layer_seed, detail, np.zeros(0, SPAWN_DTYPE), [bg], [None])
+        else:
+            planned.append((name, values, layer_seed) + plans[name])
+
+    total_tasks = sum(len(plan) for name, values, layer_seed, layer_rng, plan in planned)
+    current_task = 0
+    trees = {}  # descriptor -> generated tree of every new lazy tree, kept until the scene is first drawn
+    budget.start(np.concatenate([plan for name, values, layer_seed, layer_rng, plan in planned] +
+                                [np.zeros(0, SPAWN_DTYPE)]), detail,
+                 sum(len(plan) for layer_rng, plan in plans.values()))
+    with paused_gc():
+        for name, values, layer_seed, layer_rng, plan in planned:
+            drawables = []
+            boxes = []
+            for row, x, kind, ratio, width in plan.tolist():
+                object_detail = budget.next_detail()
+                if object_detail is None:  # the deadline passed, the rest of the objects are not made
+                    break
+                d = create_planned(kind, x, row, width, object_detail, layer_rng, lazy, trees)
+                drawables.append(d)
+                boxes.append(occlusion.bounding_box(d))
+                current_task += 1
+                if progress is not None and progress(current_task, total_tasks):  # to exit program from loading screen
+                    return
+            if budget.changed():
+                # not all made at the same detail, so never kept for a later scene
+                plan = plan[:len(drawables)]
+                values = None
+            layers[name] = SceneLayer(name, values, layer_seed, detail, plan, drawables, boxes)
+        # still with the collector paused, which would otherwise go over every object just made while the scene is
+        # culled and indexed (in the time of the budget)
+        return finish_scene(s, seed, layers, trees, budget)
+
+
+# put the layers of a generated scene together into the scene: every object in drawing order, culled (if the budget
+# leaves time for it) and indexed for picking. trees holds the generated trees of the new lazy trees
+def finish_scene(s, seed, layers, trees, budget):
+    # every object of the scene in drawing order, with its bounding box and the parameters it was generated with
+    names = [name for name in SPAWN_DTYPE.names if name != "kind"]
+    object_layers = [layers[name] for name, kind, depends in SCENE_LAYERS if kind is not None]
+    objects = [(d, box, p) for layer in object_layers for d, box, p in zip(layer.drawables, layer.boxes, layer.plan)]
+    plan = np.concatenate([layer.plan for layer in object_layers])
+    order = drawing_order(plan)
+    plan = plan[order]
+    objects = [objects[i] for i in order.tolist()]
+    drawables = [d for d, box, p in objects]
+    info = dict((id(d), (box, dict((name, p[name].item()) for name in names))) for d, box, p in objects)
+
+    bg = layers["ground"].drawables[0]
+    stats = None
+    if s.occlusion_culling and budget.can_cull(len(drawables)):
+        drawables, stats = occlusion.cull(drawables, SCENE_WIDTH, SCENE_HEIGHT, boxes=[box for d, box, p in objects])
+
+    scene = frame.Frame([bg] + drawables)
+    scene.ground_y = s.mountain_start
+    scene.occlusion_stats = stats
+    scene.budget = budget
+    scene.plan = plan  # where every object was placed, before culling
+    scene.seed = seed
+    scene.scene_layers = layers  # objects of each layer, kept by the next scene generated from this one
+    # generated trees of the new lazy trees drawn, until the scene is first drawn (see keeping_scene_trees)
+    scene.trees = dict((d.descriptor(), trees[d.descriptor()]) for d in drawables
+                       if isinstance(d, LazyTree) and d.descriptor() in trees)
+    scene.index = picking.SceneIndex(drawables, SCENE_WIDTH, SCENE_HEIGHT, params=[info[id(d)][1] for d in drawables],
+                                     boxes=[info[id(d)][0] for d in drawables])
+    return scene
+
+
+# generate a small scene for the settings preview in a background thread
+def generate_preview(s, cancelled):
+    scene = generate_scene(s, lambda current_task, total_tasks: cancelled(), s.preview_detail, lazy=False)
+    if scene is None:
+        return
+    return scene.drawables[1:], scene.ground_y
+
+
+# create the tree scene associated
+# progress(current_task, total_tasks) is called after every object, returning True stops creation (returns None)
+def create_fractal_screen(rng=None, progress=None):
+    rng = rng or default_stream
+    floor = 600
+    tree = create_tree(550, floor, 600, rng=rng)
+    if progress is not None and progress(1, 3):
+        return
+    tree2 = create_bush(800, floor, 600, rng=rng)
+    if progress is not None and progress(2, 3):
+        return
+    mountain = create_mountain(250, floor, rng.randrange(200, 500), rng)
+    if progress is not None and progress(3, 3):
+        return
+    bg = Surface_Drawable((SCENE_WIDTH, SCENE_HEIGHT))
+    bg.fill(c.SKY)
+    pygame.draw.rect(bg, c.DARK_GREEN, (0, floor, SCENE_WIDTH, SCENE_HEIGHT - floor))
+    scene = frame.Frame([bg, mountain, tree, tree2])  # frame for showing a few trees
+    scene.ground_y = floor
+    scene.index = picking.SceneIndex([mountain, tree, tree2], SCENE_WIDTH, SCENE_HEIGHT)
+    return scene
+
+
+# ------------------ Generation Budget ------------------
+
+TREE_BRANCHES = 3240  # mean branches of a tree preset at detail 1 (measured over 60 trees)
+BUSH_BRANCHES = 326  # mean branches of a bush preset at the front of the scene at detail 1 (measured over 60 bushes)
+BRANCHES_PER_SECOND = 100000  # about how many branches are made in a second, until the real rate is measured
+RATE_PRIOR = 0.05  # seconds of generation at BRANCHES_PER_SECOND the measured rate starts from
+MIN_DETAIL = 0.1  # lowest detail a budget lowers trees and bushes to, after that fewer objects are made
+FINISH_BRANCHES = 40  # work (in branches made) of culling and indexing each object once the objects are made
+# time of the collection the garbage collector makes over the new objects when it is turned back on after
+# generation, as a share of the generation time (measured at 0.13 to 0.17)
+COLLECT_SHARE = 0.2
+# time taken to make a mountain and a flower, as the number of branches made in the same time (measured)
+MOUNTAIN_WORK = 25
+FLOWER_WORK = 5
+
+
+# return the exponent p the number of branches of create_tree2 grows with, as (health / health_limit) ** p
+# a branch passes split percent of its health on to two branches, each getting a share from (split - 100) to
+# 100 percent of it, so the branch count N(h) = 1 + N(a h) + N(b h) grows as h ** p where E[a ** p + b ** p] = 1
+def health_exponent(split=HEALTH_SPLIT):
+    low = (split - 100) / 100
+
+    # E[a ** p + b ** p] with both shares uniform from low to 1, it falls as p grows
+    def expected(p):
+        return 2 * (1 - low ** (p + 1)) / ((p + 1) * (1 - low))
+
+    lo, hi = 0, 16
+    for i in range(40):
+        mid = (lo + hi) / 2
+        if expected(mid) > 1:
+            lo = mid
+        else:
+            hi = mid
+    return lo
+
+
+# return the exponent q the number of branches of create_tree grows with, as (start_length / end_length) ** q
+# every level doubles the branches and shortens them by len_dec percent, on average by exp(E[log(len_dec)])
+def length_exponent(len_dec=BUSH_LEN_DEC):
+    low, high = len_dec[0] / 100, len_dec[1] / 100
+    mean_log = (high * math.log(high) - low * math.log(low)) / (high - low) - 1
+    return math.log(2) / -mean_log
+
+
+TREE_EXPONENT = health_exponent()
+BUSH_EXPONENT = length_exponent()
+
+
+# return the estimated branches, draw calls and work (branches, or the number of branches made in the same
+# time) of every planned object at a detail
+def planned_costs(plan, detail):
+    kind = plan["kind"]
+    branches = np.zeros(len(plan))
+    # tree presets end their branches at TREE_HEALTH_LIMIT / detail health
+    branches[kind == TREE] = TREE_BRANCHES * detail ** TREE_EXPONENT
+    # bush presets shorten their branches from 20 * ratio pixels down to 2 / detail
+    bushes = kind == BUSH
+    lengths = np.maximum(plan["ratio"][bushes] * detail * 10, 1)
+    branches[bushes] = BUSH_BRANCHES * (lengths ** BUSH_EXPONENT - 1) / (10 ** BUSH_EXPONENT - 1)
+    # a leaf grows at every end of a tree and about a quarter of the ends of a bush, a flower is a stem and two circles
+    leaves = np.where(kind == TREE, branches + 1, (branches + 1) / 4)
+    calls = np.where((kind == TREE) | (kind == BUSH), branches + leaves, np.where(kind == FLOWER, 3, 1))
+    work = branches + np.select([kind == MOUNTAIN, kind == FLOWER], [MOUNTAIN_WORK, FLOWER_WORK], 0)
+    return branches, calls, work
+
+
+# limits on the cost of generating a scene (None for no limit), and what was lowered to keep to them
+class SceneBudget:
+    def __init__(self, max_branches=None, max_draw_calls=None, seconds=None):
+        self.max_branches = max_branches
+        self.max_draw_calls = max_draw_calls
+        self.seconds = seconds
+        self.degradations = []  # descriptions of what was lowered to fit the budget, in the order it was lowered
+        self.estimate = None  # estimated (branches, draw calls) of the scene as planned
+        self.fitted = None  # estimated (branches, draw calls) after fitting the plan to the budget
+        self.plan = None  # objects being made (see start)
+        self.detail = None
+        self.lowered = None  # index in degradations of the detail lowered while making the objects
+
+    def limited(self):
+        return self.max_branches is not None or self.max_draw_calls is not None or self.seconds is not None
+
+    # return how many times over the budget planned objects are at a detail (at most 1 when they fit)
+    def overrun(self, plan, detail):
+        seconds = self.seconds
+        limits = zip(planned_costs(plan, detail), (self.max_branches, self.max_draw_calls,
+                                                    None if seconds is None else seconds * BRANCHES_PER_SECOND))
+        return max([cost.sum() / max(limit, 1) for cost, limit in limits if limit is not None], default=0)
+
+    # lower the detail, then leave out evenly spread objects of every layer, until the estimated cost fits
+    # plans is a list of (layer name, plan), returns the plans that fit and the detail to make them at
+    def fit(self, plans, detail):
+        plan = np.concatenate([p for name, p in plans])
+        self.estimate = tuple(int(cost.sum()) for cost in planned_costs(plan, detail)[:2])
+        if self.overrun(plan, detail) > 1 and detail > MIN_DETAIL:
+            low, high = MIN_DETAIL, detail
+            for i in range(20):
+                mid = (low + high) / 2
+                if self.overrun(plan, mid) > 1:
+                    high = mid
+                else:
+                    low = mid
+            self.degradations.append("detail %g -> %.2f" % (detail, low))
+            detail = low
+
+        over = self.overrun(plan, detail)
+        if over > 1:
+            # costs add up over the objects, so keeping 1 / over of every layer fits
+            fitted = []
+            for name, p in plans:
+                keep = int(len(p) / over)
+                if keep < len(p):
+                    self.degradations.append("%s %d -> %d" % (name, len(p), keep))
+                    p = p[np.linspace(0, len(p) - 1, keep).round().astype(np.int64)]
+                fitted.append((name, p))
+            plans = fitted
+            plan = np.concatenate([p for name, p in plans])
+        self.fitted = tuple(int(cost.sum()) for cost in planned_costs(plan, detail)[:2])
+        return [p for name, p in plans], detail
+
+    # start timing the making of planned objects (in the order they are made) at a detail
+    # objects is how many objects the scene has with the ones of kept layers, which are all culled and indexed after
+    # the planned objects are made (the time that takes is kept free before the deadline)
+    def start(self, plan, detail, objects=None):
+        self.plan = plan
+        self.detail = detail
+        self.work = np.cumsum(planned_costs(plan, detail)[2])  # estimated work up to and including each object
+        self.finish_kept = FINISH_BRANCHES * (len(plan) if objects is None else objects - len(plan))
+        self.rate = BRANCHES_PER_SECOND  # branches made per second, measured as objects are made
+        self.deadline = None if self.seconds is None else self.seconds / (1 + COLLECT_SHARE)  # before collection
+        self.made = 0
+        self.stopped = False
+        self.started = time.perf_counter()
+
+    # return the detail to make the next planned object at, None once the deadline has passed (it is not made)
+    # the time the rest will take is projected from how fast the objects so far were made, and if that
+    # passes the deadline the detail of the rest is lowered to fit. Both keep time for culling and indexing, and for
+    # the collection of the new objects once the garbage collector is turned back on
+    def next_detail(self):
+        i = self.made
+        if self.seconds is None:
+            self.made += 1
+            return self.detail
+        if self.stopped:
+            return None
+        elapsed = time.perf_counter() - self.started
+        done = self.work[i - 1] if i else 0
+        self.rate = rate = (done + BRANCHES_PER_SECOND * RATE_PRIOR) / (elapsed + RATE_PRIOR)
+        if elapsed + (self.finish_kept + FINISH_BRANCHES * i) / rate > self.deadline:
+            self.stopped = True
+            self.degradations.append("stopped at the %gs deadline with %d of %d objects made" %
+                                     (self.seconds, i, len(self.plan)))
+            return None
+
+        finish = self.finish_kept + FINISH_BRANCHES * len(self.plan)
+        if elapsed + (self.work[-1] - done + finish) / rate > self.deadline and self.detail > MIN_DETAIL:
+            # fit the rest into most of the time left, so it is not lowered again for every object
+            rest = self.plan[i:]
+            allowed = (self.deadline - elapsed) * rate * 0.9 - finish
+            low, high = MIN_DETAIL, self.detail
+            for j in range(20):
+                mid = (low + high) / 2
+                if planned_costs(rest, mid)[2].sum() > allowed:
+                    high = mid
+                else:
+                    low = mid
+            self.detail = low
+            self.work[i:] = done + np.cumsum(planned_costs(rest, low)[2])
+            lowered = "detail lowered to %.2f from object %d of %d" % (low, i + 1, len(self.plan))
+            if self.lowered is None:
+                self.lowered = len(self.degradations)
+                self.degradations.append(lowered)
+            else:
+                self.degradations[self.lowered] = lowered
+        self.made += 1
+        return self.detail
+
+    # return if there is time left before the deadline to cull a number of objects, which are not culled otherwise
+    # (a scene that is not culled looks the same, it only takes longer to draw)
+    def can_cull(self, objects):
+        if self.seconds is None or self.plan is None:
+            return True
+        elapsed = time.perf_counter() - self.started
+        if elapsed + objects * FINISH_BRANCHES / self.rate <= self.deadline:
+            return True
+        self.degradations.append("occlusion culling skipped %.2fs into the %gs deadline" % (elapsed, self.seconds))
+        return False
+
+    # return if the objects were not all made at the detail they were started at
+    def changed(self):
+        return self.stopped or self.lowered is not None
+
+    def __str__(self):
+        if self.estimate is None:
+            return "no budget"
+        text = "estimated %d branches, %d draw calls" % self.estimate
+        if not self.degradations:
+            return text + " (within budget)"
+        return text + ", lowered to fit the budget: " + ", ".join(self.degradations)
+
+
+# ------------------ Other Functions ------------------
+
+# pause the cyclic garbage collector while scene objects are made
+# they hold no reference cycles, and its full collections over the growing scene took about a third
+# of the generation time. The collector is process wide, so it is only paused from the main thread
+# (generation in other threads runs with it as it is), and turned back on afterwards if it was on.
+@contextlib.contextmanager
+def paused_gc():
+    if threading.current_thread() is not threading.main_thread():
+        yield
+        return
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if enabled:
+            gc.enable()
+
+
+# return a point scaled and then moved by an offset
+def transform_point(p, scale, offset):
+    return p[0] * scale + offset[0], p[1] * scale + offset[1]
+
+
+# passed an integer or list/tuple of 2 intergers.
+# Will either return an integer or a random value from range of list/tuple
+def random_if_range(a, rng=None):
+    return (rng or default_stream).spec(a)()
+
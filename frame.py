@@ -9,29 +9,129 @@
 
 import button
 import pygame
+import draw_stats
+
+
+# named group of drawables of a frame, composited once and only redrawn when it changes
+class Layer:
+    # state() returns a value that changes whenever the drawables would draw differently and is checked
+    # every frame (None for a layer that only changes when invalidate() is called)
+    # a live layer changes every frame (animations), it is never cached
+    def __init__(self, name, drawables, state=None, live=False):
+        self.name = name
+        self.drawables = drawables
+        self.state = state
+        self.live = live
+        self.last_state = None
+        self.dirty = True
+
+    def invalidate(self):
+        self.dirty = True
+
+    # return if the layer has to be redrawn
+    def changed(self):
+        if self.state is not None:
+            state = self.state()
+            if state != self.last_state:
+                self.last_state = state
+                self.dirty = True
+        return self.dirty or self.live
+
+    def draw(self, win):
+        for d in self.drawables:
+            d.draw(win)
+        self.dirty = False
 
 
 # frame class for storing and processing current drawables and buttons
+# a frame made with layers keeps the composite of each layer and everything under it, so only the
+# first layer that changed and the layers over it are redrawn (layers that change often go on top)
 class Frame:
-    def __init__(self, drawables, button_list=None, fill=(255, 255, 255)):
+    def __init__(self, drawables, button_list=None, fill=(255, 255, 255), layers=None):
+        self.layers = layers
+        if layers is not None:
+            drawables = [d for layer in layers for d in layer.drawables]
         self.drawables = drawables
         if button_list is None:
             button_list = []
         self.button_lists = button_list
         self.fill = fill
+        self.index = None  # spatial index of the drawables for picking, None if they can not be picked
+        self.composites = []  # surface for each layer with it and all layers under it drawn
+        self.valid = 0  # number of composites that are up to date
 
     def draw(self, win):
-        win.fill(self.fill)
-        for d in self.drawables:
-            d.draw(win)
+        if self.layers is None:
+            win.fill(self.fill)
+            for d in self.drawables:
+                d.draw(win)
+            return
+
+        changed = [layer.changed() for layer in self.layers]
+        first = changed.index(True) if True in changed else len(self.layers)
+        i = min(first, self.valid, self.composite_count(win))
+        # redraw the composites from the first changed layer up to the first live layer
+        while i < len(self.layers) and not self.layers[i].live:
+            surf = self.composites[i]
+            if i == 0:
+                surf.fill(self.fill)
+            else:
+                surf.blit(self.composites[i - 1], (0, 0))
+                draw_stats.blits += 1
+            self.layers[i].draw(surf)
+            i += 1
+        self.valid = i
+
+        if i == 0:
+            win.fill(self.fill)
+        else:
+            win.blit(self.composites[i - 1], (0, 0))
+            draw_stats.blits += 1
+        for layer in self.layers[i:]:  # live layers and everything over them
+            layer.draw(win)
+
+    # make sure every layer has a composite surface in the size and pixel format of the window,
+    # returning how many are still up to date
+    def composite_count(self, win):
+        size = win.get_size()
+        if self.composites and self.composites[0].get_size() != size:
+            self.composites = []
+            self.valid = 0
+        while len(self.composites) < len(self.layers):
+            self.composites.append(pygame.Surface(size, 0, win))
+        return self.valid
+
+    # return a layer given its name
+    def get_layer(self, name):
+        for layer in self.layers:
+            if layer.name == name:
+                return layer
+
+    # mark a layer (or every layer) as changed, for changes its state does not show
+    def invalidate(self, name=None):
+        if self.layers is None:
+            return
+        for layer in self.layers:
+            if name is None or layer.name == name:
+                layer.invalidate()
 
     # process buttons
     def process_events(self, click_bool, release_bool, mousepos):
         for button_list in self.button_lists:
             button_list.process_events(click_bool, release_bool, mousepos)
 
+    # return the index entry of the top-most object at a point (entry.drawable is the object),
+    # None if there is no object there or the frame has no index
+    def pick(self, x, y):
+        if self.index is None:
+            return None
+        return self.index.pick(x, y)
+
     def add(self, drawable):
         self.drawables.append(drawable)
+        if self.layers is not None:  # added to the top layer
+            self.layers[-1].drawables.append(drawable)
+            self.layers[-1].invalidate()
 
     # return surface object with the current screen of the frame
     def get_screen(self, w, h):
@@ -11,8 +11,8 @@
 import pygame
 import label
 import button
+import draw_stats
 
-pygame.init()
 
 # colours
 WHITE = (255, 255, 255)
@@ -56,6 +56,7 @@ class Grid:
 
             for p in self.points:
                 pygame.draw.rect(win, self.color, (p[0], p[1], self.cWidth, self.cHeight), 1)
+            draw_stats.draw_calls += 1 + len(self.points)
 
     # return cell index, given the position of the cell in the grid
     def get_cell_index(self, x, y):
@@ -140,9 +141,14 @@ class Menu(Grid):
     def draw(self, win):
         if self.visible_lines:
             pygame.draw.rect(win, self.color, self.rect, 1)
+            draw_stats.draw_calls += 1
         if self.visible:
             self.button_list.draw(win)
 
+    # return a value that changes whenever the menu would be drawn differently
+    def state(self):
+        return self.visible_lines and self.color, self.visible and self.button_list.state()
+
     # return button position (column, row) given the button
     def get_button_pos(self, b):
         ind = self.get_button_ind(b)
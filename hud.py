@@ -0,0 +1,129 @@
+# --------------------------------------------------------------------
+# Program: Frame Time HUD
+# Date: Oct 19 2026
+# Description: On-screen readout of how the main loop is doing: FPS,
+#   a histogram of the last frame times, draw calls and blits of the
+#   last frame, time spent processing events and redrawing, and the
+#   font and text cache hit rates. Frame times are kept in ring
+#   buffers and numbers are drawn from digit glyphs rendered once, so
+#   showing it costs a few blits and rectangles a frame.
+# --------------------------------------------------------------------
+
+import time
+import numpy as np
+import pygame
+import label
+import draw_stats
+
+# upper edges of the histogram buckets in milliseconds (the last bucket holds everything slower)
+BUCKET_EDGES = (4, 8, 12, 17, 20, 25, 33, 40, 50, 67, 100, 200)
+GLYPHS = "0123456789."
+
+
+# ring buffer of the last values of a measure
+class Ring:
+    def __init__(self, size):
+        self.values = np.zeros(size)
+        self.count = 0  # values added, the newest is at (count - 1) % size
+
+    def add(self, value):
+        self.values[self.count % len(self.values)] = value
+        self.count += 1
+
+    # return the values held, in no particular order
+    def held(self):
+        return self.values[:min(self.count, len(self.values))]
+
+    def last(self):
+        return self.values[(self.count - 1) % len(self.values)] if self.count else 0
+
+
+# toggleable drawable with the frame time readout, drawn over everything as the last thing of a frame
+# it is drawn with its top left corner at (x, y), or in the bottom right corner of the window if they are None
+class HUD:
+    def __init__(self, x=None, y=None, samples=240):
+        self.x = x
+        self.y = y
+        self.visible = False
+        self.intervals = Ring(samples)  # seconds between the ends of frames
+        self.event_times = Ring(samples)  # seconds processing events
+        self.redraw_times = Ring(samples)  # seconds redrawing
+        self.last_end = None
+        self.draw_calls = 0  # counts of the last frame drawn before the HUD
+        self.blits = 0
+        self.counted = (draw_stats.draw_calls, draw_stats.blits)  # counters after the HUD was last drawn
+        self.glyphs = None  # digit glyphs, rendered when the HUD is first shown
+
+    # render every text once, numbers are drawn a digit glyph at a time
+    def render(self):
+        font = label.get_font("lucida console", 12)
+        self.glyphs = dict((ch, font.render(ch, True, (255, 255, 255))) for ch in GLYPHS)
+        self.glyph_w = max(g.get_width() for g in self.glyphs.values())
+        self.line_h = font.get_linesize()
+        captions = ["fps", "frame ms", "events ms", "redraw ms", "draw calls", "blits", "font hits", "text hits"]
+        self.rows = len(captions)
+        self.value_x = 10 + max(font.size(text)[0] for text in captions) + 10
+        self.graph_y = 10 + self.rows * self.line_h + 6
+        self.graph_h = 40
+        self.width = self.value_x + 8 * self.glyph_w + 10
+        self.height = self.graph_y + self.graph_h + 10
+        self.background = pygame.Surface((self.width, self.height))
+        self.background.set_alpha(200)
+        for i, text in enumerate(captions):
+            self.background.blit(font.render(text, True, (200, 200, 200)), (10, 10 + i * self.line_h))
+
+    def toggle(self):
+        self.visible = not self.visible
+        if self.glyphs is None:
+            self.render()
+        self.counted = (draw_stats.draw_calls, draw_stats.blits)
+
+    # add the times of a frame of the main loop, called after it processed its events
+    def add_frame(self, event_seconds, redraw_seconds):
+        now = time.perf_counter()
+        if self.last_end is not None:
+            self.intervals.add(now - self.last_end)
+        self.last_end = now
+        self.event_times.add(event_seconds)
+        self.redraw_times.add(redraw_seconds)
+
+    # return (glyph, position) pairs drawing a number right aligned at x
+    def number_blits(self, value, x, y, decimals=1):
+        text = "%.*f" % (decimals, value)
+        x -= len(text) * self.glyph_w
+        return [(self.glyphs[ch], (x + i * self.glyph_w, y)) for i, ch in enumerate(text)]
+
+    def draw(self, win):
+        if not self.visible:
+            return
+        # counts of everything drawn since the HUD was last drawn, not counting itself
+        self.draw_calls = draw_stats.draw_calls - self.counted[0]
+        self.blits = draw_stats.blits - self.counted[1]
+
+        intervals = self.intervals.held()
+        fps = len(intervals) / intervals.sum() if intervals.sum() > 0 else 0
+        font_total = label.font_hits + label.font_misses
+        text_total = label.text_draws + label.text_renders
+        values = [(fps, 1), (self.intervals.last() * 1000, 1), (self.event_times.last() * 1000, 2),
+                  (self.redraw_times.last() * 1000, 2), (self.draw_calls, 0), (self.blits, 0),
+                  (label.font_hits / font_total * 100 if font_total else 0, 1),
+                  (label.text_draws / text_total * 100 if text_total else 0, 1)]
+        x = win.get_width() - self.width - 10 if self.x is None else self.x
+        y = win.get_height() - self.height - 10 if self.y is None else self.y
+        blits = [(self.background, (x, y))]
+        for i, (value, decimals) in enumerate(values):
+            blits += self.number_blits(value, x + self.width - 10, y + 10 + i * self.line_h, decimals)
+        win.blits(blits, False)
+
+        # histogram of the held frame times, bars coloured by how far they are from 60 and 30 fps
+        counts = np.bincount(np.searchsorted(BUCKET_EDGES, intervals * 1000), minlength=len(BUCKET_EDGES) + 1)
+        bar_w = (self.width - 20) // len(counts)
+        bottom = y + self.graph_y + self.graph_h
+        tallest = max(counts.max(initial=0), 1)
+        for i, n in enumerate(counts.tolist()):
+            if n:
+                h = max(1, n * self.graph_h // tallest)
+                color = (80, 220, 80) if i < 4 else (230, 200, 60) if i < 7 else (230, 70, 60)
+                win.fill(color, (x + 10 + i * bar_w, bottom - h, bar_w - 1, h))
+
+        self.counted = (draw_stats.draw_calls, draw_stats.blits)
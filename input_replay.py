@@ -0,0 +1,197 @@
+# --------------------------------------------------------------------
+# Program: Input Recording and Replay
+# Date: Oct 19 2026
+# Description: Sources of the input the main loop reads each frame
+#   (events and mouse positions), and the loading screens shown while
+#   a frame makes a scene read for their events. Live input comes straight from
+#   pygame; a recorder also writes it to a file, one JSON line per
+#   frame, and a replay feeds a recording back frame by frame (under
+#   the SDL dummy driver) while timing how long every frame takes to
+#   draw and to process its events. Each frame also has a time that
+#   animations and the preview delay read instead of the clock, and
+#   the seeds of every scene and tree made while recording are kept,
+#   so a replay shows the same frames as the recording.
+#
+#   python main_fractaltree.py --record session.jsonl
+#   python main_fractaltree.py --replay session.jsonl
+# --------------------------------------------------------------------
+
+import json
+import time
+import numpy as np
+import pygame
+
+# events the main loop reads, the only ones that are recorded
+INPUT_EVENTS = (pygame.QUIT, pygame.MOUSEBUTTONDOWN, pygame.MOUSEBUTTONUP, pygame.MOUSEMOTION, pygame.KEYDOWN,
+                pygame.KEYUP)
+
+
+# input read from pygame as it happens
+class LiveInput:
+    def __init__(self):
+        self.frame_time = time.perf_counter()
+
+    # called at the start of every frame, fixing the time the frame is drawn at
+    def begin_frame(self):
+        self.frame_time = time.perf_counter()
+
+    # return the time (seconds) of the current frame, read by animations instead of the clock
+    def now(self):
+        return self.frame_time
+
+    def get_events(self):
+        return pygame.event.get()
+
+    def get_mouse_pos(self):
+        return pygame.mouse.get_pos()
+
+    # return the seed of a new scene or tree, None to let the generator pick one
+    def scene_seed(self):
+        return None
+
+    # called at the end of every frame with the seconds it took to redraw and to process its events
+    def end_frame(self, redraw_seconds, event_seconds):
+        pass
+
+    def close(self):
+        pass
+
+
+# return the type and the attributes that can be written as JSON of an event
+def event_record(event):
+    attributes = dict((name, value) for name, value in event.dict.items()
+                      if isinstance(value, (int, float, str, tuple, list)))
+    return event.type, attributes
+
+
+# live input that is also written to a file
+class InputRecorder(LiveInput):
+    def __init__(self, path):
+        LiveInput.__init__(self)
+        self.file = open(path, "w")
+        self.start = time.perf_counter()
+        self.rng = np.random.default_rng()
+        self.new_frame()
+
+    def new_frame(self):
+        self.events = []  # events of the first read of the frame (by the main loop)
+        self.later_events = []  # events of every later read in the frame (by loading screens), one list per read
+        self.event_reads = 0
+        self.mouse = []  # every mouse position read in the frame, in order
+        self.seeds = []  # seeds of the scenes made in the frame
+
+    def get_events(self):
+        events = pygame.event.get()
+        records = [event_record(event) for event in events if event.type in INPUT_EVENTS]
+        if self.event_reads == 0:
+            self.events = records
+        else:
+            self.later_events.append(records)
+        self.event_reads += 1
+        return events
+
+    def get_mouse_pos(self):
+        pos = pygame.mouse.get_pos()
+        self.mouse.append(pos)
+        return pos
+
+    def scene_seed(self):
+        seed = int(self.rng.integers(0, 2 ** 32))
+        self.seeds.append(seed)
+        return seed
+
+    def end_frame(self, redraw_seconds, event_seconds):
+        frame = {"time": round(self.frame_time - self.start, 4), "mouse": self.mouse, "events": self.events}
+        if self.later_events:
+            frame["later_events"] = self.later_events
+        if self.seeds:
+            frame["seeds"] = self.seeds
+        self.file.write(json.dumps(frame) + "\n")
+        self.new_frame()
+
+    def close(self):
+        self.file.close()
+
+
+# input read back from a recording, one recorded frame for every frame of the main loop
+# once every frame has been replayed it quits the program
+class InputReplay(LiveInput):
+    def __init__(self, path):
+        with open(path) as f:
+            self.frames = [json.loads(line) for line in f if line.strip()]
+        self.frame = 0
+        self.frame_time = 0
+        self.event_reads = 0
+        self.mouse_reads = 0
+        self.seed_reads = 0
+        self.last_mouse = (0, 0)
+        self.redraw_times = FrameTimes()
+        self.event_times = FrameTimes()
+
+    # the recorded time of the frame
+    def begin_frame(self):
+        if self.frame < len(self.frames):
+            self.frame_time = self.frames[self.frame].get("time", self.frame_time)
+
+    def recorded(self, name):
+        if self.frame >= len(self.frames):
+            return []
+        return self.frames[self.frame].get(name, [])
+
+    # return the events of the read in the frame: the main loop's, then those of the loading screens in order
+    def get_events(self):
+        pygame.event.get()  # live events (the dummy driver still makes some) are dropped
+        if self.frame >= len(self.frames):
+            return [pygame.event.Event(pygame.QUIT)]
+        later = self.recorded("later_events")
+        self.event_reads += 1
+        if self.event_reads == 1:
+            records = self.recorded("events")
+        else:
+            records = later[self.event_reads - 2] if self.event_reads - 1 <= len(later) else []
+        return [pygame.event.Event(kind, dict((name, tuple(value) if isinstance(value, list) else value)
+                                              for name, value in attributes.items()))
+                for kind, attributes in records]
+
+    # return the mouse positions in the order they were read in the frame, the last one again if there are more reads
+    def get_mouse_pos(self):
+        positions = self.recorded("mouse")
+        if positions:
+            self.last_mouse = tuple(positions[min(self.mouse_reads, len(positions) - 1)])
+        self.mouse_reads += 1
+        return self.last_mouse
+
+    def scene_seed(self):
+        seeds = self.recorded("seeds")
+        self.seed_reads += 1
+        return seeds[self.seed_reads - 1] if self.seed_reads <= len(seeds) else None
+
+    def end_frame(self, redraw_seconds, event_seconds):
+        if self.frame < len(self.frames):
+            self.redraw_times.add(redraw_seconds)
+            self.event_times.add(event_seconds)
+        self.frame += 1
+        self.event_reads = 0
+        self.mouse_reads = 0
+        self.seed_reads = 0
+
+
+# times taken by frames of the main loop
+class FrameTimes:
+    def __init__(self):
+        self.seconds = []
+
+    def add(self, seconds):
+        self.seconds.append(seconds)
+
+    # return a percentile of the frame times in milliseconds
+    def percentile(self, p):
+        if not self.seconds:
+            return 0
+        return float(np.percentile(self.seconds, p)) * 1000
+
+    def __str__(self):
+        if not self.seconds:
+            return "no frames"
+        return "%d frames, p50 %.1f ms, p95 %.1f ms, p99 %.1f ms, max %.1f ms" % (
+            len(self.seconds), self.percentile(50), self.percentile(95), self.percentile(99), max(self.seconds) * 1000)
@@ -6,7 +6,7 @@
 # --------------------------------------------------------------------
 
 import pygame
-pygame.init()
+import draw_stats
 
 # alignment constants
 LEFT = 0
@@ -15,6 +15,30 @@ TOP = 0
 BOTTOM = 1
 CENTER = 0.5
 
+# fonts already loaded, by (name, size). The font module is only started when the first font is needed
+fonts = {}
+font_hits = 0
+font_misses = 0
+# labels drawn from their rendered text, and texts rendered
+text_draws = 0
+text_renders = 0
+
+
+# return a system font, loading it only the first time it is asked for
+def get_font(name, size):
+    global font_hits, font_misses
+    key = (name, size)
+    font = fonts.get(key)
+    if font is not None:
+        font_hits += 1
+        return font
+    font_misses += 1
+    if not pygame.font.get_init():
+        pygame.font.init()
+    font = pygame.font.SysFont(name, size)
+    fonts[key] = font
+    return font
+
 
 # scalable class for easily drawable text
 class Label:
@@ -29,12 +53,17 @@ class Label:
         self.visible = visible
 
     def draw(self, win):
+        global text_draws
         if self.visible:
             win.blit(self.label, (self.x, self.y))
+            draw_stats.blits += 1
+            text_draws += 1
 
     # return rendered label's text as a drawable
     def render_label(self):
-        return pygame.font.SysFont(self.font, self.size).render(self.text, True, self.color)
+        global text_renders
+        text_renders += 1
+        return get_font(self.font, self.size).render(self.text, True, self.color)
 
     # --------------------SETTER AND GETTER METHODS--------------------
 
@@ -87,7 +116,9 @@ class FilledLabel(Label):
         if self.visible:
             if self.border != 0:
                 pygame.draw.rect(win, self.bColor, self.get_rect())
+                draw_stats.draw_calls += 1
             pygame.draw.rect(win, self.fColor, self.fillRect)
+            draw_stats.draw_calls += 1
             super().draw(win)
 
     # returns rect tuple
@@ -0,0 +1,126 @@
+# --------------------------------------------------------------------
+# Program: Layer Rasters
+# Date: Oct 19 2026
+# Description: Drawn pixels of each layer of a generated scene, kept
+#   so a scene that only changed in some layers can be shown again by
+#   drawing just those layers. Every pixel of a raster also holds the
+#   depth of the object that drew it (mountains behind everything,
+#   then by row and kind, the order the scene is drawn in), so layers
+#   drawn apart are combined by taking the nearest pixel, which gives
+#   the same picture as drawing every object in order. Only the
+#   objects left after occlusion culling are drawn, a batch of objects
+#   whose boxes do not overlap at a time on one keyed surface.
+# --------------------------------------------------------------------
+
+import numpy as np
+import pygame
+import fractals
+
+KEY = (255, 0, 254)  # colour of the pixels an object did not draw on, while it is drawn alone
+PAD = 2  # pixels around an object's bounding box that are also checked for its drawing
+
+
+# pixels and depths of one layer, indexed [x, y] like pygame.surfarray
+class LayerRaster:
+    def __init__(self, size):
+        self.color = np.zeros(size, np.uint32)  # pixels mapped to the format of the surface they were drawn on
+        self.depth = np.full(size, -1, np.int32)  # depth of the object drawn at each pixel, -1 where there is none
+        self.drawn = set()  # ids of the objects drawn, a kept layer draws the ones that were culled before later
+
+
+# return the depth of every planned object, larger is nearer (drawn later)
+def depth_keys(plan):
+    mountains = plan["kind"] == fractals.MOUNTAIN
+    return (1 + (~mountains).astype(np.int32) * (1 << 24) + plan["row"].astype(np.int32) * 4 +
+            plan["kind"].astype(np.int32))
+
+
+# split objects (given by their padded boxes, in drawing order) into batches that are drawn one after another
+# no two boxes of a batch overlap, so every drawn pixel of a batch belongs to the one object whose box holds it,
+# and an object is always in a later batch than the objects before it that it overlaps
+def overlap_batches(boxes):
+    boxes = np.array(boxes, dtype=np.int64).reshape(-1, 4)
+    batch = np.zeros(len(boxes), np.int64)
+    for i in range(1, len(boxes)):
+        x1, y1, x2, y2 = boxes[i].tolist()
+        before = boxes[:i]
+        overlaps = (before[:, 0] < x2) & (before[:, 2] > x1) & (before[:, 1] < y2) & (before[:, 3] > y1)
+        batch[i] = batch[:i][overlaps].max(initial=-1) + 1
+    return [np.flatnonzero(batch == b).tolist() for b in range(batch.max(initial=-1) + 1)]
+
+
+# draw the objects of a layer that are in visible (ids of the objects left after culling) and not drawn yet,
+# keeping the pixels each one drew and its depth. The ground layer (sky and ground) is drawn whole, behind everything
+def render_layer(layer, scratch, visible, raster=None, ground=False):
+    w, h = scratch.get_size()
+    if raster is None:
+        raster = LayerRaster((w, h))
+    if ground:
+        scratch.fill((0, 0, 0))
+        for d in layer.drawables:
+            d.draw(scratch)
+        raster.color[:] = pygame.surfarray.pixels2d(scratch)
+        raster.depth[:] = 0
+        return raster
+
+    objects = []  # (drawable, depth, padded box as x1, y1, x2, y2 exclusive)
+    for d, box, depth in zip(layer.drawables, layer.boxes, depth_keys(layer.plan).tolist()):
+        if box is None or id(d) not in visible or id(d) in raster.drawn:
+            continue
+        raster.drawn.add(id(d))
+        x1, y1 = max(int(box[0]) - PAD, 0), max(int(box[1]) - PAD, 0)
+        x2, y2 = min(int(box[2]) + PAD + 1, w), min(int(box[3]) + PAD + 1, h)
+        if x1 < x2 and y1 < y2:
+            objects.append((d, depth, (x1, y1, x2, y2)))
+
+    key = scratch.map_rgb(KEY)
+    depths = np.full((w, h), -1, np.int32)
+    for batch in overlap_batches([box for d, depth, box in objects]):
+        boxes = np.array([objects[i][2] for i in batch])
+        x1, y1 = boxes[:, :2].min(0).tolist()
+        x2, y2 = boxes[:, 2:].max(0).tolist()
+        scratch.fill(KEY, (x1, y1, x2 - x1, y2 - y1))
+        depths[x1:x2, y1:y2] = -1
+        heads = {}  # atlas -> flower heads of the batch, drawn with one blits call as nothing in a batch overlaps
+        for i in batch:
+            d, depth, (bx1, by1, bx2, by2) = objects[i]
+            head = d.head_key() if hasattr(d, "head_key") else None
+            if head is not None:
+                d.draw_stem(scratch)
+                heads.setdefault(d.atlas, []).append(head)
+            else:
+                d.draw(scratch)
+            depths[bx1:bx2, by1:by2] = depth
+        for atlas, keys in heads.items():
+            atlas.draw_keys(scratch, keys)
+        pixels = pygame.surfarray.pixels2d(scratch)[x1:x2, y1:y2]
+        # a pixel is kept if it was drawn and is not behind what the raster already holds
+        # (objects drawn for a kept layer can be farther than the ones drawn before)
+        kept = (pixels != key) & (depths[x1:x2, y1:y2] >= raster.depth[x1:x2, y1:y2])
+        np.copyto(raster.color[x1:x2, y1:y2], pixels, where=kept)
+        np.copyto(raster.depth[x1:x2, y1:y2], depths[x1:x2, y1:y2], where=kept)
+        del pixels  # unlocks the surface for the next batch
+    return raster
+
+
+# return a surface with the layers of a generated scene combined, drawing the objects not in their rasters yet
+def composite_scene(scene):
+    size = (fractals.SCENE_WIDTH, fractals.SCENE_HEIGHT)
+    scratch = pygame.Surface(size, 0, 32)
+    visible = set(id(d) for d in scene.drawables)
+    rasters = []
+    for name, kind, depends in fractals.SCENE_LAYERS:
+        layer = scene.scene_layers[name]
+        if layer.raster is None or kind is not None:
+            layer.raster = render_layer(layer, scratch, visible, layer.raster, kind is None)
+        rasters.append(layer.raster)
+
+    color = rasters[0].color.copy()
+    depth = rasters[0].depth.copy()
+    for raster in rasters[1:]:
+        nearer = raster.depth > depth
+        np.copyto(color, raster.color, where=nearer)
+        np.copyto(depth, raster.depth, where=nearer)
+    surf = fractals.Surface_Drawable(size, 0, scratch)
+    pygame.surfarray.blit_array(surf, color)
+    return surf
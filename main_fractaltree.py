@@ -9,75 +9,39 @@
 # Input: The program takes input from the user through button actions.
 # --------------------------------------------------------------------
 
+import time
+startup_time = time.perf_counter()  # taken before the other imports so they are part of the startup time
+
+import os
+import copy
 import pygame
-import math
+import argparse
 import color as c
-import vector
+import draw_stats
 import frame
-import random
 import label
 import button
 import grid
-
-pygame.init()
+import sprites
+import subtrees
+import poster
+import svg_export
+import animation
+import tree3d
+import input_replay
+import hud
+import preview
+import memory_report
+import assets
+import layer_raster
+import random_stream
+import fractals
+from fractals import Surface_Drawable
 
 # window screen constants
-WIN_WIDTH = 1000
-WIN_HEIGHT = 800
-WIN = pygame.display.set_mode((WIN_WIDTH, WIN_HEIGHT))
-
-
-# class for easy accessing and storing of all settings variables in program
-#   with methods to be applied to buttons to easily change settings
-class Settings:
-    def __init__(self):
-        # Scene
-        # Mountain
-        self.mountain_start = WIN_HEIGHT//2 + 50
-        self.mountain_end = WIN_HEIGHT//2 + 100
-        self.mountain_frequency = 1
-
-        # Foreground
-        self.foreground_start = self.mountain_end
-        self.foreground_end = WIN_HEIGHT
-        self.secondary_foreground_start = self.foreground_end - 100
-        self.bush_chance = 3  # chance of getting a bush spawn
-        self.flower_chance = 2  # chance of getting a flower
-        self.tree_chance = 3  # chance of getting a tree
-
-    @staticmethod
-    def set_mountain_start(b):
-        settings.mountain_start = int(b.value())
-
-    @staticmethod
-    def set_mountain_end(b):
-        settings.mountain_end = int(b.value())
-        settings.foreground_start = int(b.value())
-
-    @staticmethod
-    def set_mountain_frequency(b):
-        settings.mountain_frequency = int(b.value())
-
-    @staticmethod
-    def set_foreground_end(b):
-        settings.foreground_end = int(b.value())
-
-    @staticmethod
-    def set_secondary_foreground_start(b):
-        settings.secondary_foreground_start = int(b.value())
-
-    @staticmethod
-    def set_bush_chance(b):
-        settings.bush_chance = int(b.value())
-
-    @staticmethod
-    def set_flower_chance(b):
-        settings.bush_chance = int(b.value())
-
-    @staticmethod
-    def set_tree_chance(b):
-        settings.tree_chance = int(b.value())
-
+WIN_WIDTH = fractals.SCENE_WIDTH
+WIN_HEIGHT = fractals.SCENE_HEIGHT
+WIN = None  # window surface, created by main()
 
 # Loading screen
 class LoadingScreen:
@@ -98,314 +62,25 @@ class LoadingScreen:
 
     def draw(self, win):
         win.blit(self.surface, (0, 0))
+        draw_stats.blits += 1
         # loading bar outline
         pygame.draw.rect(win, c.BLACK, (self.bar_start, self.bar_y, self.bar_end-self.bar_start, self.bar_h), 1)
         # loading bar fill
         pygame.draw.rect(win, c.RED,
                          (self.bar_start, self.bar_y, (self.bar_end-self.bar_start) * self.bar_percent, self.bar_h))
+        draw_stats.draw_calls += 2
 
     def load(self, current_task, total_tasks):
         self.bar_percent = current_task / total_tasks  # size of red loading bar
         self.draw(WIN)
         pygame.display.update()
-        for event in pygame.event.get():
+        for event in input_source.get_events():  # recorded and replayed with the events of the frame
             if event.type == pygame.QUIT:
                 global inPlay
                 inPlay = False
                 return True  # true if the program must be quit from loading screen
 
 
-# abstract line class
-class Line:
-    def __init__(self, a, b):
-        self.a = a
-        self.b = b
-
-
-# surface extension to make it drawable in a draw loop
-class Surface_Drawable(pygame.Surface):
-    def draw(self, win):
-        win.blit(self, (0, 0))
-
-
-# flower class for storing and creating a flower
-class Flower:
-    def __init__(self, start_pos, stem_len, radius, sColor=c.GREEN, pColor=c.WHITE, cColor=c.BLACK, stem_width=1,
-                 tilt_angle=0,
-                 tilt_count=0):
-        self.stem_points = [start_pos.get(True)]
-        self.petals_center = None
-        self.radius = radius
-        self.create_stem(start_pos, stem_len, random_if_range(tilt_angle), tilt_count)
-        self.sColor = sColor
-        self.pColor = pColor
-        self.cColor = cColor
-        self.stem_width = stem_width
-
-    def create_stem(self, start_pos, stem_len, tilt_angle, tilt_count):
-        sec_len = stem_len / tilt_count
-        last_pos = start_pos
-        for i in range(tilt_count):
-            new_pos = last_pos.get_point_on_line(270 - tilt_angle * i, sec_len)
-            self.stem_points.append(new_pos.get(True))
-            last_pos = new_pos
-        self.petals_center = new_pos.get(True)
-
-    def draw(self, win):
-        pygame.draw.lines(win, self.sColor, False, self.stem_points, self.stem_width)
-        pygame.draw.circle(win, self.pColor, self.petals_center, self.radius)
-        pygame.draw.circle(win, self.cColor, self.petals_center, self.radius//2)
-
-
-# mountain class for storing and creating a mountain
-class Mountain:
-    def __init__(self, start_pos, end_pos, height, height_change, start_height, iters, color=c.GREY):
-        self.points = [start_pos, end_pos]
-        self.iters = iters
-        self.create_mountain(start_pos, end_pos, height, height_change, start_height, True)
-        self.points = [p.get(True) for p in self.points]
-        self.color = color
-
-    def create_mountain(self, start_pos, end_pos, height, height_change, start_height=None, first=False, count=0):
-        if count < self.iters:
-
-            new_x = (start_pos.x + end_pos.x) / 2
-
-            if not first:
-                sign = random.choice([-1, 1])
-                # create new point
-                new_pos = vector.Vec2(new_x,
-                                      vector.Vec2.poi(start_pos, end_pos, vector.Vec2(new_x, 0),
-                                                      vector.Vec2(new_x, 1)).y + random_if_range(height) * sign)
-                new_h = height[0] * height_change, height[1] * height_change
-            else:
-                # create new point
-                new_pos = vector.Vec2(new_x,
-                                      vector.Vec2.poi(start_pos, end_pos, vector.Vec2(new_x, 0),
-                                                      vector.Vec2(new_x, 1)).y - random_if_range(start_height))
-                new_h = height
-
-            # prevents points from going below the base of the mountain
-            if new_pos.y > self.points[0].y:
-                new_pos.y = self.points[0].y
-
-            # insert point in correct location for polygon drawing
-            self.points.insert(self.points.index(end_pos), new_pos)
-
-            # create left side
-            self.create_mountain(start_pos, new_pos, new_h, height_change, count=count+1)
-            # create right side
-            self.create_mountain(new_pos, end_pos, new_h, height_change, count=count+1)
-
-    def draw(self, win):
-        pygame.draw.polygon(win, self.color, self.points)
-
-
-# tree class for storing and creating a tree
-class Tree:
-    def __init__(self, start_pos, heading, current_length, end_length, current_line_list=None, angle_change=45,
-                 len_dec=0.5, width=1, width_dec=1, sColor=c.BROWN, eColor=c.DARK_GREEN, lColor="g",
-                 lCRange=(100, 255), two=False, trunk_size=None):
-        self.branches = []  # list of branches
-        self.leaves = []  # list of leaves
-        self.max_level = 0  # what is the farthest branch up the tree
-        self.sColor = sColor  # start colour (trunk)
-        self.eColor = eColor  # end colour (branches at the end)
-        self.lColor = lColor  # colour code for random leaf colour
-        self.lCRange = lCRange  # colour range for darkness of leaves
-        self.trunk_size = trunk_size
-        if two:
-            self.branches = self.create_tree2(start_pos, heading, current_length, current_line_list,
-                                              angle_change, len_dec, width, health_split=140, first=True)
-        else:
-            self.branches = self.create_tree(start_pos, heading, current_length, end_length, current_line_list,
-                                             angle_change, len_dec, width, width_dec)
-        self.set_branch_colors()
-
-    def draw(self, win):
-        for branch in self.branches:
-            branch.draw(win)
-        for leaf in self.leaves:
-            leaf.draw(win)
-
-    # set branch colour depending on how far up the tree they are
-    def set_branch_colors(self):
-        for branch in self.branches:
-            grad_strength = branch.level / self.max_level
-            r = self.sColor[0] - (self.sColor[0] - self.eColor[0]) * grad_strength
-            g = self.sColor[1] - (self.sColor[1] - self.eColor[1]) * grad_strength
-            b = self.sColor[2] - (self.sColor[2] - self.eColor[2]) * grad_strength
-            branch.set_color([r, g, b])
-
-    # create the branches and leaves for the tree using fractal recursion
-    def create_tree(self, start_pos, heading, current_length, end_length, current_line_list=None, angle_change=45,
-                    len_dec=50, width=1, width_dec=100, level=0):
-        if current_line_list is None:
-            current_line_list = []
-        if current_length > end_length:
-            p = start_pos.get_point_on_line(heading, current_length)
-            current_line_list.append(Branch((p.x, p.y), (start_pos.x, start_pos.y), width=width, level=level))
-
-            level += 1
-
-            if level > self.max_level:
-                self.max_level = level
-
-            # create left branch
-            current_line_list = self.create_tree(p, heading - random_if_range(angle_change),
-                                                 current_length * random_if_range(len_dec) / 100, end_length,
-                                                 current_line_list, angle_change, len_dec,
-                                                 width * random_if_range(width_dec)/100, width_dec, level)
-            # create right branch
-            current_line_list = self.create_tree(p, heading + random_if_range(angle_change),
-                                                 current_length * random_if_range(len_dec) / 100, end_length,
-                                                 current_line_list, angle_change, len_dec,
-                                                 width * random_if_range(width_dec)/100, width_dec, level)
-
-        else:  # when branch ends(minimum size reached) add leaf
-            if random.randrange(4) == 0:  # 1 in 4 chance of having a leaf on the end of a branch
-                self.leaves.append(Leaf(start_pos.get(True), c.random_color(self.lCRange[0], self.lCRange[1],
-                                                                            self.lColor, random.randrange(50, 100)),
-                                        random.randrange(6)))
-                if random.randrange(5) == 0:
-                    self.leaves[-1].color = c.random_color(self.lCRange[0], self.lCRange[1],
-                                                           "b", random.randrange(10, 100))
-        return current_line_list
-
-    # second version
-    def create_tree2(self, start_pos, heading, length, current_line_list=None,
-                     angle_change=45, len_dec=50, width=1, level=0, health_split=140, health=100, health_limit=3,
-                     main_branch=True, first=False):
-        if current_line_list is None:
-            current_line_list = []
-        if health > health_limit:
-            if first and self.trunk_size is not None:
-                temp_len = self.trunk_size
-            else:
-                temp_len = length
-            p = start_pos.get_point_on_line(heading, temp_len * health/100)
-            current_line_list.append(Branch((p.x, p.y), (start_pos.x, start_pos.y), width=width, level=level,
-                                            health=health/100))
-
-            level += 1
-
-            if level > self.max_level:
-                self.max_level = level
-
-            h_left = random_if_range(health_split)  # how much health is passed onto next branches
-            h1 = random.randrange(h_left - 100, 100)
-            h2 = h_left - h1
-
-            if main_branch:
-                m1 = h1 > h2
-                m2 = not m1
-            else:
-                m1, m2 = False, False
-
-            if main_branch:
-                if heading < 270 and h1 > h2:
-                    h1, h2 = h2, h1
-                elif heading > 270 and h2 > h1:
-                    h1, h2 = h2, h1
-
-            # create left branch
-            current_line_list = self.create_tree2(p, heading - random_if_range(angle_change),
-                                                  length,
-                                                  current_line_list, angle_change, len_dec,
-                                                  width, level, health_split,
-                                                  health * h1/100, health_limit, m1)
-            # create right branch
-            current_line_list = self.create_tree2(p, heading + random_if_range(angle_change),
-                                                  length,
-                                                  current_line_list, angle_change, len_dec,
-                                                  width, level, health_split,
-                                                  health * h2/100, health_limit, m2)
-
-        else:  # when branch ends(minimum size reached) add leaf
-            if random.randrange(1) == 0:  # 1 in 4 chance of having a leaf on the end of a branch
-                self.leaves.append(Leaf(start_pos.get(True), c.random_color(self.lCRange[0], self.lCRange[1],
-                                                                            self.lColor, random.randrange(50, 100)),
-                                        random.randrange(4)))
-        return current_line_list
-
-    def tint_depth(self, strength):
-        for branch in self.branches:
-            branch.color = add_depth_tint(branch.color, strength)
-        for leaf in self.leaves:
-            leaf.color = add_depth_tint(leaf.color, strength)
-
-
-# leaf class for storing and drawing leaves
-class Leaf:
-    def __init__(self, pos, color, size):
-        self.pos = pos
-        self.color = color
-        self.size = size
-
-    def draw(self, win):
-        pygame.draw.circle(win, self.color, self.pos, self.size)
-
-
-# branch class for storing and drawing branches
-class Branch(Line):
-    def __init__(self, a, b, color=c.WHITE, width=0, level=0, health=1):
-        super().__init__(list(map(int, a)), list(map(int, b)))
-        self.color = color
-        self.width = int(width * health)
-        self.health = health
-        if self.width < 1:
-            self.width = 1
-        self.level = level
-
-    def draw(self, win):
-        pygame.draw.line(win, self.color, self.a, self.b, self.width)
-
-    def set_color(self, color):
-        self.color = color
-
-
-# ------------------ Fractal Presets ------------------
-
-# creates and return a recursive mountain
-def create_mountain(center, y, width=100):
-    half_width = width//2
-    height = random.randrange(50, 150)/100 * half_width
-    variation = random.randrange(5, 20), random.randrange(20, 40)
-    return Mountain(vector.Vec2(center - half_width, y), vector.Vec2(center + half_width, y), variation, 0.8, height,
-                    5, c.grey(random.randrange(50, 200)))
-
-
-# creates and return a recursive tree
-def create_tree(x, y, final_y):
-    ratio = (y-200) / (final_y-200)
-    width = 10 * ratio
-    start_len = 40 * ratio
-    trunk_len = random.randrange(40, 70) * ratio
-    t = Tree(vector.Vec2(x, y), 270, start_len, 5, len_dec=(70, 80), angle_change=(10, 40), width=width,
-             width_dec=(80, 90), two=True, lColor=random.choice(["r", "g", "rg"]), trunk_size=trunk_len)
-    t.tint_depth(1 - (y-350) / (final_y-350))
-    return t
-
-
-# creates and returns a recursive bush
-def create_bush(x, y, final_y):
-    ratio = (y - 400) / (final_y - 400)
-    width = 10 * ratio
-    start_len = 20 * ratio
-    b = Tree(vector.Vec2(x, y), 270, start_len, 2, len_dec=(70, 80), angle_change=(40, 80), width=width, width_dec=90,
-             sColor=c.DARKER_GREEN, eColor=c.DARK_GREEN, lColor="g", lCRange=(50, 100))
-    return b
-
-
-# creates and returns a flower
-def create_flower(x, y, final_y):
-    ratio = (y - 400) / (final_y - 400)
-    stem_len = 40 * ratio
-    radius = int(15 * ratio)
-    f = Flower(vector.Vec2(x, y), stem_len, radius, pColor=c.random_any_color(100), cColor=c.random_any_color(100),
-               stem_width=3, tilt_angle=(-15, 15), tilt_count=5)
-    return f
-
 
 # ------------------ Button Click Functions ------------------
 
@@ -416,15 +91,72 @@ def create_scene_on_click(b):
     scene = create_scene()
     if scene is None:  # to exit program from loading screen
         return
-    current_frame = frame.Frame([create_still_surface(scene), scene_buttons], [scene_buttons.button_list])
+    global last_scene, scene_frame, current_animation, tree_view
+    last_scene = scene
+    tree_view = None
+    current_animation = None
+    scene_frame = create_scene_frame(create_still_surface(scene))
+    scene_frame.index = scene.index
+    current_frame = scene_frame
 
 
 # function to create the tree scene to be assigned to a button
 def create_fractal_screen_on_click(b):
     global current_frame
     scene_buttons.get_button(1).on_release = create_fractal_screen_on_click
-    current_frame = frame.Frame([create_still_surface(create_fractal_screen()), scene_buttons],
-                                [scene_buttons.button_list])
+    global last_scene, scene_frame, current_animation, tree_view
+    last_scene = fractals.create_fractal_screen(random_stream.RandomStream(input_source.scene_seed()))
+    tree_view = None
+    current_animation = None
+    scene_frame = create_scene_frame(create_still_surface(last_scene))
+    scene_frame.index = last_scene.index
+    current_frame = scene_frame
+
+
+# function to show a new 3D tree, turned by dragging the mouse
+def tree3d_on_click(b):
+    global current_frame, tree_view
+    scene_buttons.get_button(1).on_release = tree3d_on_click
+    tree_view = tree3d.TreeView(tree3d.create_tree(random_stream.RandomStream(input_source.scene_seed())),
+                                (WIN_WIDTH, WIN_HEIGHT), settings.tree3d_spin, clock=input_source.now)
+    current_frame = create_scene_frame(tree_view, True)
+
+
+# switch to an animation of the last scene, or back to the still scene if that animation is showing
+def show_animation(kind):
+    global current_frame, current_animation
+    if tree_view is not None:  # the 3D tree has no animations
+        return
+    if current_animation == kind:
+        current_animation = None
+        current_frame = scene_frame
+        return
+    if kind == "wind":
+        scene = animation.WindScene(last_scene.drawables, (WIN_WIDTH, WIN_HEIGHT), settings.wind_strength,
+                                    settings.wind_trees, input_source.now)
+    else:
+        scene = animation.GrowScene(last_scene.drawables, (WIN_WIDTH, WIN_HEIGHT), settings.grow_level_time,
+                                    input_source.now)
+    current_animation = kind
+    current_frame = create_scene_frame(scene, True)
+
+
+# return a frame showing a scene under the scene buttons
+# the scene is composited once unless it is an animation (live), the buttons only when they change
+def create_scene_frame(scene, live=False):
+    return frame.Frame(None, [scene_buttons.button_list],
+                       layers=[frame.Layer("scene", [scene], live=live),
+                               frame.Layer("buttons", [scene_buttons], scene_buttons.state)])
+
+
+# function to switch between the still scene and the scene with trees swaying in the wind
+def wind_on_click(b):
+    show_animation("wind")
+
+
+# function to switch between the still scene and the scene with trees growing
+def grow_on_click(b):
+    show_animation("grow")
 
 
 # function to reset all of the settings for the scene to defaults
@@ -443,6 +175,7 @@ def settings1_on_click(b):
     mainMenu.set_visible(False)
     scene_settings.set_active(True)
     scene_settings.set_visible(True)
+    scene_preview.set_visible(True)
 
 
 # return to main menu. Optional b parameter so the function can be assigned to a button
@@ -451,65 +184,46 @@ def return_to_main_menu(b=None):
     current_frame = menu_frame
     scene_settings.set_active(False)
     scene_settings.set_visible(False)
+    scene_preview.set_visible(False)
     mainMenu.set_visible(True)
     mainMenu.set_active(True)
 
 
 # ------------------ Surface Rendering Functions ------------------
 
-# create the forest and mountain range scene
+# create the forest and mountain range scene, showing progress on the loading screen
+# after a settings change only the layers of the last scene that depend on the changed settings are made again,
+# redrawing with the same settings makes a new scene
 def create_scene():
-    current_task = 0
-    total_tasks = (settings.mountain_end-settings.mountain_start) / settings.mountain_frequency + \
-                  settings.foreground_end - settings.foreground_start
-    # mountains
-    mList = []
-    for d in range(settings.mountain_start, settings.mountain_end, settings.mountain_frequency):
-        mList.append(create_mountain(random.randrange(WIN_WIDTH), d, random.randrange(100, 800)))
-        current_task += 1
-        end = loading_screen.load(current_task, total_tasks)
-        if end:  # to exit program from loading screen
-            return
-
-    # trees, bushes, flowers
-    tList = []
-    for t in range(settings.foreground_start, settings.foreground_end):  # t is the y coordinate/depth
-
-        if t > settings.secondary_foreground_start:
-            if random.randrange(settings.bush_chance) == 0:  # bushes
-                tList.append(create_bush(random.randrange(WIN_WIDTH), t, WIN_HEIGHT))
-            if random.randrange(settings.flower_chance) == 0:  # flowers
-                tList.append(create_flower(random.randrange(WIN_WIDTH), t, WIN_HEIGHT))
-
-        if random.randrange(settings.tree_chance) == 0:  # trees
-            tList.append(create_tree(random.randrange(WIN_WIDTH), t, WIN_HEIGHT))
-
-        current_task += 1
-        end = loading_screen.load(current_task, total_tasks)
-        if end:  # to exti program from loading screen
-            return
-
-    bg = Surface_Drawable((WIN_WIDTH, WIN_HEIGHT))
-    bg.fill(c.SKY)
-    pygame.draw.rect(bg, c.DARK_GREEN, (0, settings.mountain_start, WIN_WIDTH, WIN_HEIGHT - settings.mountain_start))
-
-    return frame.Frame([bg] + mList + tList)
-
-
-# create the tree scene associated
-def create_fractal_screen():
-    floor = 600
-    tree = create_tree(550, floor, 600)
-    tree2 = create_bush(800, floor, 600)
-    mountain = create_mountain(250, floor, random.randrange(200, 500))
-    bg = Surface_Drawable((WIN_WIDTH, WIN_HEIGHT))
-    bg.fill(c.SKY)
-    pygame.draw.rect(bg, c.DARK_GREEN, (0, floor, WIN_WIDTH, WIN_HEIGHT - floor))
-    return frame.Frame([bg, mountain, tree, tree2])  # frame for showing a few trees
+    global occlusion_stats, memory_overlay, last_values
+    previous = last_scene if settings.scene_values() != last_values else None
+    s = settings
+    seed = input_source.scene_seed() if settings.seed is None and previous is None else None
+    if seed is not None:  # recorded for replays
+        s = copy.copy(settings)
+        s.seed = seed
+    start = time.perf_counter()
+    scene = fractals.generate_scene(s, loading_screen.load, previous=previous)
+    if scene is not None and settings.memory_report:
+        # counted behind the loading screen before the scene is drawn, while it still keeps its generated trees
+        report = memory_report.scene_report(scene, loading_screen.load, time.perf_counter() - start)
+        if report is None:  # to exit program from loading screen
+            return None
+        memory_overlay = memory_report.MemoryOverlay(report)
+    if scene is not None:
+        occlusion_stats = scene.occlusion_stats
+        last_values = settings.scene_values()
+        if scene.budget.degradations:
+            print(scene.budget)
+    return scene
 
 
 # returns all the drawables of a frame drawn on a single surface
+# generated scenes are combined from the kept pixels of their layers, drawing only the layers that are new
 def create_still_surface(f):
+    if hasattr(f, "scene_layers"):
+        with fractals.keeping_scene_trees(f):
+            return layer_raster.composite_scene(f)
     scene = Surface_Drawable((WIN_WIDTH, WIN_HEIGHT))
     scene.blit(f.get_screen(WIN_WIDTH, WIN_HEIGHT), (0, 0))
     return scene
@@ -526,146 +240,333 @@ def create_still_scene(f):
 # function to redraw the screen
 def redraw():
     current_frame.draw(WIN)
+    if memory_overlay is not None and current_frame is not menu_frame:
+        memory_overlay.draw(WIN)
+    if pick_mode and current_frame is scene_frame:
+        draw_picked(WIN, input_source.get_mouse_pos())
+    frame_hud.draw(WIN)
     pygame.display.update()
 
 
-# ------------------ Other Functions ------------------
+# outline the scene object under the mouse and show what it is and the values it was generated with
+def draw_picked(win, mousepos):
+    entry = scene_frame.pick(*mousepos)
+    if entry is None:
+        return
+    x1, y1, x2, y2 = entry.box
+    pygame.draw.rect(win, c.RED, (x1, y1, x2 - x1 + 1, y2 - y1 + 1), 1)
+    draw_stats.draw_calls += 1
+    text = entry.kind
+    if entry.params:
+        text += " " + ", ".join(k + " " + str(v) for k, v in entry.params.items())
+    surf = label.get_font("lucida bright", 14).render(text, True, (255, 255, 255), (0, 0, 0))
+    win.blit(surf, (min(mousepos[0] + 12, WIN_WIDTH - surf.get_width()), max(mousepos[1] - 20, 0)))
+    draw_stats.blits += 1
+
+
+# draw the last generated scene to a png file at a higher resolution, one tile at a time
+def export_poster(path="poster.png"):
+    if last_scene is None or current_frame is menu_frame:
+        return
+    poster.render_poster(last_scene.drawables, last_scene.ground_y, (WIN_WIDTH, WIN_HEIGHT), path,
+                         settings.poster_scale, settings.poster_tile, settings.poster_workers, loading_screen.load)
+
+
+# write the last generated scene to an svg file
+def export_svg(path="scene.svg"):
+    if last_scene is None or current_frame is menu_frame:
+        return
+    total = len(last_scene.drawables)
+    svg_export.export_scene(last_scene, path, lambda current: loading_screen.load(current, total))
 
-# gradients the color towards the color of the sky depending on its depth (strength)
-def add_depth_tint(color, strength):
-    sky = c.SKY
-    r = color[0] - (color[0] - sky[0]) * strength
-    g = color[1] - (color[1] - sky[1]) * strength
-    b = color[2] - (color[2] - sky[2]) * strength
-    return r, g, b
 
+# show or hide the memory report of the last scene
+def toggle_memory_report():
+    global memory_overlay
+    settings.memory_report = not settings.memory_report
+    memory_overlay = None
+    if settings.memory_report and last_scene is not None:
+        # counted behind the loading screen, the next redraw shows the scene again
+        report = memory_report.scene_report(last_scene, loading_screen.load)
+        if report is not None:
+            memory_overlay = memory_report.MemoryOverlay(report)
 
-# passed an integer or list/tuple of 2 intergers.
-# Will either return an integer or a random value from range of list/tuple
-def random_if_range(a):
-    if type(a) == tuple or type(a) == list:
-        if int(a[0]) < int(a[1]):
-            return random.randrange(int(a[0]), int(a[1]))
-        return a[0]
-    return a
 
 
 # ------------------ Main Program ------------------
 
 # settings class to store all settings
-settings = Settings()
-
-# ------------------ Loading Screen ------------------
-loading_screen = LoadingScreen()
-
-# ------------------ Redraw and Menu Buttons for Scenes ------------------
-scene_buttons = grid.Menu((10, 10, 120, 110), 2, 1, ["Menu", "Redraw"], 10, visible_lines=False)
-for b in scene_buttons.button_list:
-    b.color_scheme("black")
-scene_buttons.get_button(0).on_release = return_to_main_menu
-
-# ------------------ Main Menu ------------------
-# background
-bg = Surface_Drawable((WIN_WIDTH, WIN_HEIGHT))
-bg.blit(pygame.image.load("fractalbg.jpg"), (0, 0))
-# title text
-title = label.Label("Fractal Scene Generator", color=c.WHITE)
-title.set_y(100)
-title.set_size(60)
-title.set_x((WIN_WIDTH - title.get_width()) / 2)
-# buttons for menu
-mainMenu = grid.Menu((WIN_WIDTH / 2 - 300, 250, 600, 250), 2, 2,
-                     ["Scene", "  > Settings", "Fractals", "  > Settings"], 20, visible_lines=False)
-# menu button attributes
-for i, b in enumerate(mainMenu.button_list):
-    if i < 4:
-        b.set_text_size(40)
+settings = fractals.Settings()
+
+# last generated scene (before being drawn to a still surface), used for exporting and animating
+last_scene = None
+scene_frame = None  # frame showing the still surface of the last scene
+last_values = None  # scene settings the last scene was generated with
+current_animation = None  # kind of animation showing for the last scene, None if it is still
+
+# outline the object under the mouse on the still scene (toggled with H)
+pick_mode = False
+
+# view of the 3D tree while it is showing, None otherwise
+tree_view = None
+
+# where the main loop reads its events and mouse positions from (live, recorded or replayed)
+input_source = input_replay.LiveInput()
+
+# frame time readout (toggled with F3), drawn last over every frame, the memory report and the picked object
+frame_hud = hud.HUD()
+
+# panel with the memory report of the last scene, None if hidden
+memory_overlay = None
+
+# counts of the objects removed by occlusion culling in the last scene
+occlusion_stats = None
+
+# user interface, created by build_ui() once the window is open
+loading_screen = None
+scene_buttons = None
+mainMenu = None
+scene_settings = None
+scene_preview = None
+menu_frame = None
+current_frame = None
+
+inPlay = True
+
+
+# create the loading screen, menus and frames of the program
+def build_ui():
+    global loading_screen, scene_buttons, mainMenu, scene_settings, scene_preview, menu_frame, current_frame
+
+    # ------------------ Loading Screen ------------------
+    loading_screen = LoadingScreen()
+
+    # ------------------ Redraw and Menu Buttons for Scenes ------------------
+    scene_buttons = grid.Menu((10, 10, 120, 210), 4, 1, ["Menu", "Redraw", "Wind", "Grow"], 10, visible_lines=False)
+    for b in scene_buttons.button_list:
         b.color_scheme("black")
-        b.set_fColor(None)
-        b.b = 10
-        if i % 2 == 1:
-            b.tAlignx = button.LEFT
-            b.reset_text_pos()
-        if i == 3:
-            b.set_visible(False)
-            b.set_active(False)
-# button functions
-mainMenu.button_list.get(0).on_release = create_scene_on_click
-mainMenu.button_list.get(1).on_release = settings1_on_click
-mainMenu.button_list.get(2).on_release = create_fractal_screen_on_click
-
-# ------------------ Scene Settings Menu ------------------
-scene_settings = grid.Menu((WIN_WIDTH/2 - 300, 250, 600, 400), 5, 2, ["Mountain range start coordinate: @",
-                                                                      "Mountain range end coordinate: @",
-                                                                      "Mountain frequency: @",
-                                                                      "Secondary foreground start: @",
-                                                                      "Foreground end coordinate: @",
-                                                                      "Tree chance: 1/@",
-                                                                      "Bush chance: 1/@",
-                                                                      "Flower chance: 1/@",
-                                                                      "<-- Back", "Reset"], 20,
-                           visible_lines=False, visible=False, active=False)
-start_end_values = [(WIN_HEIGHT//2 - 200, WIN_HEIGHT//2 + 50), (WIN_HEIGHT//2 + 51, WIN_HEIGHT//2 + 200),
-                    (1, 30), (WIN_HEIGHT - 300, WIN_HEIGHT-10), (WIN_HEIGHT - 100, WIN_HEIGHT), (1, 100), (1, 10),
-                    (1, 10)]
-functions = [settings.set_mountain_start, settings.set_mountain_end, settings.set_mountain_frequency,
-             settings.set_secondary_foreground_start, settings.set_foreground_end, settings.set_tree_chance,
-             settings.set_bush_chance, settings.set_flower_chance]
-start_values = [settings.mountain_start, settings.mountain_end, settings.mountain_frequency,
-                settings.secondary_foreground_start, settings.foreground_end, settings.tree_chance,
-                settings.bush_chance, settings.flower_chance]
-for i, b in enumerate(scene_settings.button_list):
-    if i < 8:
-        b.set_fColor(c.BLUE)
-        b.tAligny = 0.8
-        scene_settings.button_list.set(i, b.convert_to_slider((20, 20), slide_color=c.DARK_BLUE,
-                                                              start_value=start_end_values[i][0],
-                                                              end_value=start_end_values[i][1],
-                                                              slide_value=start_values[i],
-                                                              slider_border=20, border=3))
-        scene_settings.button_list.get(i).action = functions[i]
-        scene_settings.button_list.get(i).set_text_size(12)
-    elif i == 8:
-        b.on_release = return_to_main_menu
-    elif i == 9:
-        b.on_release = reset_scene_settings
-
-
-# ------------------ Frames ------------------
-menu_frame = frame.Frame([bg, title, mainMenu, scene_settings], [mainMenu.button_list, scene_settings.button_list])
-# current frame starts with the menu (menu is shown first when program is run)
-current_frame = menu_frame
+    scene_buttons.get_button(0).on_release = return_to_main_menu
+    scene_buttons.get_button(2).on_release = wind_on_click
+    scene_buttons.get_button(3).on_release = grow_on_click
+
+    # ------------------ Main Menu ------------------
+    # background
+    bg = Surface_Drawable((WIN_WIDTH, WIN_HEIGHT))
+    bg.blit(assets.load_image("fractalbg.jpg"), (0, 0))  # decoded once, then mapped from the asset cache
+    # title text
+    title = label.Label("Fractal Scene Generator", color=c.WHITE)
+    title.set_y(100)
+    title.set_size(60)
+    title.set_x((WIN_WIDTH - title.get_width()) / 2)
+    # buttons for menu
+    mainMenu = grid.Menu((WIN_WIDTH / 2 - 300, 250, 600, 250), 2, 2,
+                         ["Scene", "  > Settings", "Fractals", "  > 3D"], 20, visible_lines=False)
+    # menu button attributes
+    for i, b in enumerate(mainMenu.button_list):
+        if i < 4:
+            b.set_text_size(40)
+            b.color_scheme("black")
+            b.set_fColor(None)
+            b.b = 10
+            if i % 2 == 1:
+                b.tAlignx = button.LEFT
+                b.reset_text_pos()
+    # button functions
+    mainMenu.button_list.get(0).on_release = create_scene_on_click
+    mainMenu.button_list.get(1).on_release = settings1_on_click
+    mainMenu.button_list.get(2).on_release = create_fractal_screen_on_click
+    mainMenu.button_list.get(3).on_release = tree3d_on_click
+
+    # ------------------ Scene Settings Menu ------------------
+    scene_settings = grid.Menu((WIN_WIDTH/2 - 300, 250, 600, 400), 5, 2, ["Mountain range start coordinate: @",
+                                                                          "Mountain range end coordinate: @",
+                                                                          "Mountain frequency: @",
+                                                                          "Secondary foreground start: @",
+                                                                          "Foreground end coordinate: @",
+                                                                          "Tree chance: 1/@",
+                                                                          "Bush chance: 1/@",
+                                                                          "Flower chance: 1/@",
+                                                                          "<-- Back", "Reset"], 20,
+                               visible_lines=False, visible=False, active=False)
+    start_end_values = [(WIN_HEIGHT//2 - 200, WIN_HEIGHT//2 + 50), (WIN_HEIGHT//2 + 51, WIN_HEIGHT//2 + 200),
+                        (1, 30), (WIN_HEIGHT - 300, WIN_HEIGHT-10), (WIN_HEIGHT - 100, WIN_HEIGHT), (1, 100), (1, 10),
+                        (1, 10)]
+    functions = [settings.set_mountain_start, settings.set_mountain_end, settings.set_mountain_frequency,
+                 settings.set_secondary_foreground_start, settings.set_foreground_end, settings.set_tree_chance,
+                 settings.set_bush_chance, settings.set_flower_chance]
+    start_values = [settings.mountain_start, settings.mountain_end, settings.mountain_frequency,
+                    settings.secondary_foreground_start, settings.foreground_end, settings.tree_chance,
+                    settings.bush_chance, settings.flower_chance]
+    for i, b in enumerate(scene_settings.button_list):
+        if i < 8:
+            b.set_fColor(c.BLUE)
+            b.tAligny = 0.8
+            scene_settings.button_list.set(i, b.convert_to_slider((20, 20), slide_color=c.DARK_BLUE,
+                                                                  start_value=start_end_values[i][0],
+                                                                  end_value=start_end_values[i][1],
+                                                                  slide_value=start_values[i],
+                                                                  slider_border=20, border=3))
+            scene_settings.button_list.get(i).action = functions[i]
+            scene_settings.button_list.get(i).set_text_size(12)
+        elif i == 8:
+            b.on_release = return_to_main_menu
+        elif i == 9:
+            b.on_release = reset_scene_settings
+
+    # live preview of the scene settings, under the settings menu
+    preview_w, preview_h = int(WIN_WIDTH * settings.preview_scale), int(WIN_HEIGHT * settings.preview_scale)
+    scene_preview = preview.PreviewPanel(((WIN_WIDTH - preview_w) // 2, WIN_HEIGHT - preview_h - 10, preview_w,
+                                          preview_h), settings.preview_scale, settings, fractals.generate_preview,
+                                         settings.preview_delay, clock=input_source.now, seed=input_source.scene_seed)
+
+    # ------------------ Frames ------------------
+    menu_frame = frame.Frame(None, [mainMenu.button_list, scene_settings.button_list],
+                             layers=[frame.Layer("background", [bg, title]),
+                                     frame.Layer("menus", [mainMenu, scene_settings],
+                                                 lambda: (mainMenu.state(), scene_settings.state())),
+                                     frame.Layer("preview", [scene_preview], scene_preview.state)])
+    # current frame starts with the menu (menu is shown first when program is run)
+    current_frame = menu_frame
 
 
 # ------------------ Main Loop ------------------
 
-inPlay = True
-while inPlay:
-    pygame.time.delay(10)
-    redraw()
-
-    # used for button click processing
-    m_click = False
-    m_release = False
-
-    # Events iteration
-    for event in pygame.event.get():
-        if event.type == pygame.QUIT:
-            inPlay = False
-        elif event.type == pygame.MOUSEBUTTONDOWN:
-            if event.button == 1:
-                m_click = True
-        elif event.type == pygame.MOUSEBUTTONUP:
-            if event.button == 1:
-                m_release = True
-
-        elif event.type == pygame.KEYDOWN:
-            if event.key == pygame.K_ESCAPE:
-                return_to_main_menu()
-
-    # process button events on current screen
-    current_frame.process_events(m_click, m_release, pygame.mouse.get_pos())
-
-
-# always quit pygame :)
-pygame.quit()
+# run the program until the window is closed
+# time_startup prints how long it took to show the first frame and quits
+def run(time_startup=False):
+    global inPlay, pick_mode
+    first_frame = True
+    inPlay = True
+    while inPlay:
+        pygame.time.delay(10)
+        input_source.begin_frame()
+        frame_start = time.perf_counter()
+        redraw()
+        redraw_end = time.perf_counter()
+        if first_frame:
+            first_frame = False
+            if time_startup:
+                print("first frame after " + str(round((time.perf_counter() - startup_time) * 1000)) + " ms (" +
+                      str(label.font_misses) + " fonts loaded, " + str(label.font_hits) + " reused)")
+                return
+
+        # used for button click processing
+        m_click = False
+        m_release = False
+
+        # Events iteration
+        for event in input_source.get_events():
+            if event.type == pygame.QUIT:
+                inPlay = False
+            elif event.type == pygame.MOUSEBUTTONDOWN:
+                if event.button == 1:
+                    m_click = True
+            elif event.type == pygame.MOUSEBUTTONUP:
+                if event.button == 1:
+                    m_release = True
+            elif event.type == pygame.MOUSEMOTION:
+                if event.buttons[0] and tree_view is not None and current_frame is not menu_frame:
+                    tree_view.drag(event.rel)
+
+            elif event.type == pygame.KEYDOWN:
+                if event.key == pygame.K_ESCAPE:
+                    return_to_main_menu()
+                elif event.key == pygame.K_F3:
+                    frame_hud.toggle()
+                elif event.key == pygame.K_p:
+                    export_poster()
+                elif event.key == pygame.K_v:
+                    export_svg()
+                elif event.key == pygame.K_m:
+                    toggle_memory_report()
+                elif event.key == pygame.K_h:
+                    pick_mode = not pick_mode
+
+        # process button events on current screen
+        current_frame.process_events(m_click, m_release, input_source.get_mouse_pos())
+        frame_end = time.perf_counter()
+        frame_hud.add_frame(frame_end - redraw_end, redraw_end - frame_start)
+        input_source.end_frame(redraw_end - frame_start, frame_end - redraw_end)
+
+
+# generate a scene without opening a window, printing its memory report and/or drawing it to a poster
+# (an svg is written while the scene is generated, without keeping the scene)
+def run_headless(poster_path=None, report=False, svg_path=None):
+    if svg_path is not None:
+        seed = svg_export.export_generated(settings, svg_path)
+        print("svg of scene " + str(seed) + " saved to " + svg_path)
+        if poster_path is None and not report:
+            return
+        settings.seed = seed  # the poster and report show the same scene
+    if report:
+        scene, scene_report = memory_report.measure_scene(lambda: fractals.generate_scene(settings))
+        print(scene_report)
+    else:
+        scene = fractals.generate_scene(settings)
+    if scene.budget.limited():
+        print(scene.budget)
+    if poster_path is not None:
+        with fractals.keeping_scene_trees(scene):
+            poster.render_poster(scene.drawables, scene.ground_y, (WIN_WIDTH, WIN_HEIGHT), poster_path,
+                                 settings.poster_scale, settings.poster_tile, settings.poster_workers)
+        print("poster saved to " + poster_path)
+
+
+def main(argv=None):
+    global WIN, input_source
+    parser = argparse.ArgumentParser(description="Fractal scene generator")
+    parser.add_argument("--poster", metavar="PATH", help="generate a scene and save it as a poster without a window")
+    parser.add_argument("--svg", metavar="PATH", help="generate a scene straight into an svg file without a window")
+    parser.add_argument("--memory-report", action="store_true",
+                        help="generate a scene and print its memory report without a window")
+    parser.add_argument("--time-startup", action="store_true",
+                        help="print the time taken to show the first frame and quit")
+    parser.add_argument("--seed", type=int, help="seed for the random numbers, the same seed gives the same scenes")
+    parser.add_argument("--subtree-memo", action="store_true",
+                        help="stamp small subtrees from cached matching subtrees (faster, less varied trees)")
+    parser.add_argument("--budget-branches", type=int, metavar="N",
+                        help="lower the detail and number of trees until a scene has about N branches at most")
+    parser.add_argument("--budget-draw-calls", type=int, metavar="N",
+                        help="lower the detail and number of objects until a scene is about N draw calls at most")
+    parser.add_argument("--budget-seconds", type=float, metavar="S",
+                        help="lower the detail and number of objects so a scene is generated within S seconds")
+    parser.add_argument("--record", metavar="PATH", help="write every frame's input to a file for --replay")
+    parser.add_argument("--replay", metavar="PATH",
+                        help="replay recorded input without a window and print the time taken by its frames")
+    args = parser.parse_args(argv)
+    settings.seed = args.seed
+    settings.budget_branches = args.budget_branches
+    settings.budget_draw_calls = args.budget_draw_calls
+    settings.budget_seconds = args.budget_seconds
+    settings.subtree_memo = settings.subtree_memo or args.subtree_memo
+    if settings.subtree_memo:
+        fractals.set_subtree_cache(subtrees.SubtreeCache(settings.subtree_step, settings.subtree_memory))
+
+    if args.poster is not None or args.memory_report or args.svg is not None:
+        run_headless(args.poster, args.memory_report, args.svg)
+        return
+
+    if args.replay is not None:
+        os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+        input_source = input_replay.InputReplay(args.replay)
+    elif args.record is not None:
+        input_source = input_replay.InputRecorder(args.record)
+
+    # only the display is started here, fonts are started by label.get_font when the first text is drawn
+    pygame.display.init()
+    WIN = pygame.display.set_mode((WIN_WIDTH, WIN_HEIGHT))
+    fractals.set_sprite_atlas(sprites.SpriteAtlas(settings.sprite_quantization, settings.sprite_memory))
+    fractals.set_expanded_tree_limit(settings.expanded_trees)
+    build_ui()
+    run(args.time_startup)
+    input_source.close()
+    if args.replay is not None:
+        print("replayed redraw(): " + str(input_source.redraw_times))
+        print("replayed process_events(): " + str(input_source.event_times))
+
+    # always quit pygame :)
+    pygame.quit()
+
+
+if __name__ == "__main__":
+    main()
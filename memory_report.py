@@ -0,0 +1,212 @@
+# --------------------------------------------------------------------
+# Program: Scene Memory Report
+# Date: Oct 19 2026
+# Description: Breaks down the memory used by a generated scene by
+#   object category (mountain points, tree branches, leaves, flower
+#   stems, lazy trees and surfaces) by counting the objects of each
+#   category and the size of one of each type. Headless reports also
+#   take tracemalloc snapshots around generation.
+# --------------------------------------------------------------------
+
+import gc
+import os
+import sys
+import time
+import tracemalloc
+import pygame
+import label
+import draw_stats
+
+CATEGORIES = ["Mountain points", "Tree branches", "Leaf objects", "Subtree stamps", "Lazy trees", "Flower stems",
+              "Surfaces"]
+PROGRESS_STEP = 64  # objects counted between calls to the progress function
+SHARED_REFS = 5  # references to a value read from an object when nothing else holds it (see shared)
+
+
+# return the size in bytes of an object with its attributes (or items) and what they hold one level down
+# values that are also held elsewhere (shared colours, small ints) belong to no one object and are left out
+def object_size(obj):
+    size = sys.getsizeof(obj)
+    if isinstance(obj, (list, tuple)):
+        values = list(obj)
+    elif hasattr(obj, "__dict__"):
+        size += sys.getsizeof(obj.__dict__)
+        values = list(obj.__dict__.values())
+    else:
+        values = [getattr(obj, name, None) for name in getattr(type(obj), "__slots__", ())]
+    for v in values:
+        if not shared(v):
+            size += sys.getsizeof(v)
+            if isinstance(v, (list, tuple)):
+                size += sum(sys.getsizeof(item) for item in list(v) if not shared(item))
+    return size
+
+
+# return if a value is held by more than the object it is read from (references: the object, the list of its
+# values, the loop and the argument here and of sys.getrefcount)
+def shared(value):
+    return value is None or sys.getrefcount(value) > SHARED_REFS
+
+
+# return the size in bytes of a list and its items, measuring only the first item of each type
+# (the objects of a category are all alike, so this is close and takes no longer for a large scene)
+def list_size(items, sizes):
+    if items is None:
+        return 0
+    size = sys.getsizeof(items)
+    for item in items:
+        kind = type(item)
+        if kind not in sizes:
+            sizes[kind] = object_size(item)
+        size += sizes[kind]
+    return size
+
+
+# memory used by each category of a generated scene
+class MemoryReport:
+    def __init__(self, traced=None, peak=None, seconds=None, by_file=None):
+        self.counts = dict((name, 0) for name in CATEGORIES)  # number of objects
+        self.bytes = dict((name, 0) for name in CATEGORIES)
+        self.traced = traced  # bytes still allocated after generation (from tracemalloc)
+        self.peak = peak  # highest bytes allocated during generation (from tracemalloc)
+        self.seconds = seconds  # time taken to generate the scene
+        self.by_file = by_file  # (file name, bytes) still allocated after generation, largest first
+        self.sizes = {}  # type -> size of the first object of it measured
+        self.shared = set()  # ids of the atlases and subtree caches already counted
+
+    def add(self, category, count, size):
+        self.counts[category] += count
+        self.bytes[category] += size
+
+    # count the objects of the drawables of a scene. trees is the scene's generated trees of its lazy trees
+    # (descriptor -> tree), which are counted with the lazy trees while the scene keeps them
+    # progress(current, total) is called as they are counted, and stops the count if it returns True
+    # returns if every drawable was counted
+    def add_drawables(self, drawables, trees=None, progress=None):
+        for i, d in enumerate(drawables):
+            if progress is not None and i % PROGRESS_STEP == 0 and progress(i, len(drawables)):
+                return False
+            if hasattr(d, "expand"):
+                # a lazy tree counts the tree generated from it only if it is kept (it is never generated here)
+                tree = trees.get(d.descriptor()) if trees else None
+                tree = tree if tree is not None else d.kept()
+                cover = [] if d.cover is None else d.cover[0] + d.cover[1]
+                self.add("Lazy trees", 1, object_size(d) + list_size(cover, self.sizes))
+                if tree is None:
+                    continue
+                d = tree
+            self.add_drawable(d)
+        return True
+
+    def add_drawable(self, d):
+        atlas = getattr(d, "atlas", None)
+        if atlas is not None and id(atlas) not in self.shared:  # shared sprite atlas, counted once
+            self.shared.add(id(atlas))
+            self.add("Surfaces", len(atlas.sprites), atlas.bytes)
+        if isinstance(d, pygame.Surface):
+            self.add("Surfaces", 1, sys.getsizeof(d) + d.get_width() * d.get_height() * d.get_bytesize())
+        elif hasattr(d, "branches"):
+            # leaves with the sprite key cache of the tree, which is counted with the leaves it draws
+            self.add("Leaf objects", len(d.leaves),
+                     list_size(d.leaves, self.sizes) + list_size(d.leaf_keys, self.sizes))
+            # stamped subtrees and the sprites of the shared subtree cache they come from (counted once)
+            if d.subtrees is not None and id(d.subtrees) not in self.shared:
+                self.shared.add(id(d.subtrees))
+                self.add("Subtree stamps", 0, d.subtrees.bytes)
+            self.add("Subtree stamps", len(d.stamps),
+                     list_size(d.stamps, self.sizes) + list_size(d.stamp_blits, self.sizes))
+            self.add("Tree branches", len(d.branches), object_size(d) - sys.getsizeof(d.branches) +
+                     list_size(d.branches, self.sizes))
+        elif hasattr(d, "stem_points"):
+            self.add("Flower stems", 1, object_size(d))
+        elif hasattr(d, "points"):
+            self.add("Mountain points", len(d.points), object_size(d) - sys.getsizeof(d.points) +
+                     list_size(d.points, self.sizes))
+
+    def total(self):
+        return sum(self.bytes.values())
+
+    # return the report as lines of text
+    def lines(self):
+        lines = []
+        for name in CATEGORIES:
+            lines.append(name + ": " + str(self.counts[name]) + " objects, " + format_bytes(self.bytes[name]))
+        lines.append("Total scene objects: " + format_bytes(self.total()))
+        if self.traced is not None:
+            lines.append("Allocated by generation: " + format_bytes(self.traced) + " (peak " +
+                         format_bytes(self.peak) + ")")
+        if self.by_file:
+            for name, size in self.by_file:
+                lines.append("    from " + name + ": " + format_bytes(size))
+        if self.seconds is not None:
+            lines.append("Generation time" + (" (traced)" if self.traced is not None else "") + ": " +
+                         str(round(self.seconds, 2)) + " s")
+        return lines
+
+    def __str__(self):
+        return "\n".join(self.lines())
+
+
+def format_bytes(n):
+    for unit in ["B", "KB", "MB"]:
+        if abs(n) < 1024:
+            return str(round(n, 1)) + " " + unit
+        n /= 1024
+    return str(round(n, 1)) + " GB"
+
+
+# return the report of a generated scene, None if progress(current, total) stopped it
+# seconds is the time the scene took to generate, if known
+def scene_report(scene, progress=None, seconds=None):
+    report = MemoryReport(seconds=seconds)
+    if not report.add_drawables(scene.drawables, getattr(scene, "trees", None), progress):
+        return None
+    return report
+
+
+# generate a scene with build() while tracing allocations, returning the scene and its report
+# tracing slows generation down many times over, so it is only used for headless reports
+def measure_scene(build, top_files=4):
+    gc.collect()
+    was_tracing = tracemalloc.is_tracing()
+    if not was_tracing:
+        tracemalloc.start()
+    tracemalloc.reset_peak()
+    before = tracemalloc.take_snapshot()
+    start, _ = tracemalloc.get_traced_memory()
+    start_time = time.perf_counter()
+    scene = build()
+    seconds = time.perf_counter() - start_time
+    current, peak = tracemalloc.get_traced_memory()
+    after = tracemalloc.take_snapshot()
+    if not was_tracing:
+        tracemalloc.stop()
+    if scene is None:
+        return None, None
+    # where the memory kept by the scene was allocated
+    by_file = [(os.path.basename(stat.traceback[0].filename), stat.size_diff)
+               for stat in after.compare_to(before, "filename")[:top_files] if stat.size_diff > 0]
+    report = MemoryReport(current - start, peak - start, seconds, by_file)
+    report.add_drawables(scene.drawables, getattr(scene, "trees", None))
+    return scene, report
+
+
+# panel drawn over a scene showing a memory report
+class MemoryOverlay:
+    def __init__(self, report, x=140, y=10):
+        self.x = x
+        self.y = y
+        font = label.get_font("lucida bright", 14)
+        texts = [font.render(line, True, (255, 255, 255)) for line in report.lines()]
+        w = max(t.get_width() for t in texts) + 20
+        h = sum(t.get_height() for t in texts) + 20
+        self.surface = pygame.Surface((w, h))
+        self.surface.set_alpha(200)
+        y = 10
+        for t in texts:
+            self.surface.blit(t, (10, y))
+            y += t.get_height()
+
+    def draw(self, win):
+        win.blit(self.surface, (self.x, self.y))
+        draw_stats.blits += 1
@@ -0,0 +1,226 @@
+# --------------------------------------------------------------------
+# Program: Occlusion Culling
+# Date: Oct 19 2026
+# Description: Removes scene objects that are completely hidden behind
+#   objects drawn after them. Objects are walked from front to back
+#   while a coarse coverage buffer records the screen cells that are
+#   already fully painted.
+# --------------------------------------------------------------------
+
+from bisect import bisect_left
+
+CELL = 4  # size of the cells of the coverage buffer in pixels
+
+
+# coarse grid of screen cells that are known to be fully painted
+class CoverageBuffer:
+    def __init__(self, width, height, cell=CELL):
+        self.width = width
+        self.height = height
+        self.cell = cell  # cell size in pixels
+        self.cols = -(-width // cell)
+        self.rows = -(-height // cell)
+        self.cells = [bytearray(self.cols) for _ in range(self.rows)]
+
+    # return if every cell touched by a box (x1, y1, x2, y2 inclusive pixels) is covered
+    def is_covered(self, box):
+        x1, y1, x2, y2 = box
+        x1, y1 = max(x1, 0), max(y1, 0)
+        x2, y2 = min(x2, self.width - 1), min(y2, self.height - 1)
+        if x1 > x2 or y1 > y2:  # off screen
+            return True
+        c1, c2 = x1 // self.cell, x2 // self.cell + 1
+        for r in range(y1 // self.cell, y2 // self.cell + 1):
+            if self.cells[r].find(0, c1, c2) != -1:
+                return False
+        return True
+
+    # mark every cell that lies completely inside a box (inclusive pixels) as covered
+    def cover(self, x1, y1, x2, y2):
+        cell = self.cell
+        c1 = max(-(-x1 // cell), 0)
+        c2 = min((x2 + 1) // cell, self.cols)
+        r1 = max(-(-y1 // cell), 0)
+        r2 = min((y2 + 1) // cell, self.rows)
+        if c1 < c2:
+            fill = b"\x01" * (c2 - c1)
+            for r in range(r1, r2):
+                self.cells[r][c1:c2] = fill
+
+
+# counters for one culling pass
+class OcclusionStats:
+    def __init__(self):
+        self.tested = {}  # kind -> objects tested
+        self.culled = {}  # kind -> objects removed
+
+    def add(self, kind, culled):
+        self.tested[kind] = self.tested.get(kind, 0) + 1
+        if culled:
+            self.culled[kind] = self.culled.get(kind, 0) + 1
+
+    def total_tested(self):
+        return sum(self.tested.values())
+
+    def total_culled(self):
+        return sum(self.culled.values())
+
+    def __str__(self):
+        parts = [kind + " " + str(self.culled.get(kind, 0)) + "/" + str(n) for kind, n in self.tested.items()]
+        return "culled " + str(self.total_culled()) + "/" + str(self.total_tested()) + " (" + ", ".join(parts) + ")"
+
+
+# ------------------ Bounding Boxes ------------------
+
+# return the kind of a scene object, None if it can not be culled
+# lazy trees (fractals.LazyTree) are known by what they are made from, without generating them
+def object_kind(obj):
+    if hasattr(obj, "expand") or hasattr(obj, "branches"):
+        return "tree"
+    if hasattr(obj, "petals_center"):
+        return "flower"
+    if hasattr(obj, "points"):
+        return "mountain"
+    return None
+
+
+# return a conservative screen space box (x1, y1, x2, y2 inclusive) around everything an object draws
+def bounding_box(obj):
+    kind = object_kind(obj)
+    if kind == "tree" and hasattr(obj, "expand"):
+        # a lazy tree stores the box of its generated tree
+        return obj.box if obj.box is not None else bounding_box(obj.expand())
+    if kind == "tree":
+        # leaves grow from the ends of branches (or the root), so the branch box padded by the leaf size holds them
+        branches = obj.branches
+        leaves = obj.leaves
+        pad = max([leaf.size for leaf in leaves], default=0)
+        if branches:
+            pad = max(pad, max([b.width for b in branches]) // 2 + 1)
+            xs = [b.a[0] for b in branches] + [b.b[0] for b in branches]
+            ys = [b.a[1] for b in branches] + [b.b[1] for b in branches]
+        elif leaves:
+            xs = [leaf.pos[0] for leaf in leaves]
+            ys = [leaf.pos[1] for leaf in leaves]
+        else:
+            return None
+        box = int(min(xs)) - pad, int(min(ys)) - pad, int(max(xs)) + pad, int(max(ys)) + pad
+        # subtrees stamped from cached sprites (see subtrees.py) add the boxes of their sprites
+        for x1, y1, x2, y2 in [stamp.box() for stamp in obj.stamps]:
+            box = min(box[0], x1), min(box[1], y1), max(box[2], x2), max(box[3], y2)
+        return box
+    if kind == "flower":
+        w = obj.stem_width // 2 + 1
+        r = obj.radius + 1
+        cx, cy = obj.petals_center
+        xs = [p[0] for p in obj.stem_points]
+        ys = [p[1] for p in obj.stem_points]
+        return (min(min(xs) - w, cx - r), min(min(ys) - w, cy - r),
+                max(max(xs) + w, cx + r), max(max(ys) + w, cy + r))
+    if kind == "mountain":
+        xs = [p[0] for p in obj.points]
+        ys = [p[1] for p in obj.points]
+        return min(xs), min(ys), max(xs), max(ys)
+    return None
+
+
+# ------------------ Coverage ------------------
+
+# mark the cells that a mountain polygon is sure to fill
+def cover_mountain(buffer, m):
+    points = m.points
+    xs = [p[0] for p in points]
+    base = min(points[0][1], points[-1][1]) - 1
+    cell = buffer.cell
+
+    # ridge height at an x coordinate
+    def ridge_y(x):
+        i = min(max(bisect_left(xs, x), 1), len(xs) - 1)
+        (ax, ay), (bx, by) = points[i - 1], points[i]
+        if bx == ax:
+            return max(ay, by)
+        return ay + (by - ay) * (x - ax) / (bx - ax)
+
+    col = -(-(xs[0] + 1) // cell)
+    while (col + 1) * cell - 1 < xs[-1]:
+        x1, x2 = col * cell, (col + 1) * cell - 1
+        low = max(ridge_y(x1), ridge_y(x2))
+        for i in range(bisect_left(xs, x1), bisect_left(xs, x2)):
+            low = max(low, points[i][1])
+        buffer.cover(x1, int(low) + 2, x2, base)
+        col += 1
+
+
+# mark the cells that a thick, mostly vertical branch is sure to fill
+def cover_branch(buffer, b):
+    half = (b.width - 1) // 2 - 1
+    if half * 2 < buffer.cell:
+        return
+    (ax, ay), (bx, by) = b.a, b.b
+    if abs(by - ay) <= abs(bx - ax):
+        return
+    if ay > by:
+        (ax, ay), (bx, by) = (bx, by), (ax, ay)
+    cell = buffer.cell
+    for r in range(-(-ay // cell), (by + 1) // cell):
+        y1, y2 = r * cell, r * cell + cell - 1
+        xa = ax + (bx - ax) * (y1 - ay) / (by - ay)
+        xb = ax + (bx - ax) * (y2 - ay) / (by - ay)
+        buffer.cover(int(max(xa, xb)) - half + 1, y1, int(min(xa, xb)) + half - 1, y2)
+
+
+# mark the cells that a filled circle is sure to fill
+def cover_circle(buffer, center, radius):
+    k = int(radius * 0.7) - 1
+    if k * 2 >= buffer.cell:
+        buffer.cover(center[0] - k, center[1] - k, center[0] + k - 1, center[1] + k - 1)
+
+
+# return the branches and leaves of a tree that can fill a whole cell (thick branches and large leaves)
+# lazy trees (fractals.LazyTree) store them for CELL when they are made, so they are culled without being generated
+def cover_shapes(tree, cell=CELL):
+    return ([b for b in tree.branches if b.width > cell + 3],
+            [leaf for leaf in tree.leaves if leaf.size > cell // 2 + 2])
+
+
+# mark the cells an object is sure to fill
+def cover_object(buffer, obj):
+    kind = object_kind(obj)
+    if kind == "tree":
+        if hasattr(obj, "expand") and obj.cover is not None and buffer.cell == CELL:
+            branches, leaves = obj.cover
+        else:
+            branches, leaves = cover_shapes(obj, buffer.cell)
+        for b in branches:
+            cover_branch(buffer, b)
+        for leaf in leaves:
+            cover_circle(buffer, leaf.pos, leaf.size)
+    elif kind == "flower":
+        cover_circle(buffer, obj.petals_center, obj.radius)
+    elif kind == "mountain":
+        cover_mountain(buffer, obj)
+
+
+# return the drawables (in drawing order) that are not completely hidden by drawables after them,
+# and the counts of what was removed
+# boxes is a list of the bounding boxes of the drawables if they are already known
+def cull(drawables, width, height, cell=CELL, boxes=None):
+    buffer = CoverageBuffer(width, height, cell)
+    stats = OcclusionStats()
+    visible = []
+    if boxes is None:
+        boxes = [None] * len(drawables)
+    for d, box in zip(reversed(drawables), reversed(boxes)):
+        kind = object_kind(d)
+        if kind is None:  # unknown drawables are always kept and assumed to cover nothing
+            visible.append(d)
+            continue
+        if box is None:
+            box = bounding_box(d)
+        hidden = box is None or buffer.is_covered(box)
+        stats.add(kind, hidden)
+        if not hidden:
+            visible.append(d)
+            cover_object(buffer, d)
+    visible.reverse()
+    return visible, stats
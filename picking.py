@@ -0,0 +1,203 @@
+# --------------------------------------------------------------------
+# Program: Object Picking
+# Date: Oct 19 2026
+# Description: Finds the scene object under a point of a generated
+#   scene. Every object's bounding box is stored in a uniform grid of
+#   screen cells, so a query only looks at the few objects whose boxes
+#   touch the cell of the point. Those are tested top-most first
+#   against the shapes the object actually draws.
+# --------------------------------------------------------------------
+
+import numpy as np
+import pygame
+import occlusion
+
+
+# one object in the index
+class Entry:
+    def __init__(self, drawable, box, params=None):
+        self.drawable = drawable
+        self.box = box  # (x1, y1, x2, y2) inclusive screen box
+        self.kind = occlusion.object_kind(drawable)
+        self.params = params  # parameters the object was generated with (a dict), None if unknown
+        self.shape = None  # arrays of the shapes it draws, made the first time it is tested
+
+
+# uniform grid of the objects of a scene
+class SceneIndex:
+    # params is a list of the generation parameters of each drawable (or None),
+    # boxes a list of their bounding boxes if they are already known
+    def __init__(self, drawables, width, height, cell=32, params=None, boxes=None):
+        self.width = width
+        self.height = height
+        self.cell = cell
+        self.cols = -(-width // cell)
+        self.rows = -(-height // cell)
+        self.cells = [[] for _ in range(self.cols * self.rows)]  # entry indices in drawing order
+        self.entries = []
+        if params is None:
+            params = [None] * len(drawables)
+        if boxes is None:
+            boxes = [occlusion.bounding_box(d) for d in drawables]
+        for d, p, box in zip(drawables, params, boxes):
+            if box is not None and occlusion.object_kind(d) is not None:
+                self.add(Entry(d, box, p))
+
+    def add(self, entry):
+        x1, y1, x2, y2 = entry.box
+        c1, c2 = max(x1 // self.cell, 0), min(x2 // self.cell, self.cols - 1)
+        r1, r2 = max(y1 // self.cell, 0), min(y2 // self.cell, self.rows - 1)
+        if c1 > c2 or r1 > r2:  # off screen
+            return
+        i = len(self.entries)
+        self.entries.append(entry)
+        for r in range(r1, r2 + 1):
+            row = r * self.cols
+            for col in range(c1, c2 + 1):
+                self.cells[row + col].append(i)
+
+    # return the entry of the top-most object drawn at a point, None if only the background is there
+    def pick(self, x, y):
+        if not (0 <= x < self.width and 0 <= y < self.height):
+            return None
+        for i in reversed(self.cells[(y // self.cell) * self.cols + x // self.cell]):
+            entry = self.entries[i]
+            x1, y1, x2, y2 = entry.box
+            if x1 <= x <= x2 and y1 <= y <= y2 and hit_test(entry, x, y):
+                return entry
+        return None
+
+
+# ------------------ Hit Tests ------------------
+
+# size of the cells that the shapes of one object are sorted into
+SHAPE_CELL = 16
+
+
+# shapes drawn by a tree or flower, sorted into a grid of cells over its box
+# so a point is only tested against the few shapes of its cell
+class ShapeGrid:
+    def __init__(self, box, a, b, half, centers, radii):
+        self.x, self.y = box[0], box[1]
+        self.cols = (box[2] - box[0]) // SHAPE_CELL + 1
+        self.a, self.b, self.half = a, b, half
+        self.centers, self.radii = centers, radii
+        self.segments = len(a)  # shape numbers below this are segments, the rest are circles
+
+        # box of every shape
+        x1 = np.concatenate([np.minimum(a[:, 0], b[:, 0]) - half, centers[:, 0] - radii])
+        y1 = np.concatenate([np.minimum(a[:, 1], b[:, 1]) - half, centers[:, 1] - radii])
+        x2 = np.concatenate([np.maximum(a[:, 0], b[:, 0]) + half, centers[:, 0] + radii])
+        y2 = np.concatenate([np.maximum(a[:, 1], b[:, 1]) + half, centers[:, 1] + radii])
+        rows = self.rows = (box[3] - box[1]) // SHAPE_CELL + 1
+        c1 = np.clip((x1 - self.x) // SHAPE_CELL, 0, self.cols - 1).astype(np.int64)
+        c2 = np.clip((x2 - self.x) // SHAPE_CELL, 0, self.cols - 1).astype(np.int64)
+        r1 = np.clip((y1 - self.y) // SHAPE_CELL, 0, rows - 1).astype(np.int64)
+        r2 = np.clip((y2 - self.y) // SHAPE_CELL, 0, rows - 1).astype(np.int64)
+
+        # one (cell, shape) pair for every cell a shape's box touches, grouped by cell
+        w = c2 - c1 + 1
+        counts = w * (r2 - r1 + 1)
+        shape = np.repeat(np.arange(len(counts)), counts)
+        k = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+        cell = (r1[shape] + k // w[shape]) * self.cols + c1[shape] + k % w[shape]
+        order = np.argsort(cell, kind="stable")
+        self.shapes = shape[order]
+        self.starts = np.searchsorted(cell[order], np.arange(rows * self.cols + 1))
+
+    # return if a pixel is on one of the shapes
+    def hit(self, x, y):
+        col, row = (x - self.x) // SHAPE_CELL, (y - self.y) // SHAPE_CELL
+        if not (0 <= col < self.cols and 0 <= row < self.rows):
+            return False
+        cell = row * self.cols + col
+        shapes = self.shapes[self.starts[cell]:self.starts[cell + 1]]
+        if len(shapes) == 0:
+            return False
+        segments = shapes[shapes < self.segments]
+        circles = shapes[shapes >= self.segments] - self.segments
+        return ((len(circles) > 0 and in_circles(x, y, self.centers[circles], self.radii[circles])) or
+                (len(segments) > 0 and on_segments(x, y, self.a[segments], self.b[segments], self.half[segments])))
+
+
+# return if a point is on a group of thick line segments (arrays of ends a, b and half widths)
+# pygame widens a line along its minor axis (sideways for steep lines, up and down for flat ones),
+# so the distance is measured along that axis
+def on_segments(x, y, a, b, half):
+    d = b - a
+    steep = np.abs(d[:, 1]) > np.abs(d[:, 0])
+    # position along the major axis and distance along the minor axis
+    major_a = np.where(steep, a[:, 1], a[:, 0])
+    major_d = np.where(steep, d[:, 1], d[:, 0])
+    minor_a = np.where(steep, a[:, 0], a[:, 1])
+    minor_d = np.where(steep, d[:, 0], d[:, 1])
+    t = (np.where(steep, y, x) - major_a) / np.where(major_d == 0, 1, major_d)
+    along = (t >= -0.5 / np.maximum(np.abs(major_d), 1)) & (t <= 1 + 0.5 / np.maximum(np.abs(major_d), 1))
+    return bool((along & (np.abs(np.where(steep, x, y) - minor_a - minor_d * t) <= half)).any())
+
+
+# pixels of a filled circle of each radius as pygame draws it, made the first time a radius is needed
+disks = {}
+
+
+# return the pixels of a circle drawn at (r, r) with a radius of r, as a [y, x] array of booleans
+def disk(r):
+    pixels = disks.get(r)
+    if pixels is None:
+        surf = pygame.Surface((2 * r + 1, 2 * r + 1))
+        surf.fill((0, 0, 0))
+        pygame.draw.circle(surf, (255, 255, 255), (r, r), r)
+        pixels = pygame.surfarray.array_red(surf).T > 0
+        disks[r] = pixels
+    return pixels
+
+
+# return if a pixel is in a group of filled circles (arrays of centres and radii)
+def in_circles(x, y, centers, radii):
+    # only circles whose square around them holds the pixel are checked against their drawn pixels
+    near = (np.abs(centers[:, 0] - x) <= radii) & (np.abs(centers[:, 1] - y) <= radii)
+    for (cx, cy), r in zip(centers[near].tolist(), radii[near].tolist()):
+        r = int(r)
+        dx, dy = int(x - cx) + r, int(y - cy) + r
+        if 0 <= dx <= 2 * r and 0 <= dy <= 2 * r and disk(r)[dy, dx]:
+            return True
+    return False
+
+
+# arrays of the shapes an object draws
+def make_shape(entry):
+    d = entry.drawable
+    if entry.kind == "tree":
+        branches = d.branches
+        leaves = [leaf for leaf in d.leaves if leaf.size > 0]
+        a = [np.array([b.a for b in branches], dtype=np.float64).reshape(-1, 2)]
+        b = [np.array([b.b for b in branches], dtype=np.float64).reshape(-1, 2)]
+        half = [np.array([b.width / 2 for b in branches])]
+        centers = [np.array([leaf.pos for leaf in leaves], dtype=np.float64).reshape(-1, 2)]
+        radii = [np.array([leaf.size for leaf in leaves], dtype=np.float64)]
+        for stamp in d.stamps:  # subtrees drawn from cached sprites
+            stamp_a, stamp_b, stamp_centers = stamp.shapes()
+            a.append(stamp_a)
+            b.append(stamp_b)
+            half.append(np.array(stamp.subtree.widths) / 2)
+            centers.append(stamp_centers)
+            radii.append(np.array(stamp.subtree.sizes, dtype=np.float64))
+        return ShapeGrid(entry.box, np.concatenate(a), np.concatenate(b), np.concatenate(half),
+                         np.concatenate(centers), np.concatenate(radii))
+    if entry.kind == "flower":
+        points = np.array(d.stem_points, dtype=np.float64)
+        return ShapeGrid(entry.box, points[:-1], points[1:], np.full(len(points) - 1, d.stem_width / 2),
+                         np.array([d.petals_center], dtype=np.float64), np.array([d.radius], dtype=np.float64))
+    # mountain: the ridge from left to right and the base it stands on
+    points = np.array(d.points, dtype=np.float64)
+    return points[:, 0], points[:, 1], max(points[0][1], points[-1][1])
+
+
+# return if a point is on what an object draws (not just inside its box)
+def hit_test(entry, x, y):
+    if entry.shape is None:
+        entry.shape = make_shape(entry)
+    if entry.kind == "mountain":
+        xs, ys, base = entry.shape
+        return xs[0] <= x <= xs[-1] and np.interp(x, xs, ys) <= y <= base
+    return entry.shape.hit(x, y)
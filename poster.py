@@ -0,0 +1,172 @@
+# --------------------------------------------------------------------
+# Program: Poster Renderer
+# Date: Oct 19 2026
+# Description: Offscreen rendering of a generated scene at print
+#   resolution. The canvas is drawn one band of tiles (the full width,
+#   one tile high) at a time and every finished row is streamed into a
+#   PNG file, so only one band is held however tall the output is.
+#   Tiles in a band can be rendered in parallel by forked worker
+#   processes where forking is safe.
+# --------------------------------------------------------------------
+
+import pygame
+import os
+import zlib
+import struct
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+import color as c
+import occlusion
+
+
+# PNG file writer that accepts rows of RGB pixels as they are finished
+class PNGWriter:
+    def __init__(self, path, width, height, chunk_size=1024 * 1024):
+        self.file = open(path, "wb")
+        self.width = width
+        self.height = height
+        self.rows_written = 0
+        self.chunk_size = chunk_size  # bytes of compressed data held before writing an IDAT chunk
+        self.compressor = zlib.compressobj(6)
+        self.pending = []
+        self.pending_size = 0
+        self.file.write(b"\x89PNG\r\n\x1a\n")
+        # 8 bit RGB, no interlacing
+        self.write_chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0))
+
+    def write_chunk(self, kind, data):
+        self.file.write(struct.pack(">I", len(data)))
+        self.file.write(kind)
+        self.file.write(data)
+        self.file.write(struct.pack(">I", zlib.crc32(data, zlib.crc32(kind)) & 0xffffffff))
+
+    # add compressed data, writing an IDAT chunk once enough is held
+    def add_compressed(self, data, flush=False):
+        if data:
+            self.pending.append(data)
+            self.pending_size += len(data)
+        if self.pending_size >= self.chunk_size or (flush and self.pending_size):
+            self.write_chunk(b"IDAT", b"".join(self.pending))
+            self.pending = []
+            self.pending_size = 0
+
+    # write rows of RGB bytes (width * 3 bytes per row)
+    def write_rows(self, data):
+        row_size = self.width * 3
+        rows = len(data) // row_size
+        if self.rows_written + rows > self.height:
+            raise Exception("More rows written than the height of the image")
+        for r in range(rows):
+            self.add_compressed(self.compressor.compress(b"\x00" + data[r * row_size:(r + 1) * row_size]))
+        self.rows_written += rows
+
+    def close(self):
+        self.add_compressed(self.compressor.flush(), True)
+        self.write_chunk(b"IEND", b"")
+        self.file.close()
+        if self.rows_written != self.height:
+            raise Exception("PNG closed with " + str(self.rows_written) + " of " + str(self.height) + " rows")
+
+    # close and delete an unfinished image
+    def abort(self):
+        self.file.close()
+        os.remove(self.file.name)
+
+
+# ------------------ Tile Rendering ------------------
+
+# scene being rendered by this process (set once per worker so it is not sent with every tile)
+tile_scene = None
+
+
+def set_tile_scene(scene):
+    global tile_scene
+    tile_scene = scene
+
+
+# scene description shared with the tile renderers
+class PosterScene:
+    def __init__(self, drawables, ground_y, scale, sky=c.SKY, ground=c.DARK_GREEN):
+        self.drawables = [d for d in drawables if hasattr(d, "draw_transformed")]
+        self.boxes = [occlusion.bounding_box(d) for d in self.drawables]
+        self.ground_y = ground_y  # y coordinate where the ground starts (unscaled)
+        self.scale = scale
+        self.sky = sky
+        self.ground = ground
+
+
+# draw the part of the scene inside a tile (x, y, w, h in output pixels) and return its RGB bytes
+def render_tile(rect, scene=None):
+    if scene is None:
+        scene = tile_scene
+    x, y, w, h = rect
+    s = scene.scale
+    surf = pygame.Surface((w, h))
+    surf.fill(scene.sky)
+    ground_top = scene.ground_y * s - y
+    if ground_top < h:
+        pygame.draw.rect(surf, scene.ground, (0, ground_top, w, h - ground_top))
+    offset = (-x, -y)
+    for d, box in zip(scene.drawables, scene.boxes):
+        if box is None:
+            continue
+        # skip objects that do not reach this tile
+        if box[2] * s < x - 1 or box[0] * s > x + w + 1 or box[3] * s < y - 1 or box[1] * s > y + h + 1:
+            continue
+        d.draw_transformed(surf, s, offset)
+    return pygame.image.tobytes(surf, "RGB")
+
+
+# return if tiles can be rendered by forked workers: forking needs to exist (not on Windows) and must not copy
+# a process with a window open, so the program's own exports render their tiles in this process
+def can_fork():
+    return "fork" in multiprocessing.get_all_start_methods() and pygame.display.get_surface() is None
+
+
+# render a scene to a PNG file at a multiple of the size it was generated at
+# progress(current_band, total_bands) is called after each band, returning True stops the render
+def render_poster(drawables, ground_y, base_size, path, scale, tile_size=512, workers=0, progress=None):
+    width = int(base_size[0] * scale)
+    height = int(base_size[1] * scale)
+    scene = PosterScene(drawables, ground_y, scale)
+    bands = list(range(0, height, tile_size))
+
+    pool = None
+    if workers > 1 and can_fork():
+        # forked workers inherit the scene instead of receiving it for every tile
+        pool = ProcessPoolExecutor(workers, multiprocessing.get_context("fork"), set_tile_scene, (scene,))
+    else:
+        set_tile_scene(scene)
+
+    png = PNGWriter(path, width, height)
+    finished = False
+    try:
+        for i, band_y in enumerate(bands):
+            band_h = min(tile_size, height - band_y)
+            rects = [(x, band_y, min(tile_size, width - x), band_h) for x in range(0, width, tile_size)]
+            if pool is not None:
+                tiles = list(pool.map(render_tile, rects))
+            else:
+                tiles = [render_tile(r) for r in rects]
+
+            # join the tiles of the band into full rows
+            rows = []
+            for r in range(band_h):
+                for rect, tile in zip(rects, tiles):
+                    row_size = rect[2] * 3
+                    rows.append(tile[r * row_size:(r + 1) * row_size])
+            png.write_rows(b"".join(rows))
+            del tiles, rows
+
+            if progress is not None and progress(i + 1, len(bands)):
+                break
+        else:
+            png.close()
+            finished = True
+    finally:
+        if not finished:
+            png.abort()
+        if pool is not None:
+            pool.shutdown()
+        set_tile_scene(None)
+    return finished
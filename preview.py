@@ -0,0 +1,118 @@
+# --------------------------------------------------------------------
+# Program: Scene Preview Panel
+# Date: Oct 19 2026
+# Description: Small live preview of the scene settings. Whenever the
+#   settings change, a background thread regenerates a low detail
+#   scene once the sliders have been still for a moment. A newer
+#   change cancels the scene being generated, and only the latest
+#   finished preview is shown.
+# --------------------------------------------------------------------
+
+import copy
+import time
+import threading
+import pygame
+import color as c
+import draw_stats
+
+
+class PreviewPanel:
+    # generate(settings, cancelled) returns (drawables, ground_y) or None if cancelled() became True
+    # scale is the size of the panel compared to the full scene
+    # clock returns the time in seconds the delay is measured with, seed the seed of a new preview scene (None for
+    # a random one). Both are read in the main thread, so replayed input gives the same previews
+    def __init__(self, rect, scale, settings, generate, delay=0.3, visible=False, clock=time.perf_counter,
+                 seed=lambda: None):
+        self.x, self.y, self.w, self.h = rect
+        self.scale = scale
+        self.settings = settings
+        self.generate = generate
+        self.delay = delay  # seconds without changes before a new preview is started
+        self.visible = visible
+        self.clock = clock
+        self.seed = seed
+
+        self.condition = threading.Condition()
+        self.values = None  # settings values of the newest request
+        self.request_id = 0  # id of the newest request
+        self.request_time = 0
+        self.request_seed = None
+        self.image = None  # latest finished preview
+        self.image_id = -1
+        self.busy = False
+        self.thread = None
+
+    # queue a new preview if the settings have changed since the last request
+    def update(self):
+        values = self.settings.scene_values()
+        if values == self.values:
+            return
+        with self.condition:
+            self.values = values
+            self.request_id += 1
+            self.request_time = self.clock()
+            self.request_seed = self.seed() if self.settings.seed is None else None
+            self.condition.notify()
+        if self.thread is None:
+            self.thread = threading.Thread(target=self.run, daemon=True)
+            self.thread.start()
+
+    # background thread generating previews
+    def run(self):
+        done_id = 0
+        while True:
+            with self.condition:
+                while self.request_id == done_id:
+                    self.condition.wait()
+                # wait until the settings have been still for the delay
+                while self.clock() - self.request_time < self.delay:
+                    self.condition.wait(self.delay - (self.clock() - self.request_time))
+                job_id = self.request_id
+                job_settings = copy.copy(self.settings)
+                if self.request_seed is not None:
+                    job_settings.seed = self.request_seed
+            self.busy = True
+            result = self.generate(job_settings, lambda: self.request_id != job_id)
+            if result is not None and job_id == self.request_id:
+                self.image = self.render(*result)
+                self.image_id = job_id
+            self.busy = False
+            done_id = job_id
+
+    # draw a generated scene scaled down to the panel
+    def render(self, drawables, ground_y):
+        scale = self.scale
+        surf = pygame.Surface((self.w, self.h))
+        surf.fill(c.SKY)
+        pygame.draw.rect(surf, c.DARK_GREEN, (0, ground_y * scale, self.w, self.h))
+        for d in drawables:
+            d.draw_transformed(surf, scale, (0, 0))
+        return surf
+
+    # return a value that changes whenever the panel would be drawn differently,
+    # first queueing a new preview if the settings have changed
+    def state(self):
+        if not self.visible:
+            return False
+        self.update()
+        return self.image_id, self.busy or self.image_id != self.request_id
+
+    def draw(self, win):
+        if not self.visible:
+            return
+        self.update()
+        pygame.draw.rect(win, c.BLACK, (self.x - 2, self.y - 2, self.w + 4, self.h + 4))
+        draw_stats.draw_calls += 1
+        if self.image is not None:
+            win.blit(self.image, (self.x, self.y))
+            draw_stats.blits += 1
+        else:
+            pygame.draw.rect(win, c.SKY, (self.x, self.y, self.w, self.h))
+            draw_stats.draw_calls += 1
+        if self.busy or self.image_id != self.request_id:
+            # small marker while a newer preview is on its way
+            pygame.draw.circle(win, c.RED, (self.x + self.w - 8, self.y + 8), 4)
+            draw_stats.draw_calls += 1
+
+    def set_visible(self, b):
+        self.visible = b
@@ -0,0 +1,81 @@
+# --------------------------------------------------------------------
+# Program: Random Streams
+# Date: Oct 19 2026
+# Description: Random number source for the generators. Numbers are
+#   drawn in blocks from a NumPy Generator and handed out one at a
+#   time, with a separate prefetched block for every integer range that
+#   is asked for. The stream has the randrange/choice/random methods of
+#   the random module, so it can be passed anywhere the module was used.
+# --------------------------------------------------------------------
+
+import math
+import numpy as np
+
+# most integer ranges that get their own block, any other range is drawn from the float block
+MAX_RANGES = 256
+
+
+class RandomStream:
+    def __init__(self, seed=None, block=1024):
+        self.block = block  # numbers drawn from the generator at a time
+        self.seed(seed)
+
+    # restart the stream, the same seed always gives the same numbers
+    def seed(self, seed=None):
+        self.generator = np.random.default_rng(seed)
+        self.ranges = {}  # (start, stop) -> function returning the next integer of the range
+        self.next_float = self.block_reader(lambda: self.generator.random(self.block).tolist())
+
+    # return a function returning the next number of the blocks made by fill()
+    @staticmethod
+    def block_reader(fill):
+        def read():
+            while True:
+                yield from fill()
+        return read().__next__
+
+    # return a function returning the next integer from start (inclusive) to stop (exclusive)
+    # once there are MAX_RANGES blocks the function draws each integer from the float block
+    def ints(self, start, stop):
+        key = (start, stop)
+        draw = self.ranges.get(key)
+        if draw is None:
+            if len(self.ranges) >= MAX_RANGES:
+                return lambda: start + math.floor(self.next_float() * (stop - start))
+            draw = self.block_reader(lambda: self.generator.integers(start, stop, self.block).tolist())
+            self.ranges[key] = draw
+        return draw
+
+    # compile a value that is either a number or a (start, stop) range into a function returning
+    # the number or a random integer of the range (the same rules as random_if_range)
+    def spec(self, a):
+        if type(a) == tuple or type(a) == list:
+            if int(a[0]) < int(a[1]):
+                return self.ints(int(a[0]), int(a[1]))
+            a = a[0]
+        return lambda: a
+
+    # return an array of n integers from start (inclusive) to stop (exclusive), drawn at once
+    def int_array(self, start, stop, n):
+        return self.generator.integers(start, stop, n)
+
+    def randrange(self, start, stop=None):
+        draw = self.ranges.get((start, stop))
+        if draw is not None:  # ranges already asked for are checked first, as most calls repeat a range
+            return draw()
+        key = (start, stop)
+        if stop is None:
+            start, stop = 0, start
+        if start >= stop:
+            raise ValueError("empty range for randrange() (" + str(start) + ", " + str(stop) + ")")
+        if len(self.ranges) < MAX_RANGES:
+            draw = self.ints(start, stop)
+            self.ranges[key] = draw
+            return draw()
+        return start + math.floor(self.next_float() * (stop - start))
+
+    def random(self):
+        return self.next_float()
+
+    def choice(self, seq):
+        return seq[self.randrange(len(seq))]
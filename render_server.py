@@ -0,0 +1,368 @@
+# --------------------------------------------------------------------
+# Program: Render Server
+# Date: Oct 19 2026
+# Description: Long running local service that renders scenes on
+#   demand. Jobs are posted as JSON over localhost HTTP, wait in a
+#   queue and are rendered by a pool of worker processes that are
+#   started once with the generation core already imported. A job
+#   returns the PNG bytes of its scene or saves them to a file path
+#   inside the output directory. The queue depth and the latency of
+#   recent jobs are reported at /status.
+#
+#   python render_server.py --port 8765 --workers 4 --output-dir renders
+#   POST /render  {"seed": 4, "scale": 2, "scene": "forest", "settings": {"tree_chance": 5}}
+#   GET  /status
+# --------------------------------------------------------------------
+
+import os
+import io
+import json
+import time
+import queue
+import argparse
+import tempfile
+import threading
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+import pygame
+import fractals
+import sprites
+import subtrees
+import poster
+import random_stream
+
+SCENE_TYPES = ["forest", "trees"]  # generated scene, or the scene of a few large trees
+MAX_SCALE = 8
+
+# (lowest, highest) value of every number setting a job can change, the scene ones are the ranges of their sliders
+H = fractals.SCENE_HEIGHT
+SETTING_RANGES = {"mountain_start": (H // 2 - 200, H // 2 + 50), "mountain_end": (H // 2 + 51, H // 2 + 200),
+                  "mountain_frequency": (1, 30), "foreground_start": (H // 2 + 51, H - 1),
+                  "secondary_foreground_start": (H - 300, H - 10), "foreground_end": (H - 100, H),
+                  "tree_chance": (1, 100), "bush_chance": (1, 10), "flower_chance": (1, 10),
+                  "sprite_quantization": (1, 64), "sprite_memory": (0, 256 * 1024 * 1024), "subtree_step": (1, 45),
+                  "subtree_memory": (0, 256 * 1024 * 1024), "poster_tile": (64, 4096)}
+
+
+# a render request, checked before it is queued
+class RenderJob:
+    def __init__(self, seed=None, scale=1, scene="forest", settings=None, path=None):
+        self.seed = seed
+        self.scale = scale  # size of the image as a multiple of the scene size
+        self.scene = scene
+        self.settings = settings or {}  # values of scene settings that differ from the defaults
+        self.path = path  # file the PNG is saved to, None to return its bytes
+
+    # make a job from a decoded JSON request, raising ValueError if it is not a valid job
+    # a path is resolved inside the output directory, paths that lead out of it are refused
+    @staticmethod
+    def from_json(data, output_dir="."):
+        if not isinstance(data, dict):
+            raise ValueError("job must be a JSON object")
+        unknown = set(data) - {"seed", "scale", "scene", "settings", "path"}
+        if unknown:
+            raise ValueError("unknown job fields: " + ", ".join(sorted(unknown)))
+        job = RenderJob(data.get("seed"), data.get("scale", 1), data.get("scene", "forest"),
+                        data.get("settings"), data.get("path"))
+        if job.seed is not None and type(job.seed) != int:
+            raise ValueError("seed must be an integer")
+        if type(job.scale) not in (int, float) or not 0 < job.scale <= MAX_SCALE:
+            raise ValueError("scale must be a number above 0 and at most " + str(MAX_SCALE))
+        if job.scene not in SCENE_TYPES:
+            raise ValueError("scene must be one of " + ", ".join(SCENE_TYPES))
+        if job.path is not None:
+            if type(job.path) != str:
+                raise ValueError("path must be a string")
+            job.path = output_path(output_dir, job.path)
+        if not isinstance(job.settings, dict):
+            raise ValueError("settings must be a JSON object")
+        make_settings(job.settings)
+        return job
+
+
+# return the absolute path of a file inside the output directory, raising ValueError if it is outside of it
+def output_path(output_dir, path):
+    root = os.path.realpath(output_dir)
+    full = os.path.realpath(os.path.join(root, path))
+    if full == root or os.path.commonpath([root, full]) != root:
+        raise ValueError("path must be a file inside the output directory")
+    return full
+
+
+# return scene settings with some values changed, raising ValueError for unknown, mistyped or out of range settings
+def make_settings(values):
+    s = fractals.Settings()
+    for name, value in values.items():
+        current = getattr(s, name, None)
+        if name.startswith("_") or type(current) not in (int, float, bool) or \
+                type(current) != bool and name not in SETTING_RANGES:
+            raise ValueError("unknown setting: " + name)
+        if type(value) == bool and type(current) != bool or type(value) not in (int, float, bool):
+            raise ValueError("setting " + name + " must be a " + type(current).__name__)
+        if name in SETTING_RANGES:
+            low, high = SETTING_RANGES[name]
+            if not low <= value <= high:
+                raise ValueError("setting " + name + " must be from " + str(low) + " to " + str(high))
+        setattr(s, name, type(current)(value))
+    if s.mountain_start >= s.mountain_end:
+        raise ValueError("mountain_start must be below mountain_end")
+    if s.foreground_start >= s.foreground_end or s.secondary_foreground_start >= s.foreground_end:
+        raise ValueError("foreground_start and secondary_foreground_start must be below foreground_end")
+    return s
+
+
+# ------------------ Worker Processes ------------------
+
+# subtree cache of the worker process, kept between the jobs that use subtree memoization
+worker_subtrees = None
+
+
+# set up a worker process once, so jobs only pay for rendering
+def init_worker():
+    os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+    fractals.set_sprite_atlas(sprites.SpriteAtlas(fractals.Settings().sprite_quantization,
+                                                  fractals.Settings().sprite_memory))
+
+
+# forget the trees kept generated by the worker, which hold the sprite atlas and subtree cache they were made with
+def forget_expanded_trees():
+    with fractals.expanded_lock:
+        fractals.expanded_trees.clear()
+
+
+# generate with the sprite atlas of the worker set to the quantization and memory cap of the settings
+# (it keeps its sprites between jobs while they do not change)
+def use_sprites(s):
+    atlas = fractals.sprite_atlas
+    if atlas.quantization != s.sprite_quantization:
+        atlas.set_quantization(s.sprite_quantization)
+        forget_expanded_trees()  # their cached sprite keys are of the previous quantization
+    if atlas.max_bytes != s.sprite_memory:
+        atlas.set_max_bytes(s.sprite_memory)
+
+
+# return the process id, used to start every worker before the server takes requests
+def worker_ready():
+    return os.getpid()
+
+
+# generate with the subtree cache of the worker if the settings ask for subtree memoization, and without one otherwise
+# the cache is made again when the subtree step changes, and its memory cap follows the subtree memory
+def use_subtrees(s):
+    global worker_subtrees
+    cache = None
+    if s.subtree_memo:
+        if worker_subtrees is None or worker_subtrees.step != s.subtree_step:
+            worker_subtrees = subtrees.SubtreeCache(s.subtree_step, s.subtree_memory)
+        elif worker_subtrees.max_bytes != s.subtree_memory:
+            worker_subtrees.set_max_bytes(s.subtree_memory)
+        cache = worker_subtrees
+    if cache is not fractals.subtree_cache:
+        forget_expanded_trees()  # generated with the previous cache
+        fractals.set_subtree_cache(cache)
+
+
+# render a job in a worker, returning the PNG bytes (or None if it was saved to job.path) and seconds taken
+def render_job(job):
+    start = time.perf_counter()
+    s = make_settings(job.settings)
+    s.seed = job.seed
+    use_sprites(s)
+    use_subtrees(s)
+    if job.scene == "trees":
+        scene = fractals.create_fractal_screen(random_stream.RandomStream(job.seed))
+    else:
+        scene = fractals.generate_scene(s)
+    with fractals.keeping_scene_trees(scene):
+        return draw_job(job, s, scene, start)
+
+
+# draw the scene of a job, returning the PNG bytes (or None if it was saved to job.path) and seconds taken since start
+def draw_job(job, s, scene, start):
+    if job.scale == 1 and job.path is None:
+        data = io.BytesIO()
+        pygame.image.save(scene.get_screen(fractals.SCENE_WIDTH, fractals.SCENE_HEIGHT), data, "png")
+        return data.getvalue(), time.perf_counter() - start
+
+    # scaled images are drawn a band of tiles at a time, straight into the PNG file
+    path = job.path
+    if path is None:
+        fd, path = tempfile.mkstemp(".png")
+        os.close(fd)
+    try:
+        poster.render_poster(scene.drawables, scene.ground_y, (fractals.SCENE_WIDTH, fractals.SCENE_HEIGHT), path,
+                             job.scale, s.poster_tile)
+        if job.path is not None:
+            return None, time.perf_counter() - start
+        with open(path, "rb") as f:
+            return f.read(), time.perf_counter() - start
+    finally:
+        if job.path is None:
+            os.remove(path)
+
+
+# ------------------ Job Queue ------------------
+
+# job waiting in the queue of the server
+class QueuedJob:
+    def __init__(self, job):
+        self.job = job
+        self.queued_at = time.perf_counter()
+        self.wait = None  # seconds spent in the queue
+        self.render = None  # seconds taken by the worker
+        self.data = None
+        self.error = None
+        self.done = threading.Event()
+
+
+# queue of render jobs run on a pool of warm worker processes
+class RenderService:
+    def __init__(self, workers=None, max_queue=64, history=100):
+        self.workers = workers or os.cpu_count() or 1
+        # workers are started the platform's way: forked ones (Linux) start with the generation core already
+        # imported, spawned ones (Windows, macOS) import it once as they start
+        self.pool = ProcessPoolExecutor(self.workers, initializer=init_worker)
+        # wait for every worker to start before any thread is running, so none is forked mid request
+        for f in [self.pool.submit(worker_ready) for _ in range(self.workers)]:
+            f.result()
+        self.queue = queue.Queue(max_queue)
+        self.lock = threading.Lock()
+        self.running = 0
+        self.finished = 0
+        self.failed = 0
+        self.latencies = deque(maxlen=history)  # (queue seconds, render seconds, total seconds) of recent jobs
+        # one dispatcher per worker, each hands the pool one job at a time so the rest wait in the queue
+        for _ in range(self.workers):
+            threading.Thread(target=self.dispatch, daemon=True).start()
+
+    # add a job to the queue and return it, raising queue.Full if the queue is full
+    def submit(self, job):
+        queued = QueuedJob(job)
+        self.queue.put_nowait(queued)
+        return queued
+
+    def dispatch(self):
+        while True:
+            queued = self.queue.get()
+            if queued is None:
+                return
+            queued.wait = time.perf_counter() - queued.queued_at
+            with self.lock:
+                self.running += 1
+            try:
+                queued.data, queued.render = self.pool.submit(render_job, queued.job).result()
+            except Exception as e:
+                queued.error = str(e) or type(e).__name__
+            total = time.perf_counter() - queued.queued_at
+            with self.lock:
+                self.running -= 1
+                if queued.error is None:
+                    self.finished += 1
+                    self.latencies.append((queued.wait, queued.render, total))
+                else:
+                    self.failed += 1
+            queued.done.set()
+
+    # return the state of the queue and the latency of recent jobs
+    def status(self):
+        with self.lock:
+            latencies = list(self.latencies)
+            status = {"workers": self.workers, "queue_depth": self.queue.qsize(), "running": self.running,
+                      "finished": self.finished, "failed": self.failed}
+        if latencies:
+            totals = sorted(t for _, _, t in latencies)
+            status["recent_jobs"] = len(latencies)
+            status["mean_queue_seconds"] = round(sum(w for w, _, _ in latencies) / len(latencies), 4)
+            status["mean_render_seconds"] = round(sum(r for _, r, _ in latencies) / len(latencies), 4)
+            status["median_seconds"] = round(totals[len(totals) // 2], 4)
+            status["max_seconds"] = round(totals[-1], 4)
+        return status
+
+    def close(self):
+        for _ in range(self.workers):
+            self.queue.put(None)
+        self.pool.shutdown()
+
+
+# ------------------ HTTP Interface ------------------
+
+class RenderHandler(BaseHTTPRequestHandler):
+    service = None  # RenderService the requests go to, set by serve()
+    output_dir = "."  # directory files of jobs with a path are saved in, set by serve()
+
+    def send(self, code, body, content_type="application/json", headers=()):
+        if content_type == "application/json":
+            body = json.dumps(body).encode()
+        self.send_response(code)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in headers:
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path == "/status":
+            self.send(200, self.service.status())
+        else:
+            self.send(404, {"error": "not found"})
+
+    def do_POST(self):
+        if self.path != "/render":
+            self.send(404, {"error": "not found"})
+            return
+        if self.headers.get_content_type() != "application/json":
+            self.send(415, {"error": "jobs must be sent as application/json"})
+            return
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+            job = RenderJob.from_json(json.loads(self.rfile.read(length) or b"{}"), self.output_dir)
+        except ValueError as e:  # also bad JSON
+            self.send(400, {"error": str(e)})
+            return
+        try:
+            queued = self.service.submit(job)
+        except queue.Full:
+            self.send(503, {"error": "queue is full"}, headers=[("Retry-After", "1")])
+            return
+        queued.done.wait()
+        if queued.error is not None:
+            self.send(500, {"error": queued.error})
+            return
+        timing = [("X-Queue-Seconds", str(round(queued.wait, 4))), ("X-Render-Seconds", str(round(queued.render, 4)))]
+        if job.path is not None:
+            self.send(200, {"path": job.path, "queue_seconds": round(queued.wait, 4),
+                            "render_seconds": round(queued.render, 4)}, headers=timing)
+        else:
+            self.send(200, queued.data, "image/png", timing)
+
+    def log_message(self, format, *args):
+        pass  # requests are not logged, /status has the counts
+
+
+# run the server until it is interrupted
+def serve(port=8765, workers=None, max_queue=64, output_dir="renders"):
+    os.makedirs(output_dir, exist_ok=True)
+    service = RenderService(workers, max_queue)
+    RenderHandler.service = service
+    RenderHandler.output_dir = output_dir
+    server = ThreadingHTTPServer(("127.0.0.1", port), RenderHandler)
+    print("rendering with " + str(service.workers) + " workers at http://127.0.0.1:" + str(server.server_port))
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        service.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Local scene render server")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--workers", type=int, help="worker processes (default: one per CPU)")
+    parser.add_argument("--max-queue", type=int, default=64, help="most jobs waiting before requests are refused")
+    parser.add_argument("--output-dir", default="renders", help="directory jobs with a path save their files in")
+    args = parser.parse_args()
+    serve(args.port, args.workers, args.max_queue, args.output_dir)
@@ -0,0 +1,143 @@
+# --------------------------------------------------------------------
+# Program: Sprite Atlas Class
+# Date: Oct 19 2026
+# Description: Cache of pre-rendered leaf discs and flower heads.
+#   Sprites are bucketed by radius and quantized colour so that the
+#   thousands of leaves in a scene can reuse a small set of surfaces
+#   and be drawn with one batched blit call per tree. Drawables keep
+#   only the keys of their sprites, so sprites evicted from the atlas
+#   are freed and made again when they are next drawn.
+# --------------------------------------------------------------------
+
+import pygame
+import draw_stats
+from collections import OrderedDict
+
+
+# atlas of pre-rendered circle sprites with a memory cap
+class SpriteAtlas:
+    def __init__(self, quantization=8, max_bytes=8 * 1024 * 1024):
+        self.quantization = quantization  # size of each colour bucket (1 = exact colours)
+        self.max_bytes = max_bytes  # memory cap for all cached sprites
+        self.sprites = OrderedDict()  # (radius, colour buckets) -> surface, oldest first
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+
+    # return the colour at the centre of a bucket
+    def bucket_color(self, bucket):
+        q = self.quantization
+        if q <= 1:
+            return bucket
+        return tuple(min(255, v * q + q // 2) for v in bucket)
+
+    # return the bucket key of a colour
+    def bucket(self, color):
+        q = self.quantization
+        return int(color[0]) // q, int(color[1]) // q, int(color[2]) // q
+
+    # add a sprite to the atlas, removing the oldest sprites if over the memory cap
+    def add(self, key, sprite):
+        size = sprite.get_width() * sprite.get_height() * sprite.get_bytesize()
+        if size > self.max_bytes:
+            return sprite  # too big to ever fit, used once and not cached
+        while self.bytes + size > self.max_bytes and self.sprites:
+            old = self.sprites.popitem(last=False)[1]
+            self.bytes -= old.get_width() * old.get_height() * old.get_bytesize()
+        self.sprites[key] = sprite
+        self.bytes += size
+        return sprite
+
+    # return a blank colour keyed sprite surface that can hold a circle of a radius
+    @staticmethod
+    def blank_sprite(radius, *colors):
+        key = (255, 0, 255)
+        if key in colors:
+            key = (0, 255, 255)
+        sprite = pygame.Surface((radius * 2, radius * 2))
+        sprite.fill(key)
+        sprite.set_colorkey(key)
+        return sprite
+
+    # render the sprite of a filled leaf disc, given its key
+    def create_leaf(self, key):
+        self.misses += 1
+        radius = key[0]
+        color = self.bucket_color(key[1:])
+        sprite = self.blank_sprite(radius, color)
+        pygame.draw.circle(sprite, color, (radius, radius), radius)
+        return self.add(key, sprite)
+
+    # render the sprite of a flower head (petals with a centre), given its key
+    def create_flower_head(self, key):
+        self.misses += 1
+        radius = key[1]
+        pColor = self.bucket_color(key[2:5])
+        cColor = self.bucket_color(key[5:])
+        sprite = self.blank_sprite(radius, pColor, cColor)
+        pygame.draw.circle(sprite, pColor, (radius, radius), radius)
+        pygame.draw.circle(sprite, cColor, (radius, radius), radius // 2)
+        return self.add(key, sprite)
+
+    # return the sprite of a key, rendering it again if it is not cached
+    def sprite(self, key):
+        sprite = self.sprites.get(key)
+        if sprite is None:
+            return self.create_flower_head(key) if key[0] == "flower" else self.create_leaf(key)
+        self.hits += 1
+        return sprite
+
+    # return the sprite of a leaf disc
+    def leaf(self, radius, color):
+        return self.sprite((radius,) + self.bucket(color))
+
+    # return the key of the sprite of a flower head
+    def flower_head_key(self, radius, pColor, cColor):
+        return ("flower", radius) + self.bucket(pColor) + self.bucket(cColor)
+
+    # return the sprite of a flower head (petals with a centre)
+    def flower_head(self, radius, pColor, cColor):
+        return self.sprite(self.flower_head_key(radius, pColor, cColor))
+
+    # return the list of (sprite key, position) pairs for drawing a list of leaves
+    def leaf_keys(self, leaves):
+        q = self.quantization
+        return [((leaf.size, int(leaf.color[0]) // q, int(leaf.color[1]) // q, int(leaf.color[2]) // q),
+                 (leaf.pos[0] - leaf.size, leaf.pos[1] - leaf.size))
+                for leaf in leaves if leaf.size > 0]  # circles with no radius draw nothing
+
+    # draw a list of (sprite key, position) pairs with a single blits call
+    def draw_keys(self, win, keys):
+        sprites = self.sprites
+        blits = []
+        for key, pos in keys:
+            sprite = sprites.get(key)
+            if sprite is None:
+                sprite = self.create_flower_head(key) if key[0] == "flower" else self.create_leaf(key)
+            else:
+                self.hits += 1
+            blits.append((sprite, pos))
+        win.blits(blits, False)
+        draw_stats.blits += len(blits)
+
+    # draw a list of leaves with a single blits call
+    def draw_leaves(self, win, leaves):
+        self.draw_keys(win, self.leaf_keys(leaves))
+
+    def draw_flower_head(self, win, center, radius, pColor, cColor):
+        if radius > 0:
+            win.blit(self.flower_head(radius, pColor, cColor), (center[0] - radius, center[1] - radius))
+            draw_stats.blits += 1
+
+    # remove all sprites (used when the quantization level changes)
+    def clear(self):
+        self.sprites.clear()
+        self.bytes = 0
+
+    def set_quantization(self, q):
+        self.quantization = q
+        self.clear()
+
+    def set_max_bytes(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.clear()
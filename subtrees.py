@@ -0,0 +1,235 @@
+# --------------------------------------------------------------------
+# Program: Subtree Cache
+# Date: Oct 19 2026
+# Description: Cache of generated subtrees for reusing the small
+#   branches deep in trees and bushes. Subtrees are keyed by their
+#   quantized size (health, length, width) and heading, and a later
+#   subtree with the same key is not generated at all: it is stamped
+#   from the cached one, drawn from a sprite rendered once for each
+#   angle it is turned by (mirrored subtrees are reused too). The
+#   subtree cached for a key is grown at the size and heading the key
+#   stands for, from a seed made from the key, so it is the same
+#   whichever tree grew it first, and a tree generated again after its
+#   subtrees were evicted looks the same.
+# --------------------------------------------------------------------
+
+import math
+import threading
+import zlib
+from collections import OrderedDict
+import numpy as np
+import pygame
+
+KEY = (255, 0, 255)  # colour of the pixels a sprite does not draw on
+
+
+# a generated subtree that later matching subtrees are stamped from
+class Subtree:
+    # branches and leaves are those of the first tree it was generated in, already coloured, and only read when
+    # it is first drawn
+    def __init__(self, pos, heading, depth, branches, leaves):
+        self.pos = pos  # pixel the subtree grows from
+        self.heading = heading
+        self.depth = depth  # levels of branches in the subtree
+        self.source = (branches, leaves)
+        self.variants = {}  # (angle, mirrored) -> (sprite, pixel of the sprite the subtree grows from)
+        self.bytes = 0
+        self.cache = None  # cache it is kept in, which counts its bytes towards its memory cap
+        self.lock = threading.Lock()  # the preview thread draws subtrees too
+
+    # read the shapes of the subtree, relative to the pixel it grows from
+    def load(self):
+        branches, leaves = self.source
+        self.a = np.array([b.a for b in branches], dtype=np.float64).reshape(-1, 2) - self.pos
+        self.b = np.array([b.b for b in branches], dtype=np.float64).reshape(-1, 2) - self.pos
+        self.widths = [b.width for b in branches]
+        self.colors = [b.color for b in branches]
+        leaves = [leaf for leaf in leaves if leaf.size > 0]
+        self.centers = np.array([leaf.pos for leaf in leaves], dtype=np.float64).reshape(-1, 2) - self.pos
+        self.sizes = [leaf.size for leaf in leaves]
+        self.leaf_colors = [leaf.color for leaf in leaves]
+        self.bytes = self.a.nbytes + self.b.nbytes + self.centers.nbytes
+        self.source = None  # cleared last, other threads read the shapes once it is None
+
+    # return the branch ends and leaf centres turned by an angle (degrees) and mirrored, relative to its root
+    def shapes(self, angle, mirrored):
+        if self.source is not None:
+            with self.lock:
+                if self.source is not None:
+                    self.load()
+        a, b, centers = self.a, self.b, self.centers
+        if mirrored:
+            a, b, centers = a * (-1, 1), b * (-1, 1), centers * (-1, 1)
+        if angle:
+            r = math.radians(angle)
+            turn = np.array([[math.cos(r), math.sin(r)], [-math.sin(r), math.cos(r)]])
+            a, b, centers = a @ turn, b @ turn, centers @ turn
+        return a, b, centers
+
+    # return the sprite of the subtree turned by an angle and mirrored, and the pixel of it the subtree grows from
+    def variant(self, angle, mirrored):
+        found = self.variants.get((angle, mirrored))
+        if found is not None:
+            return found
+        a, b, centers = self.shapes(angle, mirrored)
+        with self.lock:
+            found = self.variants.get((angle, mirrored))
+            if found is not None:
+                return found
+            before = self.bytes
+            found = self.variants[(angle, mirrored)] = self.render(a, b, centers)
+            added = self.bytes - before
+        cache = self.cache
+        if cache is not None:
+            cache.charge(self, added)
+        return found
+
+    # render a sprite of the branch ends and leaf centres of the subtree, returning it and the pixel of it the
+    # subtree grows from
+    def render(self, a, b, centers):
+        a, b, centers = np.rint(a), np.rint(b), np.rint(centers)
+        pad = max(self.widths + self.sizes, default=0) + 1
+        x1 = int(min(a[:, 0].min(initial=0), b[:, 0].min(initial=0), centers[:, 0].min(initial=0))) - pad
+        y1 = int(min(a[:, 1].min(initial=0), b[:, 1].min(initial=0), centers[:, 1].min(initial=0))) - pad
+        x2 = int(max(a[:, 0].max(initial=0), b[:, 0].max(initial=0), centers[:, 0].max(initial=0))) + pad
+        y2 = int(max(a[:, 1].max(initial=0), b[:, 1].max(initial=0), centers[:, 1].max(initial=0))) + pad
+        sprite = pygame.Surface((x2 - x1 + 1, y2 - y1 + 1))
+        sprite.fill(KEY)
+        sprite.set_colorkey(KEY)
+        offset = (-x1, -y1)
+        for color, p, q, w in zip(self.colors, (a + offset).tolist(), (b + offset).tolist(), self.widths):
+            pygame.draw.line(sprite, color, p, q, w)
+        for color, p, size in zip(self.leaf_colors, (centers + offset).tolist(), self.sizes):
+            pygame.draw.circle(sprite, color, p, size)
+        self.bytes += sprite.get_width() * sprite.get_height() * sprite.get_bytesize()
+        return sprite, offset
+
+
+# a subtree of a tree drawn from a cached subtree
+class Stamp:
+    def __init__(self, subtree, pos, heading, mirrored, parent, level):
+        self.subtree = subtree
+        self.pos = pos  # pixel the stamped subtree grows from (the end of its parent branch)
+        self.mirrored = mirrored
+        base = 180 - subtree.heading if mirrored else subtree.heading
+        self.angle = round((heading - base + 180) % 360 - 180)  # whole degrees the cached subtree is turned by
+        self.parent = parent  # index of the branch it grows from
+        self.level = level  # level of its first branch
+
+    # return the (sprite, position) pair for drawing the stamp with blits
+    def blit(self):
+        sprite, (ox, oy) = self.subtree.variant(self.angle, self.mirrored)
+        return sprite, (self.pos[0] - ox, self.pos[1] - oy)
+
+    # return the branch ends and leaf centres of the stamp on screen, at the pixels its sprite draws them
+    def shapes(self):
+        a, b, centers = self.subtree.shapes(self.angle, self.mirrored)
+        return np.rint(a) + self.pos, np.rint(b) + self.pos, np.rint(centers) + self.pos
+
+    # return a box (x1, y1, x2, y2 inclusive) around everything the stamp draws
+    def box(self):
+        sprite, (x, y) = self.blit()
+        return x, y, x + sprite.get_width() - 1, y + sprite.get_height() - 1
+
+    def draw_transformed(self, win, scale, offset):
+        s = self.subtree
+        a, b, centers = self.shapes()
+        a, b, centers = (a * scale + offset).tolist(), (b * scale + offset).tolist(), (centers * scale + offset).tolist()
+        for color, p, q, w in zip(s.colors, a, b, s.widths):
+            pygame.draw.line(win, color, p, q, max(1, int(w * scale)))
+        for color, p, size in zip(s.leaf_colors, centers, s.sizes):
+            pygame.draw.circle(win, color, p, size * scale)
+
+
+# cache of subtrees with a memory cap on their sprites
+class SubtreeCache:
+    # subtrees match when their health, length and width are within step percent and their headings
+    # within step degrees. Only subtrees of trees with at most max_health health (create_tree2) or
+    # at most max_length times the length of their last branches (create_tree) are cached.
+    def __init__(self, step=10, max_bytes=16 * 1024 * 1024, max_health=25, max_length=6):
+        self.step = step
+        self.heading_step = step * 4.5
+        self.max_bytes = max_bytes
+        self.max_health = max_health
+        self.max_length = max_length
+        self.log_step = math.log(1 + step / 100)
+        self.subtrees = OrderedDict()  # key -> Subtree, least recently used first
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()  # trees are generated by more than one thread (previews, lazy trees)
+
+    # return the key of a subtree given the values that have to match exactly, its sizes and heading
+    def key(self, exact, sizes, heading):
+        return exact + tuple(round(math.log(max(v, 0.001)) / self.log_step) for v in sizes) + \
+            (round(heading / self.heading_step) % round(360 / self.heading_step),)
+
+    # return the key of the cached subtree a subtree is stamped from and if it is mirrored. Of the subtree's key
+    # and the key of its mirror image the smaller one is used, so subtrees with the same key always stamp the same
+    def choose(self, exact, sizes, heading):
+        key = self.key(exact, sizes, heading)
+        mirrored_key = self.key(exact, sizes, 180 - heading)
+        if mirrored_key < key:
+            return mirrored_key, True
+        return key, False
+
+    # return the sizes (count of them) and heading a key stands for, which its cached subtree is grown at
+    def canonical(self, key, count):
+        sizes = tuple(math.exp(q * self.log_step) for q in key[-1 - count:-1])
+        return sizes, key[-1] * self.heading_step
+
+    # return the seed of the random numbers of the subtree cached for a key
+    def seed(self, key):
+        return zlib.crc32(repr(key).encode())
+
+    # return the subtree cached for a key (None if there is none), looking in a tree's own new subtrees first
+    def find(self, key, new):
+        found = new.get(key)
+        if found is None:
+            with self.lock:
+                found = self.subtrees.get(key)
+                if found is not None:
+                    self.subtrees.move_to_end(key)
+        if found is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return found
+
+    # share the new subtrees of a finished tree with later trees
+    def add(self, new):
+        with self.lock:
+            for key, subtree in new.items():
+                if key not in self.subtrees:
+                    self.subtrees[key] = subtree
+                    subtree.cache = self
+                    self.bytes += subtree.bytes
+            self.evict()
+
+    # count bytes added to a cached subtree
+    def charge(self, subtree, added):
+        with self.lock:
+            if subtree.cache is self:
+                self.bytes += added
+                self.evict()
+
+    # change the memory cap, removing the least recently used subtrees if over it
+    def set_max_bytes(self, max_bytes):
+        with self.lock:
+            self.max_bytes = max_bytes
+            self.evict()
+
+    # remove the least recently used subtrees while over the memory cap
+    # (trees already stamped with a removed subtree keep it)
+    def evict(self):
+        while self.bytes > self.max_bytes and self.subtrees:
+            old = self.subtrees.popitem(last=False)[1]
+            old.cache = None
+            self.bytes -= old.bytes
+
+    def clear(self):
+        with self.lock:
+            for subtree in self.subtrees.values():
+                subtree.cache = None
+            self.subtrees.clear()
+            self.bytes = 0
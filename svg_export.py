@@ -0,0 +1,208 @@
+# --------------------------------------------------------------------
+# Program: SVG Export
+# Date: Oct 19 2026
+# Description: Writes scenes as SVG files. Each object is written as
+#   soon as it is made and then dropped, so a scene can be exported
+#   straight from the generators without holding it in memory. The
+#   branches of a tree are joined into one path for each colour and
+#   width, its leaves into one path for each colour bucket, so a dense
+#   forest is a few thousand paths instead of a few hundred thousand
+#   separate elements.
+# --------------------------------------------------------------------
+
+import os
+import numpy as np
+import color as c
+import occlusion
+import random_stream
+import fractals
+
+LEAF_QUANTIZATION = 16  # size of the colour buckets that leaves are grouped by
+
+
+# SVG file writer that holds at most chunk_size characters before writing them
+class SVGWriter:
+    def __init__(self, path, width, height, chunk_size=256 * 1024):
+        self.file = open(path, "w")
+        self.chunk_size = chunk_size
+        self.pending = []
+        self.pending_size = 0
+        self.write('<svg xmlns="http://www.w3.org/2000/svg" width="' + str(width) + '" height="' + str(height) +
+                   '" viewBox="0 0 ' + str(width) + ' ' + str(height) + '">\n')
+
+    def write(self, text):
+        self.pending.append(text)
+        self.pending_size += len(text)
+        if self.pending_size >= self.chunk_size:
+            self.flush()
+
+    def flush(self):
+        self.file.write("".join(self.pending))
+        self.pending = []
+        self.pending_size = 0
+
+    def close(self):
+        self.write("</svg>\n")
+        self.flush()
+        self.file.close()
+
+    # close and delete an unfinished file
+    def abort(self):
+        self.file.close()
+        os.remove(self.file.name)
+
+
+# ------------------ Path Data ------------------
+
+# return a colour as #rrggbb
+def hex_color(color):
+    return "#%02x%02x%02x" % tuple(min(max(int(v), 0), 255) for v in color[:3])
+
+
+# return the path data of line segments (arrays of ends a and b) as one move and line per segment
+def segments_path(a, b):
+    points = np.rint(np.hstack([a, b])).astype(np.int64).tolist()
+    return "".join("M%d %d %d %d" % tuple(p) for p in points)
+
+
+# return the path data of filled circles, each as two half circle arcs
+def circles_path(centers, radii):
+    return "".join("M%d %da%d %d 0 1 0 %d 0a%d %d 0 1 0 %d 0" % (x - r, y, r, r, 2 * r, r, r, -2 * r)
+                   for (x, y), r in zip(np.rint(centers).astype(np.int64).tolist(), radii))
+
+
+# return the SVG elements of a tree: a path for the branches of each colour and width, then a path
+# for the leaves of each colour bucket (subtrees stamped from the subtree cache are added to them)
+def tree_elements(tree):
+    branches = {}  # (colour, width) -> [ends a, ends b]
+    for b in tree.branches:
+        group = branches.setdefault((tuple(b.color), b.width), [[], []])
+        group[0].append(b.a)
+        group[1].append(b.b)
+    leaves = {}  # colour bucket -> [centres, radii]
+    for leaf in tree.leaves:
+        if leaf.size > 0:
+            group = leaves.setdefault(leaf_bucket(leaf.color), [[], []])
+            group[0].append(leaf.pos)
+            group[1].append(leaf.size)
+    for stamp in tree.stamps:
+        a, b, centers = stamp.shapes()
+        s = stamp.subtree
+        for color, width, p, q in zip(s.colors, s.widths, a.tolist(), b.tolist()):
+            group = branches.setdefault((tuple(color), width), [[], []])
+            group[0].append(p)
+            group[1].append(q)
+        for color, size, p in zip(s.leaf_colors, s.sizes, centers.tolist()):
+            group = leaves.setdefault(leaf_bucket(color), [[], []])
+            group[0].append(p)
+            group[1].append(size)
+
+    elements = ['<path fill="none" stroke="' + hex_color(color) + '" stroke-width="' + str(width) + '" d="' +
+                segments_path(np.array(a, dtype=np.float64), np.array(b, dtype=np.float64)) + '"/>\n'
+                for (color, width), (a, b) in branches.items()]
+    elements += ['<path fill="' + hex_color(color) + '" d="' + circles_path(np.array(centers, dtype=np.float64), radii) +
+                 '"/>\n' for color, (centers, radii) in leaves.items()]
+    return elements
+
+
+# return the colour at the centre of the bucket of a leaf colour
+def leaf_bucket(color):
+    q = LEAF_QUANTIZATION
+    return tuple(min(255, int(v) // q * q + q // 2) for v in color[:3])
+
+
+# return the SVG elements of a flower: its stem and its head
+def flower_elements(f):
+    stem = " ".join("%d %d" % (x, y) for x, y in f.stem_points)
+    cx, cy = f.petals_center
+    return ['<path fill="none" stroke="' + hex_color(f.sColor) + '" stroke-width="' + str(f.stem_width) +
+            '" d="M' + stem + '"/>\n',
+            '<circle cx="%d" cy="%d" r="%d" fill="%s"/>\n' % (cx, cy, f.radius, hex_color(f.pColor)),
+            '<circle cx="%d" cy="%d" r="%d" fill="%s"/>\n' % (cx, cy, f.radius // 2, hex_color(f.cColor))]
+
+
+# return the SVG elements of a scene object, none for objects that can not be exported
+def object_elements(d):
+    kind = occlusion.object_kind(d)
+    if kind == "tree":
+        return tree_elements(d)
+    if kind == "flower":
+        return flower_elements(d)
+    if kind == "mountain":
+        return ['<path fill="' + hex_color(d.color) + '" d="M' + " ".join("%d %d" % (x, y) for x, y in d.points) +
+                'Z"/>\n']
+    return []
+
+
+# ------------------ Export ------------------
+
+# write a scene to an SVG file, given its objects (in drawing order) as they are made
+# progress(current_object) is called after each object, returning True stops the export and deletes the file
+def write_scene(objects, ground_y, size, path, progress=None, sky=c.SKY, ground=c.DARK_GREEN):
+    svg = SVGWriter(path, size[0], size[1])
+    finished = False
+    try:
+        svg.write('<rect width="100%" height="100%" fill="' + hex_color(sky) + '"/>\n')
+        svg.write('<rect y="' + str(ground_y) + '" width="100%" height="' + str(size[1] - ground_y) + '" fill="' +
+                  hex_color(ground) + '"/>\n')
+        for i, d in enumerate(objects):
+            for element in object_elements(d):
+                svg.write(element)
+            if progress is not None and progress(i + 1):
+                break
+        else:
+            svg.close()
+            finished = True
+    finally:
+        if not finished:
+            svg.abort()
+    return finished
+
+
+# write a scene that has already been generated (a frame from fractals.generate_scene) to an SVG file
+def export_scene(scene, path, progress=None):
+    return write_scene(scene.drawables, scene.ground_y, (fractals.SCENE_WIDTH, fractals.SCENE_HEIGHT), path, progress)
+
+
+# yield the objects of the scene fractals.generate_scene makes for a set of settings, in drawing order,
+# making each one only when it is needed (the same objects, without occlusion culling)
+# a budget in the settings is fitted to the same way, but its deadline is not kept to
+def generate_objects(s, seed, detail=1):
+    plans = []
+    layer_rngs = []
+    for i, (name, kind, depends) in enumerate(fractals.SCENE_LAYERS):
+        if kind is not None:
+            layer_rngs.append(random_stream.RandomStream([seed, i]))
+            plans.append((name, fractals.plan_layer(s, kind, layer_rngs[-1])))
+    budget = fractals.SceneBudget(s.budget_branches, s.budget_draw_calls, s.budget_seconds)
+    if budget.limited():
+        plans, detail = budget.fit(plans, detail)
+    else:
+        plans = [plan for name, plan in plans]
+    # random stream of the layer of each planned object
+    streams = [layer_rng for layer_rng, plan in zip(layer_rngs, plans) for i in range(len(plan))]
+    plan = np.concatenate(plans)
+    for i in fractals.drawing_order(plan).tolist():
+        row, x, kind, ratio, width = plan[i].tolist()
+        if kind == fractals.TREE or kind == fractals.BUSH:
+            # the same tree create_planned makes, but not kept with the other generated trees
+            yield fractals.LazyTree(kind, x, row, detail, streams[i].randrange(0, 2 ** 31)).generate()
+        else:
+            yield fractals.create_planned(kind, x, row, width, detail, streams[i])
+
+
+# generate a scene for a set of settings straight into an SVG file, writing each object as it is made
+# returns the seed of the scene, or None if progress(current_object, total_objects) stopped the export
+def export_generated(s, path, progress=None, detail=1):
+    seed = s.seed
+    if seed is None:
+        seed = int(np.random.SeedSequence().entropy % 2 ** 32)
+    total = None
+    if progress is not None:
+        total = sum(len(fractals.plan_layer(s, kind, random_stream.RandomStream([seed, i])))
+                    for i, (name, kind, depends) in enumerate(fractals.SCENE_LAYERS) if kind is not None)
+    with fractals.paused_gc():
+        finished = write_scene(generate_objects(s, seed, detail), s.mountain_start,
+                               (fractals.SCENE_WIDTH, fractals.SCENE_HEIGHT), path,
+                               None if progress is None else lambda current: progress(current, total))
+    return seed if finished else None
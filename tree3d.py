@@ -0,0 +1,174 @@
+# --------------------------------------------------------------------
+# Program: 3D Trees
+# Date: Oct 19 2026
+# Description: Trees grown with 3D headings (vector.Vec3) and a view
+#   that turns them. Every frame all branch ends and leaves are
+#   projected to the screen in one perspective transform with numpy
+#   and drawn far to near (painter's order), so a tree can be turned
+#   by dragging the mouse at full frame rate.
+# --------------------------------------------------------------------
+
+import math
+import time
+import numpy as np
+import pygame
+import color as c
+import draw_stats
+import vector
+import random_stream
+
+UP = vector.Vec3(0, 1, 0)
+
+
+# return a heading turned by angle degrees towards the side roll degrees around it
+def turn(heading, angle, roll):
+    side = heading.cross(UP if abs(heading.y) < 0.99 else vector.Vec3(1, 0, 0)).unit()
+    other = heading.cross(side)
+    a, r = math.radians(angle), math.radians(roll)
+    return (heading * math.cos(a) + (side * math.cos(r) + other * math.sin(r)) * math.sin(a)).unit()
+
+
+# tree grown in 3D, y is up and the trunk stands on the origin
+# every branch splits into count branches (a random number in the range) until they are shorter than end_length,
+# each turned angle_change degrees from it, spread evenly around it and bent up by lift
+# angle_change, len_dec, width_dec and count are numbers or (start, stop) ranges like the 2D Tree
+class Tree3D:
+    def __init__(self, length=140, end_length=8, angle_change=(25, 45), len_dec=(65, 80), width=14,
+                 width_dec=(65, 80), count=(2, 4), lift=0.15, sColor=c.BROWN, eColor=c.DARK_GREEN, lColor="g",
+                 lCRange=(100, 255), rng=None):
+        rng = rng or random_stream.RandomStream()
+        self.lift = lift
+        a, b, widths, levels, ends = [], [], [], [], []
+        self.grow(vector.Vec3(0, 0, 0), UP, length, end_length, width, 0, rng.spec(angle_change), rng.spec(len_dec),
+                  rng.spec(width_dec), rng.spec(count), rng, a, b, widths, levels, ends)
+        self.a = np.array(a, dtype=np.float64).reshape(-1, 3)  # start of every branch
+        self.b = np.array(b, dtype=np.float64).reshape(-1, 3)  # end of every branch
+        self.widths = np.array(widths, dtype=np.float64)
+        self.max_level = max(levels, default=0)
+        self.colors = np.array(c.gradient(sColor, eColor, max(self.max_level, 1)))[levels].reshape(-1, 3)
+
+        # a leaf at every end
+        self.centers = np.array(ends, dtype=np.float64).reshape(-1, 3)
+        self.leaf_colors = np.array(c.random_colors(lCRange[0], lCRange[1], lColor,
+                                                    rng.int_array(50, 100, len(ends)), rng)).reshape(-1, 3)
+        self.leaf_sizes = rng.int_array(2, 6, len(ends)).astype(np.float64)
+
+    # add a branch and everything growing from it
+    def grow(self, start, heading, length, end_length, width, level, angle_change, len_dec, width_dec, count, rng,
+             a, b, widths, levels, ends):
+        end = start + heading * length
+        a.append(start.get())
+        b.append(end.get())
+        widths.append(max(width, 1))
+        levels.append(level)
+        n = count()
+        roll = rng.randrange(0, 360)
+        for i in range(n):
+            child = turn(heading, angle_change(), roll + i * 360 / n + rng.randrange(-20, 20))
+            child = (child + UP * self.lift).unit()
+            child_length = length * len_dec() / 100
+            if child_length < end_length:
+                ends.append(end.get())
+                continue
+            self.grow(end, child, child_length, end_length, width * width_dec() / 100, level + 1, angle_change,
+                      len_dec, width_dec, count, rng, a, b, widths, levels, ends)
+
+    # return the height of the top of the tree
+    def height(self):
+        return max(self.b[:, 1].max(initial=0), self.centers[:, 1].max(initial=0))
+
+
+# return a rotation matrix turning points by yaw degrees around the y axis, then pitch degrees around the x axis
+def rotation(yaw, pitch):
+    y, p = math.radians(yaw), math.radians(pitch)
+    turn_y = np.array([[math.cos(y), 0, math.sin(y)], [0, 1, 0], [-math.sin(y), 0, math.cos(y)]])
+    turn_x = np.array([[1, 0, 0], [0, math.cos(p), -math.sin(p)], [0, math.sin(p), math.cos(p)]])
+    return turn_x @ turn_y
+
+
+# project an array of points (n, 3) to the screen in one transform, turned by a rotation matrix around a centre
+# and seen from distance away along the z axis. Returns the screen points (n, 2) and their depths (n)
+def project(points, matrix, center, distance, focal, screen_center):
+    turned = (points - center) @ matrix.T
+    depth = turned[:, 2] + distance
+    scale = focal / np.maximum(depth, 1)
+    screen = np.empty((len(points), 2))
+    screen[:, 0] = screen_center[0] + turned[:, 0] * scale
+    screen[:, 1] = screen_center[1] - turned[:, 1] * scale  # y is up in the tree, down on the screen
+    return screen, depth
+
+
+# drawable showing a 3D tree that turns by itself, or by dragging the mouse
+class TreeView:
+    # spin is the degrees per second the tree turns while it is not dragged
+    # fog blends the farthest branches this much towards the background
+    # clock returns the time in seconds the tree is drawn at (the time of the frame when input is replayed)
+    def __init__(self, tree, size, spin=20, pitch=-15, fog=0.35, background=c.SKY, clock=time.perf_counter):
+        self.tree = tree
+        self.size = size
+        self.spin = spin
+        self.yaw = 0
+        self.pitch = pitch
+        self.fog = fog
+        self.background = background
+        height = tree.height()
+        self.center = np.array([0, height / 2, 0])
+        self.distance = height * 2.2
+        self.focal = size[1] * 1.6
+        self.clock = clock
+        self.last_frame = clock()
+        self.dragged = False  # the tree stops turning by itself once it has been dragged
+
+        # branches and leaves as one list of shapes, so both are sorted into the same painter's order
+        self.points = np.vstack([tree.a, tree.b, tree.centers])
+        self.branch_count = len(tree.a)
+        self.colors = np.vstack([tree.colors, tree.leaf_colors])
+        self.sizes = np.concatenate([tree.widths, tree.leaf_sizes])
+
+    # turn the tree by a mouse movement in pixels
+    def drag(self, rel):
+        self.dragged = True
+        self.yaw += rel[0] * 0.5
+        self.pitch = min(max(self.pitch - rel[1] * 0.5, -89), 89)
+
+    # return the branches and leaves on the screen in painter's order (farthest first), as a list of
+    # (is branch, colour, branch start or leaf centre, branch end, width or radius)
+    def shapes(self):
+        n = self.branch_count
+        screen, depth = project(self.points, rotation(self.yaw, self.pitch), self.center, self.distance, self.focal,
+                                (self.size[0] / 2, self.size[1] / 2))
+        a, b, centers = screen[:n], screen[n:2 * n], screen[2 * n:]
+        # a branch is as far as its middle
+        depths = np.concatenate([(depth[:n] + depth[n:2 * n]) / 2, depth[2 * n:]])
+        scale = self.focal / np.maximum(depths, 1)
+        sizes = np.maximum(np.rint(self.sizes * scale), 1).astype(np.int64)
+
+        # fog: colours blended towards the background with depth
+        near, far = depths.min(initial=0), depths.max(initial=0)
+        haze = (depths - near) / max(far - near, 1) * self.fog
+        colors = self.colors - (self.colors - np.array(self.background, dtype=np.float64)) * haze[:, None]
+
+        order = np.argsort(-depths, kind="stable")
+        firsts = np.vstack([a, centers])
+        seconds = np.vstack([b, np.zeros((len(centers), 2))])
+        return list(zip((order < n).tolist(), colors[order].tolist(), firsts[order].tolist(),
+                        seconds[order].tolist(), sizes[order].tolist()))
+
+    def draw(self, win):
+        now = self.clock()
+        if not self.dragged:
+            self.yaw += self.spin * (now - self.last_frame)
+        self.last_frame = now
+        win.fill(self.background)
+        shapes = self.shapes()
+        for branch, color, p, q, size in shapes:
+            if branch:
+                pygame.draw.line(win, color, p, q, size)
+            else:
+                pygame.draw.circle(win, color, p, size)
+        draw_stats.draw_calls += len(shapes)
+
+
+# create a tree to look at in 3D
+def create_tree(rng=None):
+    return Tree3D(rng=rng)
@@ -53,8 +53,8 @@ class Vec3:
 
     # unit vector
     def unit(self):
-        length = len(self)
-        return Vec3(self.x/length, self.y/length, self.x/length)
+        length = math.sqrt(self.dot(self))  # len() only allows whole numbers
+        return Vec3(self.x/length, self.y/length, self.z/length)
 
     def __str__(self):
         return str(self.x) + " ," + str(self.y) + " ," + str(self.z)